@@ -0,0 +1,166 @@
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+# Refill the bucket for the time elapsed, then take a token if one is left. Runs atomically in Redis.
+TAKE_TOKEN_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_per_second = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * refill_per_second)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / refill_per_second) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+def parse_bucket(rate):
+    """"5/10m" -> (5 tokens, refilled at 5 per 600 seconds). Periods are s, m, h or d, optionally with a count."""
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d*)\s*([smhd])\s*', rate)
+    if not match:
+        raise ValueError(f"Invalid token bucket rate {rate!r}, expected e.g. '5/10m'.")
+    capacity, count, unit = int(match[1]), int(match[2] or 1), match[3]
+    period = count * {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[unit]
+    return capacity, capacity / period
+
+
+class TokenBuckets:
+    """
+    Token buckets shared by all workers through Redis when the default cache is django-redis,
+    with an in-process store for local-memory caches or while Redis is unreachable.
+
+    take() refills a bucket for the time since it was last used, up to its capacity, and
+    spends one token: (allowed, seconds until the next token when refused).
+    """
+
+    MAX_LOCAL_BUCKETS = 10000
+    RETRY_REDIS_SECONDS = 30  # after a failure, limit in-process this long before trying Redis again
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = OrderedDict()  # key -> (tokens, monotonic time of last update)
+        self._script = None
+        self._redis_down_until = 0
+
+    def take(self, key, capacity, refill_per_second):
+        if settings.CACHES['default']['BACKEND'].startswith('django_redis') and time.monotonic() >= self._redis_down_until:
+            try:
+                allowed, tokens = self._take_redis(key, capacity, refill_per_second)
+            except Exception as e:
+                self._redis_down_until = time.monotonic() + self.RETRY_REDIS_SECONDS
+                logger.warning(f"Token bucket store unavailable, limiting in-process: {e}")
+            else:
+                return allowed, self._wait(tokens, refill_per_second, allowed)
+        allowed, tokens = self._take_local(key, capacity, refill_per_second)
+        return allowed, self._wait(tokens, refill_per_second, allowed)
+
+    @staticmethod
+    def _wait(tokens, refill_per_second, allowed):
+        return None if allowed else (1 - tokens) / refill_per_second
+
+    def _take_redis(self, key, capacity, refill_per_second):
+        from django_redis import get_redis_connection  # only with the Redis cache
+
+        if self._script is None:
+            self._script = get_redis_connection('default').register_script(TAKE_TOKEN_SCRIPT)
+        allowed, tokens = self._script(keys=[cache.make_key(f"bucket:{key}")], args=[capacity, refill_per_second, time.time()])
+        return bool(allowed), float(tokens)
+
+    def _take_local(self, key, capacity, refill_per_second):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._local.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._local[key] = (tokens, now)
+            if len(self._local) > self.MAX_LOCAL_BUCKETS:
+                self._local.popitem(last=False)
+        return allowed, tokens
+
+
+token_buckets = TokenBuckets()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Limits unsafe requests to a view with a token bucket per identity. The view names its
+    `throttle_scope`, and settings.TOKEN_BUCKETS[scope][kind] gives the bucket ("burst/period")
+    for this throttle's kind of identity; kinds without a bucket are not limited. Refused
+    requests get a 429 with a Retry-After header.
+    """
+
+    kind = None
+
+    def get_identity(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self._wait = None
+        if request.method in SAFE_METHODS:
+            return True
+        scope = getattr(view, 'throttle_scope', None)
+        rate = settings.TOKEN_BUCKETS.get(scope, {}).get(self.kind)
+        identity = self.get_identity(request) if rate else None
+        if not identity:
+            return True
+        capacity, refill_per_second = parse_bucket(rate)
+        allowed, self._wait = token_buckets.take(f"{scope}:{self.kind}:{identity}", capacity, refill_per_second)
+        return allowed
+
+    def wait(self):
+        return math.ceil(self._wait) if self._wait is not None else None
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    kind = 'ip'
+
+    def get_identity(self, request):
+        return self.get_ident(request)
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    kind = 'user'
+
+    def get_identity(self, request):
+        return request.user.pk if request.user and request.user.is_authenticated else None
+
+
+class PhoneTokenBucketThrottle(TokenBucketThrottle):
+    """The signed-in user's phone number, or the one submitted (registration)."""
+    kind = 'phone'
+
+    def get_identity(self, request):
+        if request.user and request.user.is_authenticated:
+            phone_number = request.user.phone_number
+        else:
+            phone_number = request.data.get('phone_number')
+        return re.sub(r'[\s\-]', '', str(phone_number)) if phone_number else None
+
+
+class EmailTokenBucketThrottle(TokenBucketThrottle):
+    """The submitted email, i.e. the account a login attempt targets."""
+    kind = 'email'
+
+    def get_identity(self, request):
+        email = request.data.get('email')
+        return str(email).strip().lower() if email else None
@@ -8,6 +8,7 @@ from rest_framework.pagination import PageNumberPagination
 from rest_framework_simplejwt.views import TokenObtainPairView
 from auth_app.serializers import CustomTokenObtainPairSerializer
 from auth_app.permissions import IsSystemAdmin, ReadOnlyOrAuthenticated
+from auth_app.throttling import EmailTokenBucketThrottle, IPTokenBucketThrottle, PhoneTokenBucketThrottle
 from auth_app.services import StandardResultsSetPagination, send_approval_email, send_rejection_email
 from core import serializers
 from .models import Department, User, UserStatusHistory
@@ -15,9 +16,13 @@ from .serializers import DepartmentSerializer, UserDetailSerializer, UserListSer
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_scope = 'login'
+    throttle_classes = [EmailTokenBucketThrottle, IPTokenBucketThrottle]
 
 class UserRegistrationView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'register'
+    throttle_classes = [PhoneTokenBucketThrottle, IPTokenBucketThrottle]
 
     def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
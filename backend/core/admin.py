@@ -11,6 +11,7 @@ from .models import (
     RefuelingRequest,
     ServiceRequest,
     OTPCode,
+    FuelPrice,
 )
 
 admin.site.register(Vehicle)
@@ -23,4 +24,5 @@ admin.site.register(TransportRequestActionLog)
 admin.site.register(MaintenanceRequest)
 admin.site.register(RefuelingRequest)
 admin.site.register(ServiceRequest)
-admin.site.register(OTPCode)
\ No newline at end of file
+admin.site.register(OTPCode)
+admin.site.register(FuelPrice)
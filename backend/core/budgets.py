@@ -0,0 +1,214 @@
+from datetime import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.models import (
+    ActionLog, BudgetLedgerEntry, DepartmentBudget, HighCostTransportRequest, MaintenanceRequest, RefuelingRequest,
+    ServiceRequest,
+)
+
+
+class BudgetLedger:
+    """
+    Department budgets backed by an append-only ledger.
+
+    Allocations add to a budget and approvals of costed requests are charged against it.
+    Every entry is written under a row lock on the DepartmentBudget, which stores the
+    running balance, so reading what a department has left never sums the request tables.
+    """
+
+    COST_FIELDS = {
+        HighCostTransportRequest: 'total_cost',
+        RefuelingRequest: 'total_cost',
+        MaintenanceRequest: 'maintenance_total_cost',
+        ServiceRequest: 'service_total_cost',
+    }
+    DEPARTMENT_PATHS = {  # what department_of() reads, for select_related
+        HighCostTransportRequest: ['requester'],
+        RefuelingRequest: ['requesters_car', 'requester'],
+        MaintenanceRequest: ['requesters_car', 'requester'],
+        ServiceRequest: ['vehicle__driver'],
+    }
+
+    @staticmethod
+    def fiscal_year(day=None):
+        """Calendar year in which the fiscal year containing `day` started."""
+        day = day or timezone.localdate()
+        return day.year if day.month >= settings.FISCAL_YEAR_START_MONTH else day.year - 1
+
+    @staticmethod
+    def fiscal_year_bounds(fiscal_year):
+        """Aware [start, end) datetimes of a fiscal year in the local timezone."""
+        start_month = settings.FISCAL_YEAR_START_MONTH
+        return (
+            timezone.make_aware(datetime(fiscal_year, start_month, 1)),
+            timezone.make_aware(datetime(fiscal_year + 1, start_month, 1)),
+        )
+
+    @staticmethod
+    def department_of(request_obj):
+        """Department a request is charged to: the requester's for field trips, otherwise the vehicle's."""
+        if isinstance(request_obj, HighCostTransportRequest):
+            return request_obj.requester.department_id
+        if isinstance(request_obj, ServiceRequest):
+            vehicle, fallback = request_obj.vehicle, request_obj.vehicle.driver
+        else:
+            vehicle, fallback = request_obj.requesters_car, request_obj.requester
+        if vehicle is not None and vehicle.department_id:
+            return vehicle.department_id
+        return fallback.department_id if fallback else None
+
+    @classmethod
+    def charge(cls, request_obj, user=None, day=None):
+        """
+        Charge an approved request to its department's budget for the fiscal year of `day`.
+        Returns the updated budget, or None when the request has no cost or no budget applies.
+        A request is only ever charged once.
+        """
+        amount = getattr(request_obj, cls.COST_FIELDS[type(request_obj)])
+        department_id = cls.department_of(request_obj)
+        if not amount or department_id is None:
+            return None
+        content_type = ContentType.objects.get_for_model(request_obj)
+        with transaction.atomic():
+            budget = DepartmentBudget.objects.select_for_update().filter(
+                department_id=department_id, fiscal_year=cls.fiscal_year(day)
+            ).first()
+            if budget is None:
+                return None
+            already_charged = BudgetLedgerEntry.objects.filter(
+                kind=BudgetLedgerEntry.CHARGE, content_type=content_type, object_id=request_obj.pk
+            ).exists()
+            if not already_charged:
+                cls._append(
+                    budget, BudgetLedgerEntry.CHARGE, -amount, user,
+                    content_type=content_type, object_id=request_obj.pk,
+                    remarks=f"{request_obj._meta.verbose_name.capitalize()} #{request_obj.pk} approved",
+                )
+        return budget
+
+    @classmethod
+    def allocate(cls, department, fiscal_year, amount, user=None, remarks=None):
+        """Add `amount` (negative to cut) to a department's allocation, creating the budget if needed."""
+        with transaction.atomic():
+            DepartmentBudget.objects.get_or_create(department=department, fiscal_year=fiscal_year)
+            budget = DepartmentBudget.objects.select_for_update().get(department=department, fiscal_year=fiscal_year)
+            cls._append(budget, BudgetLedgerEntry.ALLOCATION, amount, user, remarks=remarks)
+        return budget
+
+    @staticmethod
+    def _append(budget, kind, amount, user, content_type=None, object_id=None, remarks=None):
+        """Apply one entry to a budget the caller holds locked."""
+        amount = Decimal(amount)
+        budget.balance += amount
+        if kind == BudgetLedgerEntry.ALLOCATION:
+            budget.allocated += amount
+        BudgetLedgerEntry.objects.create(
+            budget=budget, kind=kind, amount=amount, balance_after=budget.balance,
+            content_type=content_type, object_id=object_id, created_by=user, remarks=remarks,
+        )
+        budget.save(update_fields=['balance', 'allocated', 'updated_at'])
+
+    @classmethod
+    def rebuild(cls, budget):
+        """Reset a budget's stored balance and allocation to its ledger replay, under the row lock."""
+        with transaction.atomic():
+            budget = DepartmentBudget.objects.select_for_update().get(pk=budget.pk)
+            budget.balance, budget.allocated, _bad_entries = cls.replay(budget)
+            budget.save(update_fields=['balance', 'allocated', 'updated_at'])
+        return budget
+
+    @classmethod
+    def current_budgets(cls):
+        """summary() of every department's budget this fiscal year, by department id, in one query."""
+        return {
+            budget.department_id: cls.summary(budget)
+            for budget in DepartmentBudget.objects.select_related('department').filter(fiscal_year=cls.fiscal_year())
+        }
+
+    @classmethod
+    def remaining_for(cls, request_obj, budgets=None):
+        """
+        summary() of the budget a request would be charged to this fiscal year, for approvers.
+        Pass current_budgets() as `budgets` to read it once for a whole list of requests.
+        """
+        department_id = cls.department_of(request_obj)
+        if department_id is None:
+            return None
+        if budgets is None:
+            budgets = cls.current_budgets()
+        return budgets.get(department_id)
+
+    @classmethod
+    def with_departments(cls, queryset):
+        """`queryset` of a costed request model with the relations department_of() reads joined in."""
+        return queryset.select_related(*cls.DEPARTMENT_PATHS[queryset.model])
+
+    @staticmethod
+    def summary(budget):
+        """Budget figures for API responses, or None when no budget applies."""
+        if budget is None:
+            return None
+        return {
+            "department": budget.department.name,
+            "fiscal_year": budget.fiscal_year,
+            "allocated": float(budget.allocated),
+            "spent": float(budget.spent),
+            "remaining": float(budget.balance),
+        }
+
+    @staticmethod
+    def replay(budget):
+        """
+        Recompute a budget from its ledger. Returns (balance, allocated, bad_entry_ids) where
+        bad_entry_ids are entries whose stored balance_after does not match the replay.
+        """
+        balance = allocated = Decimal(0)
+        bad_entries = []
+        for entry_id, kind, amount, balance_after in budget.entries.order_by('id').values_list(
+            'id', 'kind', 'amount', 'balance_after'
+        ):
+            balance += amount
+            if kind == BudgetLedgerEntry.ALLOCATION:
+                allocated += amount
+            if balance_after != balance:
+                bad_entries.append(entry_id)
+        return balance, allocated, bad_entries
+
+    @classmethod
+    def uncharged_requests(cls, fiscal_year):
+        """
+        Approved, costed requests from `fiscal_year` that have a department budget but no charge
+        entry, as (request, approval day). The approval day comes from the request's "approved"
+        ActionLog, falling back to updated_at for requests approved before logging.
+        """
+        budgeted = set(DepartmentBudget.objects.filter(fiscal_year=fiscal_year).values_list('department_id', flat=True))
+        if not budgeted:
+            return []
+        start, end = cls.fiscal_year_bounds(fiscal_year)
+        missing = []
+        for model, cost_field in cls.COST_FIELDS.items():
+            content_type = ContentType.objects.get_for_model(model)
+            charged = BudgetLedgerEntry.objects.filter(
+                kind=BudgetLedgerEntry.CHARGE, content_type=content_type
+            ).values('object_id')
+            approval = ActionLog.objects.filter(
+                content_type=content_type, object_id=OuterRef('pk'), action='approved'
+            ).order_by('-timestamp').values('timestamp')[:1]
+            approved = (
+                model.objects.filter(status='approved', **{f'{cost_field}__gt': 0})
+                .exclude(pk__in=charged)
+                .annotate(approved_at=Coalesce(Subquery(approval), 'updated_at'))
+                .filter(approved_at__gte=start, approved_at__lt=end)
+                .select_related(*cls.DEPARTMENT_PATHS[model])
+            )
+            for request_obj in approved:
+                if cls.department_of(request_obj) in budgeted:
+                    missing.append((request_obj, timezone.localdate(request_obj.approved_at)))
+        return missing
@@ -0,0 +1,117 @@
+import json
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from auth_app.models import User
+from core.models import Vehicle
+from core.positions import POSITIONS_GROUP, live_positions
+from core.telemetry import TelemetryIngestor, telemetry_buffer
+
+
+class TelemetryConsumer(AsyncWebsocketConsumer):
+    """Streams odometer/position points from drivers' devices or a telemetry gateway."""
+
+    async def connect(self):
+        user = self.scope["user"]
+        if user.is_authenticated and user.role in (User.DRIVER, User.TRANSPORT_MANAGER):
+            await self.accept()
+        else:
+            await self.close()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        """Accept a single point, a list of points or {"points": [...]} and acknowledge it."""
+        try:
+            payload = json.loads(text_data or bytes_data or "")
+        except ValueError:
+            await self.send(text_data=json.dumps({"error": "Invalid JSON."}))
+            return
+        rows = payload.get("points", [payload]) if isinstance(payload, dict) else payload
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            await self.send(text_data=json.dumps({"error": "Provide a point or a list of points."}))
+            return
+        if len(rows) > settings.TELEMETRY_MAX_POINTS_PER_REQUEST:
+            await self.send(text_data=json.dumps({
+                "error": f"At most {settings.TELEMETRY_MAX_POINTS_PER_REQUEST} points per message."
+            }))
+            return
+
+        accepted, errors = await self.ingest(rows)
+        await self.send(text_data=json.dumps({"accepted": accepted, "rows": errors}))
+
+    @database_sync_to_async
+    def ingest(self, rows):
+        points, errors = TelemetryIngestor.parse(rows, self.scope["user"])
+        live_positions.record(
+            (point.vehicle_id, point.latitude, point.longitude, point.recorded_at)
+            for point in points if point.latitude is not None and point.longitude is not None
+        )
+        return telemetry_buffer.add(points), errors
+
+
+class DriverPositionConsumer(AsyncWebsocketConsumer):
+    """Position pings from a driver's device for the vehicle assigned to them."""
+
+    async def connect(self):
+        user = self.scope["user"]
+        self.vehicle_id = await self.assigned_vehicle(user) if user.is_authenticated else None
+        if self.vehicle_id is None:
+            await self.close()
+            return
+        await database_sync_to_async(live_positions.load)()
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        if getattr(self, "vehicle_id", None) is not None and live_positions.persist_due():
+            await database_sync_to_async(live_positions.persist)()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        """Expects {"latitude": .., "longitude": .., "recorded_at": optional ISO 8601}."""
+        try:
+            payload = json.loads(text_data or bytes_data or "")
+            latitude, longitude = float(payload["latitude"]), float(payload["longitude"])
+        except (ValueError, TypeError, KeyError):
+            await self.send(text_data=json.dumps({"error": "latitude and longitude are required."}))
+            return
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            await self.send(text_data=json.dumps({"error": "Position is out of range."}))
+            return
+        recorded_at = parse_datetime(str(payload.get("recorded_at") or "")) or timezone.now()
+        if timezone.is_naive(recorded_at):
+            recorded_at = timezone.make_aware(recorded_at)
+
+        entry = live_positions.update(self.vehicle_id, latitude, longitude, recorded_at)
+        if entry is not None:
+            await self.channel_layer.group_send(POSITIONS_GROUP, {"type": "positions.changed", "positions": [entry]})
+        if live_positions.persist_due():
+            await database_sync_to_async(live_positions.persist)()
+
+    @database_sync_to_async
+    def assigned_vehicle(self, user):
+        if user.role != User.DRIVER:
+            return None
+        return Vehicle.objects.filter(driver=user, is_deleted=False).values_list('id', flat=True).first()
+
+
+class LivePositionMapConsumer(AsyncWebsocketConsumer):
+    """Transport manager's map: a full snapshot on connect, then only changed positions."""
+
+    async def connect(self):
+        user = self.scope["user"]
+        if not (user.is_authenticated and user.role == User.TRANSPORT_MANAGER):
+            await self.close()
+            return
+        await self.channel_layer.group_add(POSITIONS_GROUP, self.channel_name)
+        await self.accept()
+        await database_sync_to_async(live_positions.load)()
+        positions = await database_sync_to_async(live_positions.snapshot)()
+        await self.send(text_data=json.dumps({"type": "snapshot", "positions": positions}))
+
+    async def disconnect(self, close_code):
+        await self.channel_layer.group_discard(POSITIONS_GROUP, self.channel_name)
+
+    async def positions_changed(self, event):
+        await self.send(text_data=json.dumps({"type": "diff", "positions": event["positions"]}))
@@ -0,0 +1,170 @@
+import hashlib
+import heapq
+import json
+import math
+import re
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+from core.models import RouteDistance
+
+GRAPH_FILE = Path(__file__).resolve().parent / 'data' / 'road_graph.json'
+MAX_PHRASE_WORDS = 3
+NOISE_WORDS = {"city", "town", "zone", "woreda", "kebele", "region", "to", "and", "via", "the", "trip"}
+
+
+def normalize(text):
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+class RoadGraph:
+    """The bundled gazetteer and road network, loaded once per process."""
+
+    def __init__(self, path=GRAPH_FILE):
+        raw = Path(path).read_bytes()
+        data = json.loads(raw)
+        self.version = hashlib.sha1(raw).hexdigest()[:12]
+        self.places = list(data['places'])
+        self.names = {}
+        for name, place in data['places'].items():
+            for alias in [name, *place.get('aliases', [])]:
+                self.names[normalize(alias)] = name
+        self.adjacency = {name: [] for name in self.places}
+        for a, b, km in data['roads']:
+            self.adjacency[a].append((b, float(km)))
+            self.adjacency[b].append((a, float(km)))
+
+    def find_places(self, destination):
+        """Known places mentioned in `destination`, in the order they appear, longest phrase first."""
+        words = normalize(destination).split()
+        found, i = [], 0
+        while i < len(words):
+            for size in range(min(MAX_PHRASE_WORDS, len(words) - i), 0, -1):
+                phrase = " ".join(words[i:i + size])
+                if phrase in NOISE_WORDS:
+                    continue
+                place = self.names.get(phrase)
+                if place is not None:
+                    if not found or found[-1] != place:
+                        found.append(place)
+                    i += size
+                    break
+            else:
+                i += 1
+        return found
+
+    def shortest_from(self, source):
+        """Dijkstra from `source` over the whole (small) graph: {place: km}."""
+        distances = {source: 0.0}
+        queue = [(0.0, source)]
+        while queue:
+            km, place = heapq.heappop(queue)
+            if km > distances.get(place, float('inf')):
+                continue
+            for neighbour, length in self.adjacency[place]:
+                candidate = km + length
+                if candidate < distances.get(neighbour, float('inf')):
+                    distances[neighbour] = candidate
+                    heapq.heappush(queue, (candidate, neighbour))
+        return distances
+
+
+@lru_cache(maxsize=1)
+def road_graph():
+    return RoadGraph()
+
+
+@lru_cache(maxsize=None)
+def _distances_from(source):
+    return road_graph().shortest_from(source)
+
+
+@lru_cache(maxsize=4096)
+def _route(key):
+    """(km, stops) from ROUTE_ORIGIN through the places named in `key`, or None. Depends only on the graph."""
+    graph = road_graph()
+    places = graph.find_places(key)
+    origin = graph.names.get(normalize(settings.ROUTE_ORIGIN))
+    stops = [place for place in places if place != origin] if origin else []
+    if not stops:
+        return None
+
+    total, current = 0.0, origin
+    for stop in stops:
+        km = _distances_from(current).get(stop)
+        if km is None:
+            return None
+        total, current = total + km, stop
+    return round(total, 1), stops
+
+
+class RouteEstimator:
+    """
+    One-way road distance from ROUTE_ORIGIN to a free-text destination.
+
+    Destinations are normalized and matched against the gazetteer (multi-stop text is
+    routed through each place in order). Routes are memoized per process and stored in
+    RouteDistance, where a distance the transport manager entered by hand for the same
+    destination takes precedence over the graph. RouteDistance is read on every lookup,
+    so a hand-entered distance applies in every worker straight away.
+    """
+
+    @classmethod
+    def estimate(cls, destination):
+        """Return {"distance_km", "places", "source"} or None when the destination is unknown."""
+        key = normalize(destination)[:1024]
+        if not key:
+            return None
+        return cls._lookup(key)
+
+    @staticmethod
+    def _lookup(key):
+        graph = road_graph()
+        stored = RouteDistance.objects.filter(destination_key=key).first()
+        if stored and (stored.source == RouteDistance.MANUAL or stored.graph_version == graph.version):
+            return {"distance_km": stored.distance_km, "places": stored.places, "source": stored.source}
+
+        route = _route(key)
+        if route is None:
+            return None
+        distance_km, stops = route
+        RouteDistance.objects.update_or_create(
+            destination_key=key,
+            defaults={
+                'distance_km': distance_km, 'places': stops,
+                'source': RouteDistance.GRAPH, 'graph_version': graph.version,
+            },
+        )
+        return {"distance_km": distance_km, "places": stops, "source": RouteDistance.GRAPH}
+
+    @classmethod
+    def suggest(cls, destination):
+        """Estimate shaped for pre-filling the estimate forms; distance is None when unknown."""
+        estimate = cls.estimate(destination)
+        return {
+            "destination": destination,
+            "estimated_distance_km": estimate["distance_km"] if estimate else None,
+            "places": estimate["places"] if estimate else [],
+            "source": estimate["source"] if estimate else None,
+        }
+
+    @classmethod
+    def remember(cls, destination, distance_km):
+        """Store a hand-entered distance so the same destination is pre-filled next time."""
+        if not (math.isfinite(distance_km) and distance_km > 0):
+            raise ValueError(f"Distance must be a positive number, got {distance_km!r}.")
+        key = normalize(destination)[:1024]
+        if not key:
+            return
+        estimate = cls._lookup(key)
+        if estimate is not None and abs(estimate["distance_km"] - distance_km) < 1:
+            return  # the suggestion was accepted, nothing new to learn
+        RouteDistance.objects.update_or_create(
+            destination_key=key,
+            defaults={'distance_km': distance_km, 'places': [], 'source': RouteDistance.MANUAL, 'graph_version': ''},
+        )
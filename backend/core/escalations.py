@@ -0,0 +1,154 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from auth_app.models import User
+from core.models import (
+    HighCostTransportRequest, MaintenanceRequest, Notification, RefuelingRequest, RequestEscalation, ServiceRequest,
+    TransportRequest,
+)
+from core.services import NotificationService
+from core.sms import send_sms
+
+logger = logging.getLogger(__name__)
+
+
+class EscalationScheduler:
+    """
+    Reminds approvers about requests that have waited at their stage past the SLA.
+
+    Each request model is scanned on its (status, current_approver_role, updated_at) index
+    for pending/forwarded requests untouched since the cutoff and not escalated at their
+    current role yet. Every stale request gets a RequestEscalation row, and each approver
+    receives a single digest notification (and SMS) listing all of their stale requests.
+    """
+
+    REQUEST_MODELS = [TransportRequest, HighCostTransportRequest, MaintenanceRequest, RefuelingRequest, ServiceRequest]
+    OPEN_STATUSES = ['pending', 'forwarded']
+    MAX_LISTED = 10  # requests spelled out in a digest message
+
+    @staticmethod
+    def sla_hours(model):
+        return settings.ESCALATION_SLA_HOURS_BY_REQUEST_TYPE.get(model._meta.model_name, settings.ESCALATION_SLA_HOURS)
+
+    @classmethod
+    def stale_requests(cls, now=None, claim=False):
+        """
+        (model, content_type, request) for every open request past its SLA and not escalated at its role.
+
+        With `claim` (inside a transaction) the requests are locked, skipping any another run
+        holds, and checked against RequestEscalation again once locked, so overlapping runs
+        never both pick up a request.
+        """
+        now = now or timezone.now()
+        stale = []
+        for model in cls.REQUEST_MODELS:
+            content_type = ContentType.objects.get_for_model(model)
+            escalated = RequestEscalation.objects.filter(
+                content_type=content_type, object_id=OuterRef('pk'), approver_role=OuterRef('current_approver_role')
+            )
+            requests = model.objects.filter(
+                status__in=cls.OPEN_STATUSES,
+                updated_at__lt=now - timedelta(hours=cls.sla_hours(model)),
+            ).filter(~Exists(escalated))
+            if model is not ServiceRequest:  # service requests have no requester
+                requests = requests.select_related('requester__department__department_manager')
+            if claim:
+                requests = requests.select_for_update(skip_locked=True, of=('self',))
+            requests = list(requests.order_by('updated_at'))
+            if claim and requests:
+                # Escalated by a run that committed after our query started
+                done = set(RequestEscalation.objects.filter(
+                    content_type=content_type, object_id__in=[request_obj.pk for request_obj in requests]
+                ).values_list('object_id', 'approver_role'))
+                requests = [
+                    request_obj for request_obj in requests
+                    if (request_obj.pk, request_obj.current_approver_role) not in done
+                ]
+            stale += [(model, content_type, request_obj) for request_obj in requests]
+        return stale
+
+    @staticmethod
+    def approvers_for(request_obj, approvers_by_role):
+        """Users who can act on the request now: the requester's department manager, or everyone with the role."""
+        if request_obj.current_approver_role == User.DEPARTMENT_MANAGER:
+            requester = getattr(request_obj, 'requester', None)
+            department = requester.department if requester else None
+            manager = department.department_manager if department else None
+            return [manager] if manager and manager.is_active else []
+        return approvers_by_role.get(request_obj.current_approver_role, [])
+
+    @classmethod
+    def run(cls, now=None, dry_run=False):
+        """Escalate stale requests. Returns (requests escalated, digests sent)."""
+        now = now or timezone.now()
+        # Claimed requests stay locked until their escalations are recorded
+        with transaction.atomic():
+            stale = cls.stale_requests(now, claim=not dry_run)
+            if not stale:
+                return 0, 0
+
+            approvers_by_role = defaultdict(list)
+            for user in User.objects.filter(
+                is_active=True, role__in={request_obj.current_approver_role for _model, _ct, request_obj in stale}
+            ):
+                approvers_by_role[user.role].append(user)
+
+            digests = defaultdict(list)  # approver -> [(label, hours waiting, model name, id)]
+            for model, _content_type, request_obj in stale:
+                waiting = int((now - request_obj.updated_at).total_seconds() // 3600)
+                for approver in cls.approvers_for(request_obj, approvers_by_role):
+                    digests[approver].append((
+                        f"{model._meta.verbose_name.capitalize()} #{request_obj.pk}", waiting,
+                        model._meta.model_name, request_obj.pk,
+                    ))
+            if dry_run:
+                return len(stale), len(digests)
+
+            template = NotificationService.NOTIFICATION_TEMPLATES['escalation']
+            notifications, messages = [], []
+            for approver, items in digests.items():
+                items.sort(key=lambda item: -item[1])
+                listed = ", ".join(f"{label} ({hours}h)" for label, hours, _type, _id in items[:cls.MAX_LISTED])
+                if len(items) > cls.MAX_LISTED:
+                    listed += f" and {len(items) - cls.MAX_LISTED} more"
+                message = template['message'].format(count=len(items), requests=listed)
+                notifications.append(Notification(
+                    recipient=approver,
+                    notification_type='escalation',
+                    title=template['title'],
+                    message=message,
+                    priority=template['priority'],
+                    action_required=True,
+                    metadata={"requests": [
+                        {"request_type": request_type, "request_id": request_id, "waiting_hours": hours}
+                        for _label, hours, request_type, request_id in items
+                    ]},
+                ))
+                if approver.phone_number:
+                    messages.append((approver, message))
+
+            RequestEscalation.objects.bulk_create(
+                [
+                    RequestEscalation(
+                        content_type=content_type, object_id=request_obj.pk,
+                        approver_role=request_obj.current_approver_role, waiting_since=request_obj.updated_at,
+                    )
+                    for _model, content_type, request_obj in stale
+                ],
+                ignore_conflicts=True,
+            )
+            Notification.objects.bulk_create(notifications)
+
+        for approver, message in messages:
+            try:
+                send_sms(approver.phone_number, message)
+            except Exception as e:
+                logger.error(f"Failed to send SMS to {approver.full_name}: {e}")
+        return len(stale), len(notifications)
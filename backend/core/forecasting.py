@@ -0,0 +1,366 @@
+from datetime import date, timedelta
+
+import numpy as np
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Sum
+from django.utils import timezone
+
+from auth_app.models import Department
+from core.models import (
+    DemandForecast, HighCostTransportRequest, MaintenanceRequest, MonthlyKilometerLog, ServiceRequest,
+    TransportRequest, Vehicle,
+)
+from core.services import ServiceDueScanner
+
+
+def _month_index(year, month):
+    return year * 12 + (month - 1)
+
+
+def _month_start(index):
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class MaintenanceForecaster:
+    """
+    Fleet-wide usage and maintenance forecast.
+
+    Monthly kilometers from MonthlyKilometerLog are laid out as a vehicles x months
+    matrix and a linear usage trend is fitted for every vehicle at once (masked least
+    squares), which is then projected forward to estimate when each vehicle crosses
+    its service interval and how much maintenance/service spend to expect per quarter.
+    """
+
+    CACHE_KEY = "maintenance_forecast"
+    CACHE_TIMEOUT = 60 * 60 * 26  # recomputed nightly, keep a little slack
+    HORIZON_MONTHS = 36
+    QUARTERS = 4
+
+    @classmethod
+    def get(cls):
+        """Return the forecast from the shared reports cache, computing it on a miss."""
+        forecast = caches['reports'].get(cls.CACHE_KEY)
+        if forecast is None:
+            forecast = cls.refresh()
+        return forecast
+
+    @classmethod
+    def refresh(cls):
+        forecast = cls.compute()
+        caches['reports'].set(cls.CACHE_KEY, forecast, cls.CACHE_TIMEOUT)
+        return forecast
+
+    @classmethod
+    def compute(cls, today=None):
+        today = today or timezone.localdate()
+        current = _month_index(today.year, today.month)
+
+        vehicles = list(
+            Vehicle.objects.filter(is_deleted=False)
+            .only('id', 'license_plate', 'model', 'fuel_type', 'km_since_service')
+            .order_by('id')
+        )
+        if not vehicles:
+            return {"generated_at": timezone.now().isoformat(), "vehicles": [], "quarterly_spend": {}}
+
+        row_of = {vehicle.id: row for row, vehicle in enumerate(vehicles)}
+        logs = MonthlyKilometerLog.objects.filter(vehicle_id__in=row_of).values_list(
+            'vehicle_id', 'month', 'kilometers_driven'
+        )
+
+        rows, cols, values = [], [], []
+        for vehicle_id, month, kilometers in logs:
+            try:
+                year, month_number = (int(part) for part in month.split('-')[:2])
+            except ValueError:
+                continue
+            rows.append(row_of[vehicle_id])
+            cols.append(_month_index(year, month_number))
+            values.append(kilometers)
+
+        n = len(vehicles)
+        if cols:
+            first = min(cols)
+            width = current - first + 1
+            usage = np.zeros((n, width))
+            mask = np.zeros((n, width))
+            cols = np.asarray(cols) - first
+            keep = cols < width  # ignore logs dated in the future
+            usage[np.asarray(rows)[keep], cols[keep]] = np.asarray(values)[keep]
+            mask[np.asarray(rows)[keep], cols[keep]] = 1.0
+        else:
+            first, width = current, 1
+            usage = np.zeros((n, 1))
+            mask = np.zeros((n, 1))
+
+        intercept, slope = cls._fit_trend(usage, mask)
+        observed = mask.sum(axis=1)
+        average = np.divide(usage.sum(axis=1), observed, out=np.zeros(n), where=observed > 0)
+
+        # Projected km per month for the next HORIZON_MONTHS months (vehicles x horizon)
+        steps = np.arange(1, cls.HORIZON_MONTHS + 1)
+        projected = intercept[:, None] + slope[:, None] * (width - 1 + steps)[None, :]
+        projected = np.clip(projected, 0.0, None)
+
+        thresholds = np.array([ServiceDueScanner.threshold_for(vehicle) for vehicle in vehicles], dtype=float)
+        since_service = np.array([vehicle.km_since_service for vehicle in vehicles], dtype=float)
+        service_dates = cls._service_dates(projected, thresholds - since_service, current, today)
+
+        cost_per_km = cls._cost_per_km(vehicles, row_of, usage.sum(axis=1))
+        quarter_labels, quarter_spend = cls._quarterly_spend(projected, cost_per_km, current)
+
+        results = []
+        for row, vehicle in enumerate(vehicles):
+            results.append({
+                "vehicle_id": vehicle.id,
+                "license_plate": vehicle.license_plate,
+                "model": vehicle.model,
+                "months_observed": int(observed[row]),
+                "avg_monthly_km": round(float(average[row]), 2),
+                "trend_km_per_month": round(float(slope[row]), 2),
+                "km_since_service": vehicle.km_since_service,
+                "service_interval_km": float(thresholds[row]),
+                "projected_service_date": service_dates[row],
+                "quarterly_spend": {
+                    label: round(float(quarter_spend[row, i]), 2) for i, label in enumerate(quarter_labels)
+                },
+            })
+
+        return {
+            "generated_at": timezone.now().isoformat(),
+            "vehicles": results,
+            "quarterly_spend": {
+                label: round(float(quarter_spend[:, i].sum()), 2) for i, label in enumerate(quarter_labels)
+            },
+        }
+
+    @staticmethod
+    def _fit_trend(usage, mask):
+        """Masked least-squares line (km/month against month) for every row at once."""
+        x = np.arange(usage.shape[1], dtype=float)[None, :]
+        sw = mask.sum(axis=1)
+        sx = (mask * x).sum(axis=1)
+        sy = (mask * usage).sum(axis=1)
+        sxx = (mask * x * x).sum(axis=1)
+        sxy = (mask * x * usage).sum(axis=1)
+
+        denominator = sw * sxx - sx * sx
+        has_trend = denominator > 0  # at least two distinct months observed
+        slope = np.divide(sw * sxy - sx * sy, denominator, out=np.zeros_like(sw), where=has_trend)
+        mean = np.divide(sy, sw, out=np.zeros_like(sw), where=sw > 0)
+        intercept = np.where(
+            has_trend,
+            np.divide(sy - slope * sx, sw, out=np.zeros_like(sw), where=sw > 0),
+            mean,
+        )
+        return intercept, slope
+
+    @staticmethod
+    def _service_dates(projected, remaining, current, today):
+        """First projected date at which cumulative km covers the remaining km to service."""
+        cumulative = np.cumsum(projected, axis=1)
+        crosses = cumulative >= remaining[:, None]
+        first = crosses.argmax(axis=1)
+        reached = crosses.any(axis=1)
+
+        dates = []
+        for row in range(projected.shape[0]):
+            if remaining[row] <= 0:
+                dates.append(today.isoformat())
+                continue
+            if not reached[row]:
+                dates.append(None)
+                continue
+            month = first[row]
+            before = cumulative[row, month - 1] if month > 0 else 0.0
+            fraction = (remaining[row] - before) / projected[row, month]
+            month_start = _month_start(current + month + 1)
+            days = (_month_start(current + month + 2) - month_start).days
+            dates.append((month_start + timedelta(days=int(fraction * (days - 1)))).isoformat())
+        return dates
+
+    @staticmethod
+    def _cost_per_km(vehicles, row_of, logged_km):
+        """Historical approved maintenance + service cost per logged km, fleet average as fallback."""
+        cost = np.zeros(len(vehicles))
+        maintenance = (
+            MaintenanceRequest.objects.filter(status='approved', maintenance_total_cost__isnull=False)
+            .values('requesters_car').annotate(total=Sum('maintenance_total_cost'))
+        )
+        for entry in maintenance:
+            if entry['requesters_car'] in row_of:
+                cost[row_of[entry['requesters_car']]] += float(entry['total'])
+        services = (
+            ServiceRequest.objects.filter(status='approved', service_total_cost__isnull=False)
+            .values('vehicle').annotate(total=Sum('service_total_cost'))
+        )
+        for entry in services:
+            if entry['vehicle'] in row_of:
+                cost[row_of[entry['vehicle']]] += float(entry['total'])
+
+        fleet_rate = cost.sum() / logged_km.sum() if logged_km.sum() > 0 else 0.0
+        has_history = (logged_km > 0) & (cost > 0)
+        return np.where(has_history, np.divide(cost, logged_km, out=np.zeros_like(cost), where=logged_km > 0), fleet_rate)
+
+    @classmethod
+    def _quarterly_spend(cls, projected, cost_per_km, current):
+        """Expected spend per vehicle for the next QUARTERS calendar quarters (vehicles x quarters)."""
+        months = current + 1 + np.arange(projected.shape[1])
+        quarter_keys = (months // 12) * 4 + (months % 12) // 3
+        labels = []
+        spend = np.zeros((projected.shape[0], cls.QUARTERS))
+        for i, key in enumerate(np.unique(quarter_keys)[:cls.QUARTERS]):
+            labels.append(f"{key // 4}-Q{key % 4 + 1}")
+            spend[:, i] = (projected[:, quarter_keys == key] * cost_per_km[:, None]).sum(axis=1)
+        return labels, spend
+
+
+class DemandForecaster:
+    """
+    Vehicles needed per department per day for the next HORIZON_WEEKS weeks.
+
+    Transport and high-cost requests that were not rejected are spread over the days they
+    hold a vehicle (start_day to return_day), sized by passengers over the fleet's average
+    seat capacity and laid out as a departments x days matrix. Each department's recent
+    level is then scaled by its weekday and week-of-year profiles, shrunk towards flat
+    where history is thin. Results are stored in DemandForecast and served from the shared
+    reports cache for as long as the stored rows are unchanged.
+    """
+
+    CACHE_KEY = "demand_forecast"
+    CACHE_TIMEOUT = 60 * 10  # the payload also carries live fleet counts
+    HISTORY_DAYS = 2 * 365
+    LEVEL_DAYS = 8 * 7
+    HORIZON_WEEKS = 8
+    SHRINKAGE_DAYS = 7  # a seasonal factor seen on this many days gets half its own weight
+
+    @classmethod
+    def get(cls):
+        """Return the cached forecast unless the stored rows were regenerated since, reading them otherwise."""
+        generated_at = DemandForecast.objects.aggregate(latest=Max('generated_at'))['latest']
+        cached = caches['reports'].get(cls.CACHE_KEY)
+        if cached is None or cached['generated_at'] != generated_at:
+            cached = {'generated_at': generated_at, 'forecast': cls.serve()}
+            caches['reports'].set(cls.CACHE_KEY, cached, cls.CACHE_TIMEOUT)
+        return cached['forecast']
+
+    @classmethod
+    def refresh(cls, today=None):
+        rows = cls.compute(today)
+        with transaction.atomic():
+            DemandForecast.objects.all().delete()
+            DemandForecast.objects.bulk_create(rows, batch_size=1000)
+        caches['reports'].delete(cls.CACHE_KEY)
+        return rows
+
+    @classmethod
+    def compute(cls, today=None):
+        """Unsaved DemandForecast rows for every department with request history."""
+        today = today or timezone.localdate()
+        history_start = today - timedelta(days=cls.HISTORY_DAYS)
+        seats = Vehicle.objects.filter(is_deleted=False).aggregate(seats=Avg('capacity'))['seats'] or 4
+
+        trips = []
+        for model in (TransportRequest, HighCostTransportRequest):
+            trips += list(
+                model.objects.exclude(status='rejected')
+                .filter(start_day__gte=history_start, start_day__lt=today)
+                .annotate(passengers=Count('employees', distinct=True))
+                .values_list('requester__department_id', 'start_day', 'return_day', 'passengers')
+            )
+        if not trips:
+            return []
+
+        departments = sorted({department or 0 for department, _start, _return, _passengers in trips})
+        row_of = {department: row for row, department in enumerate(departments)}
+        first_day = min(start for _department, start, _return, _passengers in trips)
+        width = (today - first_day).days
+
+        # Vehicles in use per department per day, via a difference array over each trip's days
+        rows = np.array([row_of[department or 0] for department, _start, _return, _passengers in trips])
+        starts = np.array([(start - first_day).days for _department, start, _return, _passengers in trips])
+        ends = np.array([(max(start, min(end, today - timedelta(days=1))) - first_day).days
+                         for _department, start, end, _passengers in trips])
+        vehicles = np.ceil(np.maximum(np.array([passengers for *_trip, passengers in trips], dtype=float), 1) / seats)
+        change = np.zeros((len(departments), width + 1))
+        np.add.at(change, (rows, starts), vehicles)
+        np.add.at(change, (rows, ends + 1), -vehicles)
+        demand = np.cumsum(change, axis=1)[:, :width]
+
+        history_days = [first_day + timedelta(days=offset) for offset in range(width)]
+        weekday_factor = cls._profile(demand, np.array([day.weekday() for day in history_days]), 7)
+        week_factor = cls._profile(demand, np.array([day.isocalendar()[1] for day in history_days]), 54)
+
+        recent = slice(max(width - cls.LEVEL_DAYS, 0), width)
+        recent_days = history_days[recent]
+        recent_seasonal = cls._seasonal(weekday_factor, week_factor, recent_days)
+        seasonal_sum = recent_seasonal.sum(axis=1)
+        level = np.divide(demand[:, recent].sum(axis=1), seasonal_sum,
+                          out=np.zeros(len(departments)), where=seasonal_sum > 0)
+
+        future_days = [today + timedelta(days=offset) for offset in range(cls.HORIZON_WEEKS * 7)]
+        forecast = level[:, None] * cls._seasonal(weekday_factor, week_factor, future_days)
+
+        generated_at = timezone.now()
+        return [
+            DemandForecast(
+                department_id=department or None, day=day,
+                vehicles=round(float(forecast[row, column]), 2), generated_at=generated_at,
+            )
+            for row, department in enumerate(departments)
+            for column, day in enumerate(future_days)
+        ]
+
+    @classmethod
+    def _profile(cls, demand, keys, size):
+        """Mean demand per key relative to each department's overall mean (departments x size), shrunk to 1."""
+        counts = np.bincount(keys, minlength=size).astype(float)
+        sums = np.zeros((size, demand.shape[0]))
+        np.add.at(sums, keys, demand.T)
+        means = np.divide(sums.T, counts, out=np.zeros((demand.shape[0], size)), where=counts > 0)
+        overall = demand.mean(axis=1)[:, None]
+        ratio = np.divide(means, overall, out=np.ones_like(means), where=overall > 0)
+        weight = counts / (counts + cls.SHRINKAGE_DAYS)
+        return 1 + weight * (ratio - 1)
+
+    @staticmethod
+    def _seasonal(weekday_factor, week_factor, days):
+        weekdays = [day.weekday() for day in days]
+        weeks = [day.isocalendar()[1] for day in days]
+        return weekday_factor[:, weekdays] * week_factor[:, weeks]
+
+    @classmethod
+    def serve(cls):
+        """Stored forecast shaped for the dashboard, with fleet totals against the organization's own vehicles."""
+        rows = list(DemandForecast.objects.values_list('department_id', 'day', 'vehicles', 'generated_at'))
+        days = sorted({day for _department, day, _vehicles, _generated in rows})
+        column_of = {day: column for column, day in enumerate(days)}
+        department_ids = sorted({department for department, *_rest in rows}, key=lambda department: department or 0)
+        names = dict(Department.objects.filter(id__in=[d for d in department_ids if d]).values_list('id', 'name'))
+
+        series = {department: [0.0] * len(days) for department in department_ids}
+        for department, day, vehicles, _generated in rows:
+            series[department][column_of[day]] = vehicles
+        total = np.array([series[department] for department in department_ids]).sum(axis=0) if rows else np.zeros(0)
+
+        own_fleet = Vehicle.objects.filter(is_deleted=False, source=Vehicle.ORGANIZATION_OWNED).count()
+        rented_fleet = Vehicle.objects.filter(is_deleted=False, source=Vehicle.RENTED).count()
+        needed = np.ceil(total - 1e-9)
+        return {
+            "generated_at": rows[0][3].isoformat() if rows else None,
+            "days": [day.isoformat() for day in days],
+            "own_fleet": own_fleet,
+            "rented_fleet": rented_fleet,
+            "departments": [
+                {
+                    "department_id": department,
+                    "department": names.get(department, "Unassigned"),
+                    "vehicles": series[department],
+                }
+                for department in department_ids
+            ],
+            "total_vehicles": np.round(total, 2).tolist(),
+            "rentals_needed": np.maximum(needed - own_fleet, 0).astype(int).tolist(),
+            "peak_vehicles": int(needed.max()) if rows else 0,
+        }
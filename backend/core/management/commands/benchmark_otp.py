@@ -0,0 +1,62 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from auth_app.models import User
+from core.otp_manager import MAX_ATTEMPTS, CacheOTPBackend, OTPManager
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure OTP issue/verify throughput and database queries per operation for each OTP backend, "
+        "using throwaway users. Everything written is rolled back afterwards; no SMS is sent."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', choices=list(OTPManager.BACKENDS) + ['all'], default='all')
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--wrong-guesses', type=int, default=1, help="Wrong guesses before the right code (default 1).")
+
+    def handle(self, *args, **options):
+        backends = list(OTPManager.BACKENDS) if options['backend'] == 'all' else [options['backend']]
+        for name in backends:
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(email=f"otp-benchmark-{index}@example.invalid", full_name="OTP benchmark", phone_number="0")
+                    for index in range(options['users'])
+                ])
+                backend = OTPManager.BACKENDS[name]
+                try:
+                    operations, elapsed, queries, failures = self._run(backend, users, options['wrong_guesses'])
+                finally:
+                    if backend is CacheOTPBackend:  # don't leave codes or lockouts behind for the rolled back ids
+                        cache.delete_many([key for user in users for key in CacheOTPBackend._keys(user)])
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f"{name:<6} {operations / elapsed:9.0f} ops/s, {elapsed / operations * 1e6:7.1f} µs/op, "
+                f"{queries / operations:.1f} queries/op over {operations} operation(s)"
+            )
+            if failures:
+                self.stdout.write(self.style.WARNING(
+                    f"       {failures} correct code(s) were rejected (locked out after {MAX_ATTEMPTS} wrong guesses)."
+                ))
+        self.stdout.write(self.style.SUCCESS("Done."))
+
+    @staticmethod
+    def _run(backend, users, wrong_guesses):
+        """Issue a code per user, guess wrong, then verify the right code: (operations, seconds, queries, failures)."""
+        failures = 0
+        with CaptureQueriesContext(connection) as captured:
+            began = time.perf_counter()
+            for index, user in enumerate(users):
+                code = f"{100000 + index % 900000}"
+                backend.issue(user, code)
+                for _ in range(wrong_guesses):
+                    backend.verify(user, "000000")
+                valid, _error = backend.verify(user, code)
+                failures += not valid
+            elapsed = time.perf_counter() - began
+        return len(users) * (2 + wrong_guesses), elapsed, len(captured.captured_queries), failures
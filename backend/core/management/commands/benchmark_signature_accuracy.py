@@ -0,0 +1,132 @@
+import io
+import resource
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from core.signatures import SignatureTemplateStack, signature_features, signature_similarity
+from core.signature_benchmark import SyntheticSignatures
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure signature verification latency, memory and accuracy on synthetic genuine, skilled-forgery "
+        "and random-forgery pairs. Reports p50/p99 latency per comparison, peak memory, and the false "
+        "acceptance (FAR) and false rejection (FRR) rates for each threshold."
+    )
+
+    BACKENDS = ['orb_ssim', 'siamese']
+    CURRENT_THRESHOLD = 35
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', choices=self.BACKENDS + ['all'], default='all')
+        parser.add_argument('--writers', type=int, default=20, help="Synthetic writers (default 20).")
+        parser.add_argument('--samples', type=int, default=5, help="Pairs of each kind per writer (default 5).")
+        parser.add_argument('--templates', type=int, default=1, help="Enrolled signatures per writer (default 1).")
+        parser.add_argument('--thresholds', default='20,25,30,35,40,45,50,55,60',
+                            help="Comma separated similarity thresholds (0-100).")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            thresholds = sorted({float(value) for value in options['thresholds'].split(',')})
+        except ValueError:
+            raise CommandError("--thresholds must be comma separated numbers.")
+        pairs = SyntheticSignatures(options['seed']).pairs(options['writers'], options['samples'], options['templates'])
+        self.stdout.write(
+            f"{len(pairs)} pair(s): {sum(kind == 'genuine' for _r, _c, kind in pairs)} genuine, "
+            f"{sum(kind == 'skilled' for _r, _c, kind in pairs)} skilled forgeries, "
+            f"{sum(kind == 'random' for _r, _c, kind in pairs)} random forgeries."
+        )
+
+        backends = self.BACKENDS if options['backend'] == 'all' else [options['backend']]
+        for backend in backends:
+            score = getattr(self, f'_{backend}_scorer')()
+            if score is None:
+                self.stdout.write(self.style.WARNING(f"\n{backend}: unavailable, skipped."))
+                continue
+            self._report(backend, *self._run(score, pairs), thresholds)
+
+    @staticmethod
+    def _run(score, pairs):
+        """Score every pair; returns (scores, kinds, per-comparison seconds, traced peak bytes, RSS growth KB)."""
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        tracemalloc.start()
+        scores, kinds, times = [], [], []
+        for reference, candidate, kind in pairs:
+            began = time.perf_counter()
+            scores.append(score(reference, candidate))
+            times.append(time.perf_counter() - began)
+            kinds.append(kind)
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+        return np.asarray(scores), np.asarray(kinds), np.asarray(times), peak, rss_growth
+
+    def _report(self, backend, scores, kinds, times, peak, rss_growth, thresholds):
+        times = times * 1000
+        self.stdout.write(f"\n{backend}")
+        self.stdout.write(
+            f"  latency p50 {np.percentile(times, 50):.2f} ms, p99 {np.percentile(times, 99):.2f} ms; "
+            f"peak traced memory {peak / 1024:.0f} KB, max RSS growth {rss_growth} KB"
+        )
+        for kind in ('genuine', 'skilled', 'random'):
+            kind_scores = scores[kinds == kind]
+            self.stdout.write(
+                f"  {kind:<8} similarity mean {kind_scores.mean():.1f}, "
+                f"min {kind_scores.min():.1f}, max {kind_scores.max():.1f}"
+            )
+
+        genuine, skilled, random = scores[kinds == 'genuine'], scores[kinds == 'skilled'], scores[kinds == 'random']
+        self.stdout.write(f"  {'threshold':>9}  {'FRR':>6}  {'FAR skilled':>11}  {'FAR random':>10}")
+        best = None
+        for threshold in thresholds:
+            # A comparison passes when similarity >= threshold, as in signature_similarity
+            frr = np.mean(genuine < threshold)
+            far_skilled, far_random = np.mean(skilled >= threshold), np.mean(random >= threshold)
+            marker = "  <- current" if threshold == self.CURRENT_THRESHOLD else ""
+            self.stdout.write(
+                f"  {threshold:>9g}  {frr:>6.1%}  {far_skilled:>11.1%}  {far_random:>10.1%}{marker}"
+            )
+            error = max(frr, far_skilled)
+            if best is None or error < best[0]:
+                best = (error, threshold)
+        self.stdout.write(self.style.SUCCESS(
+            f"  Lowest max(FRR, skilled FAR) {best[0]:.1%} at threshold {best[1]:g}."
+        ))
+
+    @staticmethod
+    def _orb_ssim_scorer():
+        """The production path: precomputed reference templates, ORB + SSIM against the candidate, best score."""
+        stacks = {}  # stored signatures are compared from precomputed features, as in SignatureTemplates
+
+        def score(references, candidate):
+            if id(references) not in stacks:
+                stacks[id(references)] = SignatureTemplateStack([signature_features(img) for img in references])
+            return signature_similarity(stacks[id(references)], candidate)[0]
+        return score
+
+    @staticmethod
+    def _siamese_scorer():
+        """The Siamese model in core/signature_model.py, scaled to 0-100; None while it is not usable."""
+        try:
+            from core import signature_model
+        except ImportError:
+            return None
+        compare = getattr(signature_model, 'compare_signatures_with_model', None)
+        if compare is None:
+            return None
+
+        def score(references, candidate):
+            # The model opens its inputs with PIL, which takes file objects as well as paths
+            return max(
+                float(compare(
+                    io.BytesIO(cv2.imencode('.png', reference)[1].tobytes()),
+                    io.BytesIO(cv2.imencode('.png', candidate)[1].tobytes()),
+                )) * 100
+                for reference in references
+            )
+        return score
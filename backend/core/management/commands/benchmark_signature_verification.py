@@ -0,0 +1,82 @@
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+
+from core.signatures import compare_signatures, decode_signature_upload, signature_features, signature_similarity
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare signature verification latency of the old path (upload copied to a temp file, both "
+        "images read from disk and processed) with the in-memory path (upload decoded from its buffer, "
+        "stored signature from its precomputed template). Synthetic signatures are used unless images "
+        "are given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reference', help="Stored signature image file.")
+        parser.add_argument('--upload', help="Uploaded signature image file.")
+        parser.add_argument('--runs', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if bool(options['reference']) != bool(options['upload']):
+            raise CommandError("Give both --reference and --upload, or neither.")
+        if options['reference']:
+            with open(options['reference'], 'rb') as handle:
+                reference = handle.read()
+            with open(options['upload'], 'rb') as handle:
+                upload = handle.read()
+        else:
+            reference, upload = self._synthetic(jitter=0), self._synthetic(jitter=2)
+
+        runs = options['runs']
+        with tempfile.TemporaryDirectory() as directory:
+            reference_path = os.path.join(directory, 'reference.png')
+            with open(reference_path, 'wb') as handle:
+                handle.write(reference)
+
+            old_times = []
+            for _ in range(runs):
+                uploaded = SimpleUploadedFile('signature.png', upload)
+                began = time.perf_counter()
+                with tempfile.NamedTemporaryFile(delete=False, suffix='.png', dir=directory) as temp_file:
+                    for chunk in uploaded.chunks():
+                        temp_file.write(chunk)
+                old_result = compare_signatures(reference_path, temp_file.name)
+                old_times.append(time.perf_counter() - began)
+
+            features = signature_features(cv2.imdecode(np.frombuffer(reference, dtype=np.uint8), cv2.IMREAD_GRAYSCALE))
+            new_times = []
+            for _ in range(runs):
+                uploaded = SimpleUploadedFile('signature.png', upload)
+                began = time.perf_counter()
+                new_result = signature_similarity(features, decode_signature_upload(uploaded))
+                new_times.append(time.perf_counter() - began)
+
+        self.stdout.write(f"Old path: {self._summary(old_times)}, one temp file written per run.")
+        self.stdout.write(f"New path: {self._summary(new_times)}, no temp files.")
+        self.stdout.write(f"Similarity old {old_result[0]:.2f} / new {new_result[0]:.2f}.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Median speed-up {np.median(old_times) / np.median(new_times):.1f}x over {runs} run(s)."
+        ))
+
+    @staticmethod
+    def _summary(times):
+        times = np.asarray(times) * 1000
+        return f"median {np.median(times):.2f} ms, p95 {np.percentile(times, 95):.2f} ms"
+
+    @staticmethod
+    def _synthetic(jitter):
+        """A pen stroke drawn as a random walk, encoded as PNG; `jitter` perturbs the same stroke."""
+        rng = np.random.default_rng(1)
+        points = np.cumsum(rng.normal(0, 12, (40, 2)), axis=0) + [300, 100]
+        if jitter:
+            points += np.random.default_rng(2).normal(0, jitter, points.shape)
+        img = np.full((200, 600), 255, dtype=np.uint8)
+        cv2.polylines(img, [points.astype(np.int32).reshape(-1, 1, 2)], False, 0, 3)
+        return cv2.imencode('.png', img)[1].tobytes()
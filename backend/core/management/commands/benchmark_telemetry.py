@@ -0,0 +1,80 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import TelemetryPoint, Vehicle, VehicleTelemetryHourly
+from core.telemetry import TelemetryWriter
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure telemetry write throughput and storage growth with synthetic points for existing "
+        "vehicles. Everything written is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=60000, help="Total points to write.")
+        parser.add_argument('--vehicles', type=int, default=100, help="Number of vehicles to spread points over.")
+        parser.add_argument('--batch', type=int, default=2000, help="Points per flush (TELEMETRY_FLUSH_SIZE).")
+
+    def handle(self, *args, **options):
+        readings = dict(
+            Vehicle.objects.filter(is_deleted=False).values_list('id', 'odometer_km')[:options['vehicles']]
+        )
+        if not readings:
+            raise CommandError("Benchmark needs at least one vehicle.")
+        vehicle_ids = list(readings)
+
+        total, batch_size = options['points'], options['batch']
+        start = timezone.now() - timedelta(hours=6)
+        odometer = {vehicle_id: reading or random.uniform(10000, 200000) for vehicle_id, reading in readings.items()}
+
+        with transaction.atomic():
+            size_before = self._storage_bytes()
+            rows_before = TelemetryPoint.objects.count(), VehicleTelemetryHourly.objects.count()
+
+            elapsed = 0.0
+            for offset in range(0, total, batch_size):
+                points = []
+                for i in range(offset, min(offset + batch_size, total)):
+                    vehicle_id = vehicle_ids[i % len(vehicle_ids)]
+                    odometer[vehicle_id] += random.uniform(0, 0.5)
+                    points.append(TelemetryPoint(
+                        vehicle_id=vehicle_id,
+                        recorded_at=start + timedelta(seconds=i * 6 * 3600 / total),
+                        odometer_km=odometer[vehicle_id],
+                        latitude=random.uniform(3.4, 14.9),
+                        longitude=random.uniform(33.0, 48.0),
+                    ))
+                began = time.perf_counter()
+                TelemetryWriter.write(points)
+                elapsed += time.perf_counter() - began
+
+            raw_rows = TelemetryPoint.objects.count() - rows_before[0]
+            hourly_rows = VehicleTelemetryHourly.objects.count() - rows_before[1]
+            size_after = self._storage_bytes()
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Wrote {total} point(s) for {len(vehicle_ids)} vehicle(s) in {elapsed:.2f}s "
+                          f"({total / elapsed:,.0f} points/s, {total / elapsed * 60:,.0f} points/min).")
+        self.stdout.write(f"Rows added: {raw_rows} raw, {hourly_rows} hourly.")
+        if size_before is not None:
+            grown = size_after - size_before
+            self.stdout.write(f"Storage grew by {grown / 1024:,.0f} KiB ({grown / max(raw_rows, 1):.0f} bytes/point).")
+        self.stdout.write(self.style.SUCCESS("Benchmark finished, changes rolled back."))
+
+    @staticmethod
+    def _storage_bytes():
+        """Total on-disk size of the telemetry tables (PostgreSQL only)."""
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_total_relation_size(%s) + pg_total_relation_size(%s)",
+                [TelemetryPoint._meta.db_table, VehicleTelemetryHourly._meta.db_table],
+            )
+            return cursor.fetchone()[0]
@@ -0,0 +1,78 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+STARTUP_SCRIPT = """
+import json, sys, time
+began = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({"seconds": time.perf_counter() - began, "modules": sorted(sys.modules)}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Time django.setup() plus URL loading in fresh interpreters (python -X importtime) and fail "
+        "when the median exceeds STARTUP_TIME_BUDGET_MS or a module in STARTUP_FORBIDDEN_MODULES "
+        "(OpenCV and other heavy libraries that should only load on use) gets imported."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget-ms', type=float, default=settings.STARTUP_TIME_BUDGET_MS)
+        parser.add_argument('--runs', type=int, default=3)
+        parser.add_argument('--top', type=int, default=10, help="Slowest top-level packages to list.")
+
+    def handle(self, *args, **options):
+        timings, package_times = [], defaultdict(list)
+        for _ in range(max(options['runs'], 1)):
+            seconds, modules, imports = self._measure()
+            timings.append(seconds * 1000)
+            for package, microseconds in imports.items():
+                package_times[package].append(microseconds / 1000)
+
+        median = statistics.median(timings)
+        self.stdout.write(f"Startup {median:.0f} ms median over {len(timings)} run(s) (budget {options['budget_ms']:.0f} ms).")
+        self.stdout.write("Slowest packages by import time:")
+        slowest = sorted(package_times.items(), key=lambda item: -statistics.median(item[1]))[:options['top']]
+        for package, times in slowest:
+            self.stdout.write(f"  {package:<28} {statistics.median(times):8.1f} ms")
+
+        problems = []
+        if median > options['budget_ms']:
+            problems.append(f"startup took {median:.0f} ms, over the {options['budget_ms']:.0f} ms budget")
+        loaded = sorted(name for name in settings.STARTUP_FORBIDDEN_MODULES if name in modules)
+        if loaded:
+            problems.append(f"{', '.join(loaded)} imported at startup")
+        if problems:
+            raise CommandError("Startup check failed: " + "; ".join(problems) + ".")
+        self.stdout.write(self.style.SUCCESS("Startup is within budget."))
+
+    @staticmethod
+    def _measure():
+        """(seconds, loaded module names, self import time in µs per top-level package) from one fresh process."""
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR, env=os.environ.copy(), capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Startup script failed:\n{result.stderr[-2000:]}")
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+
+        imports = defaultdict(int)
+        for line in result.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package"
+            if not line.startswith('import time:'):
+                continue
+            self_us, _cumulative, name = line[len('import time:'):].split('|')
+            if self_us.strip().isdigit():
+                imports[name.strip().split('.')[0]] += int(self_us)
+        return report['seconds'], set(report['modules']), imports
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.escalations import EscalationScheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Send one reminder digest per approver for pending/forwarded requests that have waited at their "
+        "stage longer than ESCALATION_SLA_HOURS. Each request is escalated once per approver role. "
+        "Run hourly (e.g. from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be escalated without notifying.")
+
+    def handle(self, *args, **options):
+        escalated, digests = EscalationScheduler.run(dry_run=options['dry_run'])
+        if not escalated:
+            self.stdout.write("No stale requests.")
+            return
+        verb = "Would escalate" if options['dry_run'] else "Escalated"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {escalated} request(s) in {digests} digest(s)."))
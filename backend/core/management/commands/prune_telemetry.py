@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.telemetry import TelemetryWriter
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete raw telemetry points older than TELEMETRY_RAW_RETENTION_DAYS. Hourly aggregates "
+        "are kept. Run daily (e.g. from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.TELEMETRY_RAW_RETENTION_DAYS)
+
+    def handle(self, *args, **options):
+        deleted = TelemetryWriter.prune(timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} raw telemetry point(s)."))
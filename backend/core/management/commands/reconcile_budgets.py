@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+
+from core.budgets import BudgetLedger
+from core.models import DepartmentBudget
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay each department budget's ledger and compare it with the stored balance, and list "
+        "approved requests that were never charged. With --fix, stored balances are reset to the "
+        "replayed values and missing charges are posted. Run nightly (e.g. from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fiscal-year', type=int, help="Only this fiscal year (default: current).")
+        parser.add_argument('--fix', action='store_true')
+
+    def handle(self, *args, **options):
+        fiscal_year = options['fiscal_year'] or BudgetLedger.fiscal_year()
+        fix = options['fix']
+        problems = 0
+
+        for budget in DepartmentBudget.objects.select_related('department').filter(fiscal_year=fiscal_year):
+            balance, allocated, bad_entries = BudgetLedger.replay(budget)
+            if bad_entries:
+                problems += 1
+                self.stdout.write(self.style.WARNING(
+                    f"{budget.department.name}: {len(bad_entries)} entr(ies) with an inconsistent running balance, "
+                    f"first #{bad_entries[0]}."
+                ))
+            if (budget.balance, budget.allocated) != (balance, allocated):
+                problems += 1
+                self.stdout.write(self.style.WARNING(
+                    f"{budget.department.name}: stored balance {budget.balance} / allocated {budget.allocated}, "
+                    f"ledger says {balance} / {allocated}."
+                ))
+                if fix:
+                    BudgetLedger.rebuild(budget)
+
+        for request_obj, day in BudgetLedger.uncharged_requests(fiscal_year):
+            problems += 1
+            self.stdout.write(self.style.WARNING(
+                f"{request_obj._meta.verbose_name.capitalize()} #{request_obj.pk} was approved but never charged."
+            ))
+            if fix:
+                BudgetLedger.charge(request_obj, day=day)
+
+        if not problems:
+            self.stdout.write(self.style.SUCCESS(f"Budgets for fiscal year {fiscal_year} reconcile."))
+        elif fix:
+            self.stdout.write(self.style.SUCCESS(f"Fixed {problems} problem(s) in fiscal year {fiscal_year}."))
+        else:
+            self.stdout.write(self.style.ERROR(f"{problems} problem(s) in fiscal year {fiscal_year}; rerun with --fix."))
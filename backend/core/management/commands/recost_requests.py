@@ -0,0 +1,89 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import HighCostTransportRequest, RefuelingRequest
+from core.services import FuelCostEstimator, FuelPriceBook, RefuelingEstimator
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute fuel price, liters and total cost of refueling and high-cost requests created "
+        "in a date range from the FuelPrice table (price in effect on the day each request was made)."
+    )
+    BATCH_SIZE = 500
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, help="First creation day (YYYY-MM-DD).")
+        parser.add_argument('--end', required=True, help="Last creation day (YYYY-MM-DD).")
+        parser.add_argument('--type', choices=['refueling', 'highcost', 'all'], default='all')
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change without saving.")
+
+    def handle(self, *args, **options):
+        try:
+            start, end = date.fromisoformat(options['start']), date.fromisoformat(options['end'])
+        except ValueError:
+            raise CommandError("Dates must be in YYYY-MM-DD format.")
+        if start > end:
+            raise CommandError("--start must not be after --end.")
+
+        targets = []
+        if options['type'] in ('refueling', 'all'):
+            targets.append((RefuelingRequest, 'requesters_car', RefuelingEstimator.TRIP_FACTOR))
+        if options['type'] in ('highcost', 'all'):
+            targets.append((HighCostTransportRequest, 'estimated_vehicle', 1))
+
+        for model, vehicle_field, factor in targets:
+            updated, skipped = self.recost(model, vehicle_field, factor, start, end, options['dry_run'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{model.__name__}: {'would update' if options['dry_run'] else 'updated'} {updated}, "
+                f"skipped {skipped} (no distance, fuel efficiency or price)."
+            ))
+
+    def recost(self, model, vehicle_field, factor, start, end, dry_run):
+        queryset = (
+            model.objects.filter(created_at__date__range=(start, end), estimated_distance_km__isnull=False)
+            .select_related(vehicle_field)
+            .order_by('pk')
+        )
+        updated = skipped = 0
+        batch = []
+        for request in queryset.iterator(chunk_size=self.BATCH_SIZE):
+            batch.append(request)
+            if len(batch) == self.BATCH_SIZE:
+                done = self.recost_batch(model, batch, vehicle_field, factor, dry_run)
+                updated, skipped = updated + done, skipped + len(batch) - done
+                batch = []
+        if batch:
+            done = self.recost_batch(model, batch, vehicle_field, factor, dry_run)
+            updated, skipped = updated + done, skipped + len(batch) - done
+        return updated, skipped
+
+    def recost_batch(self, model, batch, vehicle_field, factor, dry_run):
+        vehicles = [getattr(request, vehicle_field) for request in batch]
+        prices = [
+            FuelPriceBook.price_at(vehicle.fuel_type, request.created_at.date()) if vehicle else None
+            for request, vehicle in zip(batch, vehicles)
+        ]
+        liters, cost = FuelCostEstimator.estimate_pairs(
+            [request.estimated_distance_km for request in batch],
+            [vehicle.fuel_efficiency if vehicle else None for vehicle in vehicles],
+            prices,
+            factor,
+        )
+
+        changed = []
+        for request, price, fuel_needed, total_cost in zip(batch, prices, liters.tolist(), cost.tolist()):
+            if price is None or fuel_needed != fuel_needed:  # NaN: no usable fuel efficiency
+                continue
+            request.fuel_price_per_liter = price
+            request.fuel_needed_liters = Decimal(str(round(fuel_needed, 2)))
+            request.total_cost = Decimal(str(round(total_cost, 2)))
+            changed.append(request)
+
+        if changed and not dry_run:
+            with transaction.atomic():
+                model.objects.bulk_update(changed, ['fuel_price_per_liter', 'fuel_needed_liters', 'total_cost'])
+        return len(changed)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.forecasting import DemandForecaster
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-department vehicle demand forecast for the next weeks and store it. "
+        "Run nightly (e.g. from cron)."
+    )
+
+    def handle(self, *args, **options):
+        rows = DemandForecaster.refresh()
+        departments = len({row.department_id for row in rows})
+        self.stdout.write(self.style.SUCCESS(
+            f"Demand forecast refreshed for {departments} department(s), {len(rows)} row(s) stored."
+        ))
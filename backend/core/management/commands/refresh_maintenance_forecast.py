@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.forecasting import MaintenanceForecaster
+
+
+class Command(BaseCommand):
+    help = "Recompute the fleet maintenance forecast and store it in the shared reports cache. Run nightly (e.g. from cron)."
+
+    def handle(self, *args, **options):
+        forecast = MaintenanceForecaster.refresh()
+        self.stdout.write(self.style.SUCCESS(
+            f"Forecast refreshed for {len(forecast['vehicles'])} vehicle(s)."
+        ))
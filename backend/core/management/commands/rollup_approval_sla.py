@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.sla import ApprovalSLARollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure time-in-stage for approval actions logged since the last run and refresh the "
+        "monthly SLA percentiles they affect. Run hourly or nightly (e.g. from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rebuild from the whole action log.")
+
+    def handle(self, *args, **options):
+        timings, monthly = ApprovalSLARollup.refresh(full=options['full'])
+        if not timings:
+            self.stdout.write("Nothing to roll up.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Measured {timings} approval action(s), refreshed {monthly} monthly SLA row(s)."
+        ))
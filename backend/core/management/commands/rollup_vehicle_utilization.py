@@ -0,0 +1,33 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utilization import UtilizationRollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll vehicle status events up into daily utilization rows. By default only days "
+        "not rolled up yet (through yesterday) are processed. Run daily (e.g. from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="Rebuild from this day (YYYY-MM-DD).")
+        parser.add_argument('--end', help="Rebuild through this day (YYYY-MM-DD), defaults to yesterday.")
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start']) if options['start'] else None
+            end = date.fromisoformat(options['end']) if options['end'] else None
+        except ValueError:
+            raise CommandError("Dates must be in YYYY-MM-DD format.")
+
+        pending_start, pending_end = UtilizationRollup.pending_range(until=end)
+        start = start or pending_start
+        written = UtilizationRollup.build(start, pending_end)
+        if not written:
+            self.stdout.write("Nothing to roll up.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled up {written} vehicle-day row(s) from {start} to {pending_end}."
+        ))
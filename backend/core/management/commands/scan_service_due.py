@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.services import ServiceDueScanner
+
+
+class Command(BaseCommand):
+    help = "Scan the fleet for vehicles due for service and alert once per service cycle. Run periodically (e.g. from cron)."
+
+    def handle(self, *args, **options):
+        alerted = ServiceDueScanner.scan()
+        self.stdout.write(self.style.SUCCESS(f"{alerted} vehicle(s) alerted for service."))
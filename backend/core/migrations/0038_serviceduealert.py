@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_alter_vehicle_driver'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceDueAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service_cycle_km', models.FloatField(help_text='last_service_kilometers of the cycle this alert belongs to.')),
+                ('kilometers_at_alert', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='service_due_alerts', to='core.vehicle')),
+            ],
+            options={
+                'unique_together': {('vehicle', 'service_cycle_km')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:30
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_km_since_service(apps, schema_editor):
+    Vehicle = apps.get_model('core', 'Vehicle')
+    Vehicle.objects.update(km_since_service=F('total_kilometers') - F('last_service_kilometers'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_serviceduealert'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='km_since_service',
+            field=models.FloatField(db_index=True, default=0.0),
+        ),
+        migrations.RunPython(backfill_km_since_service, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_latest_requests(apps, schema_editor):
+    Vehicle = apps.get_model('core', 'Vehicle')
+    ServiceRequest = apps.get_model('core', 'ServiceRequest')
+    MaintenanceRequest = apps.get_model('core', 'MaintenanceRequest')
+
+    latest_service = ServiceRequest.objects.filter(vehicle=OuterRef('pk')).order_by('-created_at', '-pk')
+    latest_maintenance = MaintenanceRequest.objects.filter(requesters_car=OuterRef('pk')).order_by('-created_at', '-pk')
+    Vehicle.objects.update(
+        latest_service_request=Subquery(latest_service.values('pk')[:1]),
+        latest_service_status=Subquery(latest_service.values('status')[:1]),
+        latest_maintenance_request=Subquery(latest_maintenance.values('pk')[:1]),
+        latest_maintenance_status=Subquery(latest_maintenance.values('status')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0004_user_is_staff_alter_user_is_superuser'),
+        ('core', '0039_vehicle_km_since_service'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='latest_maintenance_request',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.maintenancerequest'),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='latest_maintenance_status',
+            field=models.CharField(blank=True, max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='latest_service_request',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.servicerequest'),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='latest_service_status',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['latest_service_status', 'status'], name='core_vehicl_latest__c7b7bf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['latest_maintenance_status', 'status'], name='core_vehicl_latest__29c56e_idx'),
+        ),
+        migrations.RunPython(backfill_latest_requests, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def open_status_log(apps, schema_editor):
+    """Start every existing vehicle's status log with its current status."""
+    Vehicle = apps.get_model('core', 'Vehicle')
+    VehicleStatusEvent = apps.get_model('core', 'VehicleStatusEvent')
+    now = timezone.now()
+    VehicleStatusEvent.objects.bulk_create(
+        VehicleStatusEvent(vehicle_id=vehicle_id, to_status=vehicle_status, changed_at=now)
+        for vehicle_id, vehicle_status in Vehicle.objects.values_list('id', 'status').iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0040_vehicle_latest_maintenance_request_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('available', 'Available'), ('in_use', 'In Use'), ('service', 'In Service'), ('maintenance', 'Under Maintenance')], max_length=20, null=True)),
+                ('to_status', models.CharField(choices=[('available', 'Available'), ('in_use', 'In Use'), ('service', 'In Service'), ('maintenance', 'Under Maintenance')], max_length=20)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='core.vehicle')),
+            ],
+            options={
+                'ordering': ['changed_at', 'id'],
+                'indexes': [models.Index(fields=['vehicle', 'changed_at'], name='core_vehicl_vehicle_433109_idx'), models.Index(fields=['changed_at'], name='core_vehicl_changed_70e0f2_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VehicleUtilizationDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('seconds_available', models.PositiveIntegerField(default=0)),
+                ('seconds_in_use', models.PositiveIntegerField(default=0)),
+                ('seconds_service', models.PositiveIntegerField(default=0)),
+                ('seconds_maintenance', models.PositiveIntegerField(default=0)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_utilization', to='core.vehicle')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='core_vehicl_day_65a533_idx')],
+                'unique_together': {('vehicle', 'day')},
+            },
+        ),
+        migrations.RunPython(open_status_log, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:39
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0041_vehiclestatusevent_vehicleutilizationdaily'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='odometer_km',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='TelemetryPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField()),
+                ('odometer_km', models.FloatField(blank=True, null=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='telemetry_points', to='core.vehicle')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vehicle', 'recorded_at'], name='core_teleme_vehicle_257a16_idx'), models.Index(fields=['received_at'], name='core_teleme_receive_1622fc_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VehicleTelemetryHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('points', models.PositiveIntegerField(default=0)),
+                ('odometer_min', models.FloatField(blank=True, null=True)),
+                ('odometer_max', models.FloatField(blank=True, null=True)),
+                ('last_recorded_at', models.DateTimeField()),
+                ('last_position_at', models.DateTimeField(blank=True, null=True)),
+                ('last_latitude', models.FloatField(blank=True, null=True)),
+                ('last_longitude', models.FloatField(blank=True, null=True)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='telemetry_hourly', to='core.vehicle')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='core_vehicl_hour_585e6a_idx')],
+                'unique_together': {('vehicle', 'hour')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0042_vehicle_odometer_km_telemetrypoint_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='last_latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='last_longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='last_position_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
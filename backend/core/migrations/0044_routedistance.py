@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_vehicle_last_latitude_vehicle_last_longitude_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteDistance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destination_key', models.CharField(max_length=1024, unique=True)),
+                ('distance_km', models.FloatField()),
+                ('places', models.JSONField(blank=True, default=list)),
+                ('source', models.CharField(choices=[('graph', 'Road graph'), ('manual', 'Entered by transport manager')], default='graph', max_length=10)),
+                ('graph_version', models.CharField(blank=True, max_length=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
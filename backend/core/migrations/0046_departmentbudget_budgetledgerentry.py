@@ -0,0 +1,52 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0004_user_is_staff_alter_user_is_superuser'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0045_fuelprice'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentBudget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fiscal_year', models.PositiveIntegerField()),
+                ('allocated', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budgets', to='auth_app.department')),
+            ],
+            options={
+                'ordering': ['-fiscal_year', 'department__name'],
+                'unique_together': {('department', 'fiscal_year')},
+            },
+        ),
+        migrations.CreateModel(
+            name='BudgetLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('allocation', 'Allocation'), ('charge', 'Charge')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('object_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('remarks', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('content_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='contenttypes.contenttype')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='core.departmentbudget')),
+            ],
+            options={
+                'ordering': ['budget', 'id'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('kind', 'charge')), fields=('content_type', 'object_id'), name='unique_budget_charge_per_request')],
+            },
+        ),
+    ]
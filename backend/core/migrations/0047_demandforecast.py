@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0004_user_is_staff_alter_user_is_superuser'),
+        ('core', '0046_departmentbudget_budgetledgerentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('vehicles', models.FloatField()),
+                ('generated_at', models.DateTimeField()),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='auth_app.department')),
+            ],
+            options={
+                'ordering': ['day', 'department'],
+                'unique_together': {('department', 'day')},
+            },
+        ),
+    ]
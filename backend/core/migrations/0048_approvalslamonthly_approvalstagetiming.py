@@ -0,0 +1,47 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0047_demandforecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApprovalSLAMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('approver_role', models.PositiveSmallIntegerField(choices=[(1, 'Employee'), (2, 'Department Manager'), (3, 'Finance Manager'), (4, 'Transport Manager'), (5, 'CEO'), (6, 'Driver'), (7, 'System Admin'), (8, 'General System Excuter'), (9, 'Budget Manager')])),
+                ('month', models.DateField()),
+                ('count', models.PositiveIntegerField()),
+                ('mean_seconds', models.PositiveIntegerField()),
+                ('p50_seconds', models.PositiveIntegerField()),
+                ('p90_seconds', models.PositiveIntegerField()),
+                ('p95_seconds', models.PositiveIntegerField()),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'ordering': ['-month', 'content_type', 'approver_role'],
+                'unique_together': {('content_type', 'approver_role', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ApprovalStageTiming',
+            fields=[
+                ('action_log', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stage_timing', serialize=False, to='core.actionlog')),
+                ('approver_role', models.PositiveSmallIntegerField(choices=[(1, 'Employee'), (2, 'Department Manager'), (3, 'Finance Manager'), (4, 'Transport Manager'), (5, 'CEO'), (6, 'Driver'), (7, 'System Admin'), (8, 'General System Excuter'), (9, 'Budget Manager')])),
+                ('action', models.CharField(choices=[('forwarded', 'Forwarded'), ('approved', 'Approved'), ('rejected', 'Rejected')], max_length=20)),
+                ('month', models.DateField()),
+                ('seconds', models.PositiveIntegerField()),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['content_type', 'month', 'approver_role'], name='core_approv_content_c3de56_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0048_approvalslamonthly_approvalstagetiming'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestEscalation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('approver_role', models.PositiveSmallIntegerField(choices=[(1, 'Employee'), (2, 'Department Manager'), (3, 'Finance Manager'), (4, 'Transport Manager'), (5, 'CEO'), (6, 'Driver'), (7, 'System Admin'), (8, 'General System Excuter'), (9, 'Budget Manager')])),
+                ('waiting_since', models.DateTimeField()),
+                ('escalated_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('new_request', 'New Transport Request'), ('forwarded', 'Request Forwarded'), ('approved', 'Request Approved'), ('rejected', 'Request Rejected'), ('assigned', 'Vehicle Assigned'), ('escalation', 'Approval Reminder')], max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='highcosttransportrequest',
+            index=models.Index(fields=['status', 'current_approver_role', 'updated_at'], name='core_highco_status_f9bb79_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(fields=['status', 'current_approver_role', 'updated_at'], name='core_mainte_status_6c1d9d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='refuelingrequest',
+            index=models.Index(fields=['status', 'current_approver_role', 'updated_at'], name='core_refuel_status_a743ba_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['status', 'current_approver_role', 'updated_at'], name='core_servic_status_a8c91c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transportrequest',
+            index=models.Index(fields=['status', 'current_approver_role', 'updated_at'], name='core_transp_status_49e457_idx'),
+        ),
+        migrations.AddField(
+            model_name='requestescalation',
+            name='content_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='requestescalation',
+            unique_together={('content_type', 'object_id', 'approver_role')},
+        ),
+    ]
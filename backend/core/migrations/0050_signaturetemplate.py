@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0049_requestescalation_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SignatureTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_hash', models.CharField(max_length=64, unique=True)),
+                ('image_name', models.CharField(db_index=True, max_length=255)),
+                ('width', models.PositiveSmallIntegerField()),
+                ('height', models.PositiveSmallIntegerField()),
+                ('bitmap', models.BinaryField()),
+                ('keypoints', models.PositiveIntegerField()),
+                ('descriptors', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
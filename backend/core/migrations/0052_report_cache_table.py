@@ -0,0 +1,20 @@
+# Generated by Django 5.1.6 on 2026-10-19 21:10
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_tables(apps, schema_editor):
+    # Tables for database-backed caches (the shared "reports" cache without Redis); existing ones are skipped
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0051_signaturesample'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_tables, migrations.RunPython.noop),
+    ]
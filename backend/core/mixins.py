@@ -3,11 +3,14 @@
 from rest_framework.response import Response
 from rest_framework import status
 
-from core.services import compare_signatures
 # from core.signature_model import compare_signatures_with_model
 
 class SignatureVerificationMixin:
     def verify_signature(self, request):
+        # Imported here so loading views doesn't load OpenCV
+        from core.signature_pool import SignatureComparisonFailed, SignaturePoolBusy, signature_pool
+        from core.signatures import SignatureTemplates, decode_signature_upload
+
         uploaded_signature = request.FILES.get('signature')
         if not uploaded_signature:
             return Response({"error": "Signature is required."}, status=status.HTTP_400_BAD_REQUEST)
@@ -15,16 +18,18 @@ class SignatureVerificationMixin:
         if not request.user.signature_image:
             return Response({"error": "No stored signature found for this user."}, status=status.HTTP_403_FORBIDDEN)
 
-        # Save uploaded signature temporarily
-        import tempfile
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
-            for chunk in uploaded_signature.chunks():
-                temp_file.write(chunk)
-            temp_signature_path = temp_file.name
-
-        user_signature_path = request.user.signature_image.path
+        try:
+            uploaded = decode_signature_upload(uploaded_signature)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        similarity,passed = compare_signatures(user_signature_path, temp_signature_path)
+        reference = SignatureTemplates.for_user(request.user)
+        try:
+            similarity,passed = signature_pool.compare(reference, uploaded)
+        except (SignaturePoolBusy, SignatureComparisonFailed) as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "5"})
+        except ValueError as e:
+            return Response({"error": f"Signature could not be compared: {e}"}, status=status.HTTP_400_BAD_REQUEST)
         # You can set your threshold, e.g., 0.35 for 35%
         if not passed:
             return Response({
@@ -51,6 +56,7 @@ class SignatureVerificationMixin:
 
 from rest_framework.response import Response
 from rest_framework import status
+from core.budgets import BudgetLedger
 from core.otp_manager import OTPManager
 
 class OTPVerificationMixin:
@@ -60,3 +66,13 @@ class OTPVerificationMixin:
         if not valid:
             return Response({"error": error}, status=status.HTTP_403_FORBIDDEN)
         return None
+
+
+class RemainingBudgetListMixin:
+    """
+    For list views of costed requests whose serializer shows the remaining budget: joins in
+    the relations BudgetLedger.department_of() reads, so rows don't each query them.
+    """
+
+    def filter_queryset(self, queryset):
+        return BudgetLedger.with_departments(super().filter_queryset(queryset))
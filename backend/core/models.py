@@ -1,5 +1,5 @@
 from decimal import Decimal
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
@@ -54,6 +54,8 @@ class Vehicle(models.Model):
     fuel_type = models.CharField(max_length=10, choices=FUEL_TYPE_CHOICES,default=BENZENE)
     total_kilometers = models.FloatField(default=0.0)  # Lifetime mileage
     last_service_kilometers = models.FloatField(default=0.0)  # km at last service
+    km_since_service = models.FloatField(default=0.0, db_index=True)  # total_kilometers - last_service_kilometers, kept in sync on save
+    odometer_km = models.FloatField(null=True, blank=True)  # last odometer reading received from telemetry; once set, telemetry drives total_kilometers instead of monthly logs
     motor_number = models.CharField(max_length=100, unique=True,null=True, blank=True)
     chassis_number = models.CharField(max_length=100, unique=True,null=True,blank=True)
     libre_number = models.CharField(max_length=100, unique=True,null=True,blank=True)
@@ -82,6 +84,25 @@ class Vehicle(models.Model):
     drivers_location = models.CharField(
         max_length=255, null=True, blank=True, help_text="Location of the driver for rented vehicles."
     )
+    # Last live position, persisted periodically from core.positions
+    last_latitude = models.FloatField(null=True, blank=True)
+    last_longitude = models.FloatField(null=True, blank=True)
+    last_position_at = models.DateTimeField(null=True, blank=True)
+    # Denormalized pointers to the most recent service/maintenance request, maintained by core.signals
+    latest_service_request = models.ForeignKey(
+        'ServiceRequest', null=True, blank=True, on_delete=models.SET_NULL, related_name='+'
+    )
+    latest_service_status = models.CharField(max_length=20, null=True, blank=True)
+    latest_maintenance_request = models.ForeignKey(
+        'MaintenanceRequest', null=True, blank=True, on_delete=models.SET_NULL, related_name='+'
+    )
+    latest_maintenance_status = models.CharField(max_length=10, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['latest_service_status', 'status']),
+            models.Index(fields=['latest_maintenance_status', 'status']),
+        ]
 
  
     def clean(self):
@@ -90,37 +111,191 @@ class Vehicle(models.Model):
 
     def __str__(self):
         return f"{self.model} ({self.license_plate}) - {self.get_source_display()}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.km_since_service = self.total_kilometers - self.last_service_kilometers
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'total_kilometers', 'last_service_kilometers'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'km_since_service'}
+
+        # Every status change goes through here and is appended to the status event log
+        previous_status = getattr(self, '_loaded_status', None)
+        status_changed = 'status' in self.__dict__ and (
+            self._state.adding or self.status != previous_status
+        ) and (update_fields is None or 'status' in update_fields)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if status_changed:
+                VehicleStatusEvent.objects.create(vehicle=self, from_status=previous_status, to_status=self.status)
+        if 'status' in self.__dict__:
+            self._loaded_status = self.status
     
     def mark_as_in_use(self):
         """Mark the vehicle as in use when assigned to a transport request."""
         if self.status != self.AVAILABLE:
             raise ValidationError(_("Vehicle must be available to be assigned."))
         self.status = self.IN_USE
-        self.save()
+        self.save(update_fields=['status', 'updated_at'])
 
     def mark_as_available(self):
         """Mark the vehicle as available when the request is completed."""
         self.status = self.AVAILABLE
-        self.save()
+        self.save(update_fields=['status', 'updated_at'])
 
-    def mark_as_service(self):
-        """Mark the vehicle as in service."""
+    def mark_as_service(self, update_fields=()):
+        """Mark the vehicle as in service, also saving any other `update_fields` the caller changed."""
         self.status = self.SERVICE
-        self.save()
+        self.save(update_fields=['status', 'updated_at', *update_fields])
 
     def mark_as_maintenance(self):
         """Mark the vehicle as under maintenance."""
         self.status = self.MAINTENANCE
-        self.save()
+        self.save(update_fields=['status', 'updated_at'])
 
     def deactivate(self):
         self.is_active = False
         self.is_deleted = True
-        self.save()
+        self.save(update_fields=['is_active', 'is_deleted', 'updated_at'])
     def activate(self):
         self.is_active = True
         self.is_deleted = False
-        self.save()
+        self.save(update_fields=['is_active', 'is_deleted', 'updated_at'])
+class VehicleStatusEvent(models.Model):
+    """Append-only history of vehicle status changes, written by Vehicle.save()."""
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='status_events')
+    from_status = models.CharField(max_length=20, choices=Vehicle.VEHICLE_STATUS_CHOICES, null=True, blank=True)
+    to_status = models.CharField(max_length=20, choices=Vehicle.VEHICLE_STATUS_CHOICES)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['changed_at', 'id']
+        indexes = [
+            models.Index(fields=['vehicle', 'changed_at']),
+            models.Index(fields=['changed_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.vehicle.license_plate}: {self.from_status} -> {self.to_status} at {self.changed_at}"
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValidationError("Vehicle status events are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValidationError("Vehicle status events are append-only.")
+
+class VehicleUtilizationDaily(models.Model):
+    """Seconds spent in each status per vehicle per day, rolled up from VehicleStatusEvent."""
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='daily_utilization')
+    day = models.DateField()
+    seconds_available = models.PositiveIntegerField(default=0)
+    seconds_in_use = models.PositiveIntegerField(default=0)
+    seconds_service = models.PositiveIntegerField(default=0)
+    seconds_maintenance = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('vehicle', 'day')
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+
+    def __str__(self):
+        return f"{self.vehicle.license_plate} on {self.day}"
+
+class DemandForecast(models.Model):
+    """Forecast vehicles needed per department per day, rewritten by DemandForecaster.refresh()."""
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, null=True, blank=True)  # null: no department
+    day = models.DateField()
+    vehicles = models.FloatField()
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('department', 'day')
+        ordering = ['day', 'department']
+
+    def __str__(self):
+        return f"{self.department or 'Unassigned'} on {self.day}: {self.vehicles:.1f}"
+
+class TelemetryPoint(models.Model):
+    """Raw odometer/position reading from a vehicle, written in batches by core.telemetry."""
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='telemetry_points')
+    recorded_at = models.DateTimeField()
+    odometer_km = models.FloatField(null=True, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    received_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['vehicle', 'recorded_at']),
+            models.Index(fields=['received_at']),
+        ]
+
+class VehicleTelemetryHourly(models.Model):
+    """Telemetry downsampled to one row per vehicle per hour."""
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='telemetry_hourly')
+    hour = models.DateTimeField()
+    points = models.PositiveIntegerField(default=0)
+    odometer_min = models.FloatField(null=True, blank=True)
+    odometer_max = models.FloatField(null=True, blank=True)
+    last_recorded_at = models.DateTimeField()
+    last_position_at = models.DateTimeField(null=True, blank=True)
+    last_latitude = models.FloatField(null=True, blank=True)
+    last_longitude = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('vehicle', 'hour')
+        indexes = [
+            models.Index(fields=['hour']),
+        ]
+
+    @property
+    def distance_km(self):
+        if self.odometer_min is None or self.odometer_max is None:
+            return 0.0
+        return self.odometer_max - self.odometer_min
+
+class RouteDistance(models.Model):
+    """Remembered one-way distance for a normalized destination string, see core.distances."""
+    GRAPH = 'graph'
+    MANUAL = 'manual'
+    SOURCE_CHOICES = [
+        (GRAPH, 'Road graph'),
+        (MANUAL, 'Entered by transport manager'),
+    ]
+
+    destination_key = models.CharField(max_length=1024, unique=True)
+    distance_km = models.FloatField()
+    places = models.JSONField(default=list, blank=True)
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default=GRAPH)
+    graph_version = models.CharField(max_length=12, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.destination_key}: {self.distance_km} km ({self.source})"
+
+class FuelPrice(models.Model):
+    """Price per liter of a fuel type from `effective_date` until the next price for that fuel type."""
+    fuel_type = models.CharField(max_length=10, choices=Vehicle.FUEL_TYPE_CHOICES)
+    effective_date = models.DateField()
+    price_per_liter = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('fuel_type', 'effective_date')
+        ordering = ['fuel_type', '-effective_date']
+
+    def __str__(self):
+        return f"{self.get_fuel_type_display()} {self.price_per_liter}/L from {self.effective_date}"
+
 class MonthlyKilometerLog(models.Model):
     vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE)
     month = models.CharField(max_length=20)
@@ -130,6 +305,20 @@ class MonthlyKilometerLog(models.Model):
 
     class Meta:
         unique_together = ('vehicle', 'month')
+
+class ServiceDueAlert(models.Model):
+    """One row per vehicle per service cycle, so a due vehicle is only alerted once."""
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='service_due_alerts')
+    service_cycle_km = models.FloatField(help_text="last_service_kilometers of the cycle this alert belongs to.")
+    kilometers_at_alert = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('vehicle', 'service_cycle_km')
+
+    def __str__(self):
+        return f"Service due for {self.vehicle.license_plate} at {self.kilometers_at_alert} km"
+
 class CouponRequest(models.Model):
     vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE)
     month = models.CharField(max_length=20)
@@ -162,6 +351,10 @@ class TransportRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'current_approver_role', 'updated_at']),  # escalation scan
+        ]
 
     def __str__(self):
         return f"{self.requester.get_full_name()} - {self.destination} ({self.status})"
@@ -199,6 +392,10 @@ class HighCostTransportRequest(models.Model):
         help_text="Upload a file containing the list of employees for this request."
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'current_approver_role', 'updated_at']),  # escalation scan
+        ]
 
     def __str__(self):
         return f"{self.requester.full_name} - {self.destination} ({self.status})"
@@ -210,6 +407,7 @@ class Notification(models.Model):
         ('approved', 'Request Approved'),
         ('rejected', 'Request Rejected'),
         ('assigned', 'Vehicle Assigned'),
+        ('escalation', 'Approval Reminder'),
     )
 
     PRIORITY_CHOICES = (
@@ -282,6 +480,11 @@ class MaintenanceRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'current_approver_role', 'updated_at']),  # escalation scan
+        ]
+
     def __str__(self):
         return f"{self.requester} - {self.status} - {self.requesters_car}"
 
@@ -307,6 +510,11 @@ class RefuelingRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)  
     updated_at = models.DateTimeField(auto_now=True) 
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'current_approver_role', 'updated_at']),  # escalation scan
+        ]
+
     def __str__(self):
         return f"{self.requester} - {self.status} - {self.requesters_car.license_plate}"
     
@@ -331,6 +539,11 @@ class ServiceRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'current_approver_role', 'updated_at']),  # escalation scan
+        ]
+
     def __str__(self):
         return f"ServiceRequest {self.id} for Vehicle {self.vehicle.model} - Status: {self.status}"
 
@@ -351,11 +564,118 @@ class ActionLog(models.Model):
     status_at_time = models.CharField(max_length=20)  # store the status at the time of action
     approver_role = models.PositiveSmallIntegerField(choices=User.ROLE_CHOICES)
     remarks = models.TextField(blank=True, null=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         return f"{self.action_by.get_full_name()} {self.action} {self.content_type} #{self.object_id} on {self.timestamp}"
 
+class ApprovalStageTiming(models.Model):
+    """Time a request waited at an approver before they acted, from consecutive ActionLog rows."""
+    action_log = models.OneToOneField(ActionLog, on_delete=models.CASCADE, primary_key=True, related_name='stage_timing')
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    approver_role = models.PositiveSmallIntegerField(choices=User.ROLE_CHOICES)
+    action = models.CharField(max_length=20, choices=ActionLog.ACTION_CHOICES)
+    month = models.DateField()  # first day of the month the approver acted in
+    seconds = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['content_type', 'month', 'approver_role']),
+        ]
+
+class ApprovalSLAMonthly(models.Model):
+    """Time-in-stage percentiles per request type, approver role and month, rolled up from ApprovalStageTiming."""
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    approver_role = models.PositiveSmallIntegerField(choices=User.ROLE_CHOICES)
+    month = models.DateField()
+    count = models.PositiveIntegerField()
+    mean_seconds = models.PositiveIntegerField()
+    p50_seconds = models.PositiveIntegerField()
+    p90_seconds = models.PositiveIntegerField()
+    p95_seconds = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('content_type', 'approver_role', 'month')
+        ordering = ['-month', 'content_type', 'approver_role']
+
+class RequestEscalation(models.Model):
+    """A request found waiting at an approver role past the SLA; one row per request and role, so it is reminded once."""
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    request_object = GenericForeignKey('content_type', 'object_id')
+    approver_role = models.PositiveSmallIntegerField(choices=User.ROLE_CHOICES)
+    waiting_since = models.DateTimeField()
+    escalated_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('content_type', 'object_id', 'approver_role')
+
+    def __str__(self):
+        return f"{self.content_type} #{self.object_id} at {self.get_approver_role_display()} since {self.waiting_since}"
+
+class DepartmentBudget(models.Model):
+    """
+    A department's allocation for one fiscal year. `balance` is the running balance of
+    its ledger, maintained by BudgetLedger so the remaining budget is a single-row read.
+    """
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='budgets')
+    fiscal_year = models.PositiveIntegerField()  # calendar year the fiscal year starts in
+    allocated = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('department', 'fiscal_year')
+        ordering = ['-fiscal_year', 'department__name']
+
+    def __str__(self):
+        return f"{self.department.name} FY{self.fiscal_year}: {self.balance} of {self.allocated}"
+
+    @property
+    def spent(self):
+        return self.allocated - self.balance
+
+class BudgetLedgerEntry(models.Model):
+    """Append-only budget movements; `balance_after` is the department balance once the entry is applied."""
+    ALLOCATION = 'allocation'
+    CHARGE = 'charge'
+    KIND_CHOICES = [
+        (ALLOCATION, 'Allocation'),
+        (CHARGE, 'Charge'),
+    ]
+
+    budget = models.ForeignKey(DepartmentBudget, on_delete=models.CASCADE, related_name='entries')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    amount = models.DecimalField(max_digits=15, decimal_places=2)  # charges are negative
+    balance_after = models.DecimalField(max_digits=15, decimal_places=2)
+    content_type = models.ForeignKey(ContentType, on_delete=models.PROTECT, null=True, blank=True)
+    object_id = models.PositiveIntegerField(null=True, blank=True)
+    request_object = GenericForeignKey('content_type', 'object_id')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    remarks = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['budget', 'id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_type', 'object_id'],
+                condition=models.Q(kind='charge'),
+                name='unique_budget_charge_per_request',
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.budget} {self.kind} {self.amount} -> {self.balance_after}"
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValidationError("Budget ledger entries are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValidationError("Budget ledger entries are append-only.")
+
 class OTPCode(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     code = models.CharField(max_length=6)
@@ -374,3 +694,31 @@ class OTPCode(models.Model):
 
     def is_locked(self):
         return self.locked_until and timezone.now() < self.locked_until
+
+class SignatureTemplate(models.Model):
+    """
+    Precomputed verification features of a stored signature image, keyed by the file's SHA-256.
+    `bitmap` is the zlib-compressed normalized image (height x width uint8) and `descriptors`
+    the zlib-compressed ORB descriptors (n x 32 uint8).
+    """
+    file_hash = models.CharField(max_length=64, unique=True)
+    image_name = models.CharField(max_length=255, db_index=True)
+    width = models.PositiveSmallIntegerField()
+    height = models.PositiveSmallIntegerField()
+    bitmap = models.BinaryField()
+    keypoints = models.PositiveIntegerField()
+    descriptors = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.image_name} ({self.keypoints} keypoints)"
+
+
+class SignatureSample(models.Model):
+    """An additional signature a user enrolls; verification accepts a match with any of them or signature_image."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='signature_samples')
+    image = models.ImageField(upload_to='signatures/samples/')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Signature sample #{self.pk} of {self.user.full_name}"
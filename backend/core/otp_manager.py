@@ -1,65 +1,146 @@
+import hmac
 import random
 from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
 from core.models import OTPCode
-from core.services import send_sms  # your existing SMS service
+from core.sms import send_sms  # your existing SMS service
 from core.logging import log_security_event  # if you use logging
 
-# This code is a simplified version of the OTPManager class that uses Django ORM to manage OTP codes.
+OTP_TTL = timedelta(minutes=5)
+MAX_ATTEMPTS = 3
+LOCK_DURATION = timedelta(minutes=15)
 
-class OTPManager:
-    OTP_TTL = timedelta(minutes=5)
-    MAX_ATTEMPTS = 3
-    LOCK_DURATION = timedelta(minutes=15)
 
-    @classmethod
-    def generate_otp(cls, user):
+class ORMOTPBackend:
+    """OTPs in the OTPCode table, one row per user; attempts are counted under a row lock."""
+
+    @staticmethod
+    def issue(user, code):
         now = timezone.now()
+        with transaction.atomic():
+            existing = OTPCode.objects.select_for_update().filter(user=user).first()
+            if existing and existing.is_locked():
+                raise PermissionError("Too many invalid attempts. Please try again later.")
+            # Clear any existing OTPs
+            OTPCode.objects.filter(user=user).delete()
+            OTPCode.objects.create(user=user, code=code, created_at=now, expires_at=now + OTP_TTL)
+
+    @staticmethod
+    def verify(user, submitted_code, ip_address=None):
+        with transaction.atomic():
+            otp = OTPCode.objects.select_for_update().filter(user=user).first()
+            if not otp:
+                return False, "OTP not found or already used."
+
+            if otp.is_locked():
+                return False, "Too many invalid attempts. Please try again later."
+
+            if otp.is_expired():
+                otp.delete()
+                return False, "OTP has expired."
+
+            if not hmac.compare_digest(otp.code, str(submitted_code)):
+                otp.attempts += 1
+                if otp.attempts >= MAX_ATTEMPTS:
+                    otp.locked_until = timezone.now() + LOCK_DURATION
+                    if ip_address:
+                        log_security_event(user.id, ip_address, reason="Brute-force OTP")
+                otp.save(update_fields=['attempts', 'locked_until'])
+                return False, f"Invalid OTP. Attempt {otp.attempts} of {MAX_ATTEMPTS}."
+
+            # Successful verification
+            otp.delete()
+            return True, None
 
-        # Clear any existing OTPs
-        OTPCode.objects.filter(user=user).delete()
 
-        code = f"{random.randint(100000, 999999)}"
-        otp = OTPCode.objects.create(
-            user=user,
-            code=code,
-            created_at=now,
-            expires_at=now + cls.OTP_TTL
-        )
+class CacheOTPBackend:
+    """
+    OTPs in Django's cache (local memory in development and tests, Redis in production) so
+    issuing and checking codes never touches the database.
 
-        try:
-            send_sms(user.phone_number, f"Your OTP is: {code}. It expires in 5 minutes.")
-        except Exception as e:
-            print(f"[ERROR] Failed to send SMS: {e}")
-        return code  # for internal/debug use
+    The code, the attempt counter and the lockout are separate keys expiring on their own.
+    Every check increments the counter atomically before comparing, so parallel guesses
+    can never get more than MAX_ATTEMPTS tries at one code, and a code is consumed by
+    deleting its key, so only one of several simultaneous correct submissions succeeds.
+    """
+
+    @staticmethod
+    def _keys(user):
+        return f"otp:{user.id}", f"otp_attempts:{user.id}", f"otp_locked:{user.id}"
 
     @classmethod
-    def verify_otp(cls, user, submitted_code, ip_address=None):
-        otp = OTPCode.objects.filter(user=user).first()
-        if not otp:
-            return False, "OTP not found or already used."
+    def issue(cls, user, code):
+        code_key, attempts_key, locked_key = cls._keys(user)
+        if cache.get(locked_key):
+            raise PermissionError("Too many invalid attempts. Please try again later.")
+        cache.set(code_key, code, OTP_TTL.total_seconds())
+        cache.delete(attempts_key)
 
-        if otp.is_locked():
+    @classmethod
+    def verify(cls, user, submitted_code, ip_address=None):
+        code_key, attempts_key, locked_key = cls._keys(user)
+        if cache.get(locked_key):
             return False, "Too many invalid attempts. Please try again later."
 
-        if otp.is_expired():
-            otp.delete()
-            return False, "OTP has expired."
+        code = cache.get(code_key)
+        if code is None:
+            return False, "OTP not found or has expired."
+
+        cache.add(attempts_key, 0, OTP_TTL.total_seconds())
+        try:
+            attempts = cache.incr(attempts_key)
+        except ValueError:  # the counter expired between add and incr
+            cache.set(attempts_key, 1, OTP_TTL.total_seconds())
+            attempts = 1
+        if attempts > MAX_ATTEMPTS:
+            return False, "Too many invalid attempts. Please try again later."
 
-        if otp.code != submitted_code:
-            otp.attempts += 1
-            if otp.attempts >= cls.MAX_ATTEMPTS:
-                otp.locked_until = timezone.now() + cls.LOCK_DURATION
+        if not hmac.compare_digest(code, str(submitted_code)):
+            if attempts >= MAX_ATTEMPTS:
+                cache.set(locked_key, True, LOCK_DURATION.total_seconds())
+                cache.delete_many([code_key, attempts_key])
                 if ip_address:
                     log_security_event(user.id, ip_address, reason="Brute-force OTP")
-            otp.save()
-            return False, f"Invalid OTP. Attempt {otp.attempts} of {cls.MAX_ATTEMPTS}."
+            return False, f"Invalid OTP. Attempt {attempts} of {MAX_ATTEMPTS}."
 
-        # Successful verification
-        otp.delete()
+        # Successful verification: whoever deletes the code first wins
+        if not cache.delete(code_key):
+            return False, "OTP not found or already used."
+        cache.delete(attempts_key)
         return True, None
 
 
+class OTPManager:
+    """Issues OTPs by SMS and verifies them, storing them with the backend named by settings.OTP_BACKEND."""
+    OTP_TTL = OTP_TTL
+    MAX_ATTEMPTS = MAX_ATTEMPTS
+    LOCK_DURATION = LOCK_DURATION
+    BACKENDS = {'cache': CacheOTPBackend, 'orm': ORMOTPBackend}
+
+    @classmethod
+    def backend(cls):
+        return cls.BACKENDS[settings.OTP_BACKEND]
+
+    @classmethod
+    def generate_otp(cls, user):
+        code = f"{random.randint(100000, 999999)}"
+        cls.backend().issue(user, code)
+
+        try:
+            send_sms(user.phone_number, f"Your OTP is: {code}. It expires in 5 minutes.")
+        except Exception as e:
+            print(f"[ERROR] Failed to send SMS: {e}")
+        return code  # for internal/debug use
+
+    @classmethod
+    def verify_otp(cls, user, submitted_code, ip_address=None):
+        return cls.backend().verify(user, submitted_code, ip_address)
+
+
 
 
 
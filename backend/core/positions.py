@@ -0,0 +1,165 @@
+import atexit
+import logging
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, DateTimeField, FloatField, Value, When
+from django.utils import timezone
+
+from core.models import Vehicle
+
+logger = logging.getLogger(__name__)
+
+POSITIONS_GROUP = "live_positions"
+
+
+class LivePositionStore:
+    """
+    Latest known position per vehicle, kept in process memory.
+
+    Updates only touch the dict; changed vehicles are marked dirty and written to
+    Vehicle.last_latitude/last_longitude/last_position_at in one statement within
+    LIVE_POSITION_PERSIST_SECONDS, by a timer if no later update gets there first.
+    Those columns are what every worker shares: snapshots read them and overlay
+    this process's newer positions, so a map served by any worker is at most one
+    persist interval behind. The store is seeded from the columns on first use,
+    so a restart only loses positions received since the last persist.
+    """
+
+    def __init__(self):
+        self._positions = {}  # vehicle_id -> (latitude, longitude, recorded_at)
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._last_persist = time.monotonic()
+        self._timer = None
+
+    def load(self):
+        """Seed the store from persisted positions. Safe to call repeatedly."""
+        if self._loaded:
+            return
+        persisted = Vehicle.objects.filter(last_position_at__isnull=False, is_deleted=False).values_list(
+            'id', 'last_latitude', 'last_longitude', 'last_position_at'
+        )
+        with self._lock:
+            for vehicle_id, latitude, longitude, recorded_at in persisted:
+                current = self._positions.get(vehicle_id)
+                if current is None or current[2] < recorded_at:
+                    self._positions[vehicle_id] = (latitude, longitude, recorded_at)
+            self._loaded = True
+
+    def update(self, vehicle_id, latitude, longitude, recorded_at=None):
+        """Record a position. Returns the compact entry if it changed the store, else None."""
+        recorded_at = recorded_at or timezone.now()
+        with self._lock:
+            current = self._positions.get(vehicle_id)
+            if current is not None and (current[2] > recorded_at or current[:2] == (latitude, longitude)):
+                return None
+            self._positions[vehicle_id] = (latitude, longitude, recorded_at)
+            self._dirty.add(vehicle_id)
+            self._schedule()
+        return self.compact(vehicle_id, latitude, longitude, recorded_at)
+
+    def snapshot(self, since=None):
+        """
+        Compact entries for every vehicle, or only those recorded after `since` (a datetime):
+        the persisted positions, replaced by this process's where it has a newer one.
+        """
+        persisted = Vehicle.objects.filter(last_position_at__isnull=False, is_deleted=False)
+        if since is not None:
+            persisted = persisted.filter(last_position_at__gt=since)
+        positions = {
+            vehicle_id: (latitude, longitude, recorded_at)
+            for vehicle_id, latitude, longitude, recorded_at
+            in persisted.values_list('id', 'last_latitude', 'last_longitude', 'last_position_at')
+        }
+        with self._lock:
+            items = list(self._positions.items())
+        for vehicle_id, position in items:
+            current = positions.get(vehicle_id)
+            if (since is None or position[2] > since) and (current is None or current[2] < position[2]):
+                positions[vehicle_id] = position
+        return [
+            self.compact(vehicle_id, latitude, longitude, recorded_at)
+            for vehicle_id, (latitude, longitude, recorded_at) in positions.items()
+        ]
+
+    @staticmethod
+    def compact(vehicle_id, latitude, longitude, recorded_at):
+        """[vehicle_id, latitude, longitude, unix seconds] - what the map consumes."""
+        return [vehicle_id, round(latitude, 6), round(longitude, 6), int(recorded_at.timestamp())]
+
+    def persist_due(self):
+        return bool(self._dirty) and time.monotonic() - self._last_persist >= settings.LIVE_POSITION_PERSIST_SECONDS
+
+    def persist(self):
+        """Write dirty positions to the vehicles table in one UPDATE. Returns the number written."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            positions = {vehicle_id: self._positions[vehicle_id] for vehicle_id in dirty}
+            self._last_persist = time.monotonic()
+        if not positions:
+            return 0
+
+        def column(index, output_field):
+            return Case(
+                *[When(pk=vehicle_id, then=Value(position[index])) for vehicle_id, position in positions.items()],
+                output_field=output_field,
+            )
+
+        try:
+            Vehicle.objects.filter(pk__in=positions).update(
+                last_latitude=column(0, FloatField()),
+                last_longitude=column(1, FloatField()),
+                last_position_at=column(2, DateTimeField()),
+            )
+        except Exception:
+            with self._lock:
+                self._dirty |= dirty  # retry on the next persist
+            logger.exception(f"Failed to persist {len(positions)} live position(s).")
+            raise
+        return len(positions)
+
+    def _schedule(self):
+        """Start the persist timer unless one is pending. Called with the lock held."""
+        if self._timer is None:
+            self._timer = threading.Timer(settings.LIVE_POSITION_PERSIST_SECONDS, self._persist_on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _persist_on_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.persist()
+        except Exception:
+            with self._lock:
+                self._schedule()  # persist() kept the positions dirty and logged the failure
+        finally:
+            connection.close()  # the timer thread's own connection
+
+    def record(self, updates):
+        """
+        Update from synchronous code with (vehicle_id, latitude, longitude, recorded_at)
+        tuples: store them, broadcast what changed to map clients and persist if due.
+        """
+        self.load()
+        changed = [entry for entry in (self.update(*update) for update in updates) if entry is not None]
+        broadcast_positions(changed)
+        if self.persist_due():
+            self.persist()
+        return changed
+
+
+def broadcast_positions(entries):
+    channel_layer = get_channel_layer()
+    if channel_layer is not None and entries:
+        async_to_sync(channel_layer.group_send)(POSITIONS_GROUP, {"type": "positions.changed", "positions": entries})
+
+
+live_positions = LivePositionStore()
+atexit.register(live_positions.persist)
@@ -2,12 +2,16 @@ from django.shortcuts import get_object_or_404
 from rest_framework import permissions , status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from core.models import ActionLog, HighCostTransportRequest, MaintenanceRequest, MonthlyKilometerLog, RefuelingRequest, ServiceRequest, TransportRequest, Vehicle, Notification
+from core.models import ActionLog, ApprovalSLAMonthly, HighCostTransportRequest, MaintenanceRequest, MonthlyKilometerLog, RefuelingRequest, ServiceRequest, TransportRequest, Vehicle, Notification, VehicleUtilizationDaily
 from django.db.models.functions import TruncMonth
 from django.db.models import Count,Sum, Q
-from datetime import datetime
+from datetime import datetime, date, timedelta
 from auth_app.permissions import  IsCeo, IsGeneralSystem, IsTransportManager
+from auth_app.models import User
+from core.forecasting import DemandForecaster, MaintenanceForecaster
+from core.simulation import FleetCostSimulator
 from itertools import chain
+import math
 from operator import attrgetter
 
 
@@ -142,6 +146,162 @@ class RecentVehicleRequestsAPIView(APIView):
             })
 
         return Response({"results": results})
+
+
+class MaintenanceForecastAPIView(APIView):  # served from cache, refreshed nightly by refresh_maintenance_forecast
+    permission_classes = [permissions.IsAuthenticated, IsTransportManager|IsCeo|IsGeneralSystem]
+
+    def get(self, request):
+        return Response(MaintenanceForecaster.get())
+
+
+class DemandForecastAPIView(APIView):  # served from cache, refreshed nightly by refresh_demand_forecast
+    permission_classes = [permissions.IsAuthenticated, IsTransportManager|IsCeo|IsGeneralSystem]
+
+    def get(self, request):
+        return Response(DemandForecaster.get())
+
+
+class ApprovalSLAAPIView(APIView):
+    """
+    Time requests wait at each approver role, per request type and month, from the
+    rollup_approval_sla rollup. Filters: ?request_type=refuelingrequest, ?role=9, ?months=12.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsTransportManager|IsCeo|IsGeneralSystem]
+
+    def get(self, request):
+        try:
+            months = int(request.query_params.get('months', 12))
+            role = int(request.query_params['role']) if request.query_params.get('role') else None
+        except ValueError:
+            return Response({"error": "months and role must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= months <= 60:
+            return Response({"error": "months must be between 1 and 60."}, status=status.HTTP_400_BAD_REQUEST)
+
+        today = date.today()
+        first_month = date(today.year, today.month, 1)
+        for _ in range(months - 1):
+            first_month = (first_month - timedelta(days=1)).replace(day=1)
+
+        rows = ApprovalSLAMonthly.objects.select_related('content_type').filter(month__gte=first_month)
+        if request.query_params.get('request_type'):
+            rows = rows.filter(content_type__model=request.query_params['request_type'].lower())
+        if role is not None:
+            rows = rows.filter(approver_role=role)
+
+        def hours(seconds):
+            return round(seconds / 3600, 2)
+
+        return Response({"results": [
+            {
+                "request_type": row.content_type.model,
+                "approver_role": row.approver_role,
+                "approver_role_display": row.get_approver_role_display(),
+                "month": row.month.strftime('%Y-%m'),
+                "count": row.count,
+                "mean_hours": hours(row.mean_seconds),
+                "p50_hours": hours(row.p50_seconds),
+                "p90_hours": hours(row.p90_seconds),
+                "p95_hours": hours(row.p95_seconds),
+            }
+            for row in rows
+        ]})
+
+
+class SignaturePoolMetricsAPIView(APIView):  # per worker process
+    permission_classes = [permissions.IsAuthenticated, IsGeneralSystem]
+
+    def get(self, request):
+        from core.signature_pool import signature_pool  # loads OpenCV
+        return Response(signature_pool.metrics())
+
+
+class FleetCostWhatIfAPIView(APIView):
+    """
+    Projected fleet spend by department and month under a scenario, e.g.
+    {"fuel_price_change_pct": 15, "efficiency_change_pct": -10, "horizon_months": 12}.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    PERCENT_FIELDS = [
+        'fuel_price_change_pct', 'efficiency_change_pct', 'distance_change_pct',
+        'maintenance_cost_change_pct', 'service_cost_change_pct',
+    ]
+    MAX_PERCENT = 1000
+
+    def post(self, request):
+        if request.user.role not in [
+            User.FINANCE_MANAGER, User.BUDGET_MANAGER, User.CEO, User.TRANSPORT_MANAGER, User.GENERAL_SYSTEM,
+        ]:
+            return Response({"error": "Access denied."}, status=status.HTTP_403_FORBIDDEN)
+
+        params = {}
+        try:
+            for field in self.PERCENT_FIELDS:
+                params[field] = float(request.data.get(field) or 0)
+            by_type = request.data.get('fuel_price_change_pct_by_type') or {}
+            params['fuel_price_change_pct_by_type'] = {
+                fuel_type: float(pct) for fuel_type, pct in by_type.items()
+                if fuel_type in dict(Vehicle.FUEL_TYPE_CHOICES)
+            }
+            params['horizon_months'] = int(request.data.get('horizon_months') or 12)
+        except (TypeError, ValueError, AttributeError):
+            return Response({"error": "Scenario parameters must be numeric."}, status=status.HTTP_400_BAD_REQUEST)
+
+        percents = [params[field] for field in self.PERCENT_FIELDS] + list(params['fuel_price_change_pct_by_type'].values())
+        if not all(math.isfinite(pct) and -100 < pct <= self.MAX_PERCENT for pct in percents):
+            return Response(
+                {"error": f"Percentage changes must be greater than -100 and at most {self.MAX_PERCENT}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not 1 <= params['horizon_months'] <= 60:
+            return Response({"error": "horizon_months must be between 1 and 60."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(FleetCostSimulator.run(**params))
+
+
+class FleetUtilizationHeatmapAPIView(APIView):  # reads daily rollups only, built by rollup_vehicle_utilization
+    permission_classes = [permissions.IsAuthenticated, IsTransportManager|IsCeo|IsGeneralSystem]
+    MAX_DAYS = 366
+
+    def get(self, request):
+        try:
+            end = date.fromisoformat(request.query_params['end']) if 'end' in request.query_params else date.today() - timedelta(days=1)
+            start = date.fromisoformat(request.query_params['start']) if 'start' in request.query_params else end - timedelta(days=29)
+        except ValueError:
+            return Response({"error": "start and end must be dates in YYYY-MM-DD format."}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({"error": "start must not be after end."}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days + 1 > self.MAX_DAYS:
+            return Response({"error": f"Date range cannot exceed {self.MAX_DAYS} days."}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = VehicleUtilizationDaily.objects.filter(day__range=(start, end))
+        department = request.query_params.get('department')
+        if department:
+            if not department.isdigit():
+                return Response({"error": "department must be a department id."}, status=status.HTTP_400_BAD_REQUEST)
+            rows = rows.filter(vehicle__department_id=int(department))
+
+        days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+        column = {day: i for i, day in enumerate(days)}
+        vehicles = {}
+        fleet_in_use = [0] * len(days)
+        fleet_tracked = [0] * len(days)
+        for vehicle_id, plate, day, available, in_use, service, maintenance in rows.values_list(
+            'vehicle_id', 'vehicle__license_plate', 'day',
+            'seconds_available', 'seconds_in_use', 'seconds_service', 'seconds_maintenance',
+        ).order_by('vehicle__license_plate', 'day'):
+            tracked = available + in_use + service + maintenance
+            entry = vehicles.setdefault(vehicle_id, {"vehicle_id": vehicle_id, "license_plate": plate, "utilization": [None] * len(days)})
+            i = column[day]
+            entry["utilization"][i] = round(in_use / tracked, 4) if tracked else None
+            fleet_in_use[i] += in_use
+            fleet_tracked[i] += tracked
+
+        return Response({
+            "days": [day.isoformat() for day in days],
+            "vehicles": list(vehicles.values()),
+            "fleet": [round(used / tracked, 4) if tracked else None for used, tracked in zip(fleet_in_use, fleet_tracked)],
+        })
     
 from rest_framework.views import APIView
 from rest_framework.response import Response
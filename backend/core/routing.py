@@ -0,0 +1,8 @@
+from django.urls import re_path
+from .consumers import DriverPositionConsumer, LivePositionMapConsumer, TelemetryConsumer
+
+websocket_urlpatterns = [
+    re_path(r"ws/telemetry/$", TelemetryConsumer.as_asgi()),
+    re_path(r"ws/positions/driver/$", DriverPositionConsumer.as_asgi()),
+    re_path(r"ws/positions/$", LivePositionMapConsumer.as_asgi()),
+]
@@ -0,0 +1,174 @@
+import hashlib
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count
+from django.utils import timezone
+
+from core.models import HighCostTransportRequest, TransportRequest, Vehicle
+from core.services import ServiceDueScanner
+
+
+class MaintenanceScheduler:
+    """
+    Proposes service dates for due (and nearly due) vehicles.
+
+    Vehicles are placed greedily, most overdue first, on the earliest day where the
+    vehicle has no trip booked, the workshop has capacity left, and taking the vehicle
+    off the road keeps its department's available vehicles at or above the floor.
+
+    The plan is kept in the shared reports cache together with a fingerprint of its
+    inputs, so every worker serves the same dates. When the inputs change, assignments
+    from the previous plan that are still valid are kept and only new or invalidated
+    vehicles are placed again, so dates already shown don't shuffle.
+    """
+
+    CACHE_KEY = "maintenance_schedule:{capacity}:{horizon}"
+    CACHE_TIMEOUT = 60 * 60 * 24
+
+    @classmethod
+    def plan(cls, capacity=None, horizon_days=None):
+        capacity = capacity or settings.WORKSHOP_CAPACITY_PER_DAY
+        horizon_days = horizon_days or settings.MAINTENANCE_SCHEDULE_HORIZON_DAYS
+        key = cls.CACHE_KEY.format(capacity=capacity, horizon=horizon_days)
+
+        inputs = cls._load_inputs(horizon_days)
+        fingerprint = cls._fingerprint(inputs, capacity)
+        cached = caches['reports'].get(key)
+        if cached and cached['fingerprint'] == fingerprint:
+            return cached['plan']
+
+        previous = cached['assignments'] if cached else {}
+        plan, assignments = cls._schedule(inputs, capacity, previous)
+        caches['reports'].set(key, {'fingerprint': fingerprint, 'plan': plan, 'assignments': assignments}, cls.CACHE_TIMEOUT)
+        return plan
+
+    @classmethod
+    def _load_inputs(cls, horizon_days):
+        today = timezone.localdate()
+        days = [today + timedelta(days=offset) for offset in range(1, horizon_days + 1)]
+
+        due = list(
+            ServiceDueScanner.due_vehicles(margin_km=settings.MAINTENANCE_SCHEDULE_LOOKAHEAD_KM)
+            .exclude(status__in=[Vehicle.SERVICE, Vehicle.MAINTENANCE])
+            .filter(is_active=True)
+            .only('id', 'license_plate', 'model', 'fuel_type', 'km_since_service', 'department_id')
+        )
+        for vehicle in due:
+            vehicle.service_interval_km = ServiceDueScanner.threshold_for(vehicle)
+        due.sort(key=lambda v: (v.service_interval_km - v.km_since_service, v.id))
+
+        # Booked (vehicle, day) pairs from upcoming approved trips
+        booked = set()
+        trips = []
+        for model in (TransportRequest, HighCostTransportRequest):
+            trips.extend(
+                model.objects.filter(
+                    status='approved', trip_completed=False, vehicle__isnull=False,
+                    start_day__lte=days[-1], return_day__gte=days[0],
+                ).values_list('vehicle_id', 'vehicle__department_id', 'start_day', 'return_day')
+            )
+        booked_per_department = defaultdict(int)
+        for vehicle_id, department_id, start_day, return_day in trips:
+            for day in days:
+                if start_day <= day <= return_day and (vehicle_id, day) not in booked:
+                    booked.add((vehicle_id, day))
+                    if department_id:
+                        booked_per_department[(department_id, day)] += 1
+
+        # Vehicles a department can actually put on the road; ones already in service or maintenance don't count
+        department_sizes = dict(
+            Vehicle.objects.filter(
+                is_deleted=False, is_active=True, department__isnull=False,
+                status__in=[Vehicle.AVAILABLE, Vehicle.IN_USE],
+            )
+            .values_list('department').annotate(total=Count('id'))
+        )
+        return {
+            'days': days,
+            'due': due,
+            'booked': booked,
+            'booked_per_department': dict(booked_per_department),
+            'department_sizes': department_sizes,
+        }
+
+    @staticmethod
+    def _fingerprint(inputs, capacity):
+        digest = hashlib.sha1()
+        digest.update(repr((
+            inputs['days'][0], len(inputs['days']), capacity,
+            settings.DEPARTMENT_AVAILABILITY_FLOOR,
+            [(v.id, v.km_since_service, v.department_id) for v in inputs['due']],
+            sorted(inputs['booked']),
+            sorted(inputs['department_sizes'].items()),
+        )).encode())
+        return digest.hexdigest()
+
+    @classmethod
+    def _schedule(cls, inputs, capacity, previous):
+        days = inputs['days']
+        booked = inputs['booked']
+        workshop_load = defaultdict(int)
+        department_out = defaultdict(int)
+
+        def fits(vehicle, day):
+            if (vehicle.id, day) in booked or workshop_load[day] >= capacity:
+                return False
+            department_id = vehicle.department_id
+            if department_id is None:
+                return True
+            size = inputs['department_sizes'].get(department_id, 0)
+            minimum_on_road = math.ceil(size * settings.DEPARTMENT_AVAILABILITY_FLOOR)
+            off_road = inputs['booked_per_department'].get((department_id, day), 0) + department_out[(department_id, day)]
+            return size - off_road - 1 >= minimum_on_road
+
+        def place(vehicle, day):
+            workshop_load[day] += 1
+            if vehicle.department_id is not None:
+                department_out[(vehicle.department_id, day)] += 1
+            assignments[vehicle.id] = day
+
+        assignments = {}
+        # Keep still-valid assignments from the previous plan first
+        for vehicle in inputs['due']:
+            day = previous.get(vehicle.id)
+            if day in days and fits(vehicle, day):
+                place(vehicle, day)
+
+        unscheduled = []
+        for vehicle in inputs['due']:
+            if vehicle.id in assignments:
+                continue
+            day = next((day for day in days if fits(vehicle, day)), None)
+            if day is None:
+                unscheduled.append(vehicle)
+            else:
+                place(vehicle, day)
+
+        def describe(vehicle):
+            return {
+                'vehicle_id': vehicle.id,
+                'license_plate': vehicle.license_plate,
+                'model': vehicle.model,
+                'department': vehicle.department_id,
+                'km_since_service': vehicle.km_since_service,
+                'service_interval_km': vehicle.service_interval_km,
+            }
+
+        proposals = [
+            {**describe(vehicle), 'proposed_date': assignments[vehicle.id].isoformat()}
+            for vehicle in inputs['due'] if vehicle.id in assignments
+        ]
+        proposals.sort(key=lambda p: (p['proposed_date'], p['vehicle_id']))
+        plan = {
+            'generated_at': timezone.now().isoformat(),
+            'capacity_per_day': capacity,
+            'horizon_days': len(days),
+            'proposals': proposals,
+            'unscheduled': [describe(vehicle) for vehicle in unscheduled],
+            'daily_load': {day.isoformat(): workshop_load[day] for day in days if workshop_load[day]},
+        }
+        return plan, assignments
@@ -3,9 +3,29 @@ from rest_framework import serializers
 from auth_app.models import User
 from django.utils.timezone import now 
 from auth_app.serializers import UserDetailSerializer
-from core.models import ActionLog,CouponRequest, HighCostTransportRequest, MaintenanceRequest, MonthlyKilometerLog, RefuelingRequest, ServiceRequest, TransportRequest, Vehicle, Notification
+from core.budgets import BudgetLedger
+from core.services import ServiceDueScanner
+from core.models import ActionLog, BudgetLedgerEntry, CouponRequest, DepartmentBudget, FuelPrice, HighCostTransportRequest, MaintenanceRequest, MonthlyKilometerLog, RefuelingRequest, ServiceRequest, SignatureSample, TransportRequest, Vehicle, Notification
 from rest_framework import serializers
 from django.utils import timezone
+class RemainingBudgetMixin:
+    """`budget`: what the request's department has left this fiscal year, shown to approvers only."""
+
+    BUDGET_READERS = [
+        User.TRANSPORT_MANAGER, User.GENERAL_SYSTEM, User.CEO, User.FINANCE_MANAGER, User.BUDGET_MANAGER,
+    ]
+
+    def get_budget(self, obj):
+        request = self.context.get('request')
+        if request is None or getattr(request.user, 'role', None) not in self.BUDGET_READERS:
+            return None
+        budgets = self.context.get('budgets')
+        if budgets is None:
+            # Read once and shared by every row of a list
+            budgets = self.context['budgets'] = BudgetLedger.current_budgets()
+        return BudgetLedger.remaining_for(obj, budgets)
+
+
 class TransportRequestSerializer(serializers.ModelSerializer):
     requester = serializers.ReadOnlyField(source='requester.get_full_name')
     employees = serializers.PrimaryKeyRelatedField(queryset=User.objects.filter(role=User.EMPLOYEE), many=True)
@@ -56,7 +76,11 @@ class VehicleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Vehicle
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']  # Make these fields read-only
+        read_only_fields = [
+            'id', 'km_since_service', 'odometer_km', 'last_latitude', 'last_longitude', 'last_position_at',
+            'latest_service_request', 'latest_service_status',
+            'latest_maintenance_request', 'latest_maintenance_status', 'created_at', 'updated_at',
+        ]  # Make these fields read-only
 
     def get_driver_name(self, obj):
         """Get the driver's name if a driver is assigned"""
@@ -92,6 +116,21 @@ class VehicleSerializer(serializers.ModelSerializer):
 
         return data
 
+class VehicleServiceUrgencySerializer(serializers.ModelSerializer):
+    service_interval_km = serializers.SerializerMethodField()
+    km_overdue = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Vehicle
+        fields = ['id', 'license_plate', 'model', 'fuel_type', 'km_since_service', 'service_interval_km', 'km_overdue']
+        read_only_fields = fields
+
+    def get_service_interval_km(self, obj):
+        return ServiceDueScanner.threshold_for(obj)
+
+    def get_km_overdue(self, obj):
+        return obj.km_since_service - self.get_service_interval_km(obj)
+
 class AssignedVehicleSerializer(serializers.ModelSerializer):
     driver_name = serializers.SerializerMethodField()
     
@@ -119,9 +158,10 @@ class NotificationSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class MaintenanceRequestSerializer(serializers.ModelSerializer):
+class MaintenanceRequestSerializer(RemainingBudgetMixin, serializers.ModelSerializer):
     requester_name = serializers.SerializerMethodField()
     requesters_car_name = serializers.SerializerMethodField()
+    budget = serializers.SerializerMethodField()
     requesters_car = serializers.PrimaryKeyRelatedField(
         queryset=Vehicle.objects.all(),  # We'll restrict in validate()
         required=True
@@ -132,7 +172,7 @@ class MaintenanceRequestSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'requester', 'requester_name', 'requesters_car', 'requesters_car_name',
             'date', 'reason', 'status', 'current_approver_role', 'rejection_message',
-            'maintenance_total_cost', 'maintenance_letter', 'receipt_file'
+            'maintenance_total_cost', 'maintenance_letter', 'receipt_file', 'budget'
         ]
         read_only_fields = [
             'requester', 'requester_name', 'requesters_car_name',
@@ -172,9 +212,10 @@ class MaintenanceRequestSerializer(serializers.ModelSerializer):
         validated_data['current_approver_role'] = User.TRANSPORT_MANAGER
         return super().create(validated_data)
 
-class RefuelingRequestSerializer(serializers.ModelSerializer):
+class RefuelingRequestSerializer(RemainingBudgetMixin, serializers.ModelSerializer):
     requester_name = serializers.SerializerMethodField()
     requesters_car_name = serializers.SerializerMethodField()
+    budget = serializers.SerializerMethodField()
     requesters_car = serializers.PrimaryKeyRelatedField(
         queryset=Vehicle.objects.all(),  # We'll restrict in validate()
         required=True
@@ -184,7 +225,7 @@ class RefuelingRequestSerializer(serializers.ModelSerializer):
         model = RefuelingRequest
         fields = [
             "id", "requester", "requester_name", "requesters_car", "requesters_car_name",
-            "destination", "status", "current_approver_role", "created_at"
+            "destination", "status", "current_approver_role", "created_at", "budget"
         ]
         read_only_fields = [
             'id', 'requester', 'requester_name', 'requesters_car_name',
@@ -215,17 +256,19 @@ class RefuelingRequestSerializer(serializers.ModelSerializer):
         validated_data['requester'] = user
         return super().create(validated_data)
     
-class RefuelingRequestDetailSerializer(serializers.ModelSerializer):
+class RefuelingRequestDetailSerializer(RemainingBudgetMixin, serializers.ModelSerializer):
     requester_name = serializers.SerializerMethodField()
     requesters_car_name = serializers.SerializerMethodField()
     fuel_type = serializers.SerializerMethodField()
     fuel_efficiency = serializers.SerializerMethodField() 
+    budget = serializers.SerializerMethodField()
     class Meta:
         model = RefuelingRequest
         fields = [
             "id", "requester", "requester_name", "requesters_car", "requesters_car_name",
             "destination", "date", "estimated_distance_km", "fuel_price_per_liter",
-            "fuel_needed_liters", "total_cost", "status", "current_approver_role", "created_at" ,'fuel_type', 'fuel_efficiency'
+            "fuel_needed_liters", "total_cost", "status", "current_approver_role", "created_at" ,'fuel_type', 'fuel_efficiency',
+            "budget"
         ]
         read_only_fields = fields
 
@@ -245,15 +288,16 @@ class RefuelingRequestDetailSerializer(serializers.ModelSerializer):
             return f"{obj.requesters_car.fuel_efficiency} km/L"
         return "No fuel efficiency provided for the selected vehicle"
 
-class HighCostTransportRequestSerializer(serializers.ModelSerializer):
+class HighCostTransportRequestSerializer(RemainingBudgetMixin, serializers.ModelSerializer):
     employees = serializers.PrimaryKeyRelatedField(many=True,queryset=User.objects.filter(role=User.EMPLOYEE))
     requester = serializers.ReadOnlyField(source='requester.get_full_name')
     employee_list_file = serializers.FileField(required=False, allow_null=True)
+    budget = serializers.SerializerMethodField()
 
     class Meta:
         model = HighCostTransportRequest
         fields = [
-            'id','requester','start_day','return_day','start_time','destination','reason','employees','employee_list_file','vehicle','status','current_approver_role','rejection_message','created_at','updated_at'
+            'id','requester','start_day','return_day','start_time','destination','reason','employees','employee_list_file','vehicle','status','current_approver_role','rejection_message','created_at','updated_at','budget'
         ]
     def validate(self, data):
         """
@@ -286,11 +330,12 @@ class HighCostTransportRequestSerializer(serializers.ModelSerializer):
         return high_cost_request
 
 # serializers.py
-class HighCostTransportRequestDetailSerializer(serializers.ModelSerializer):
+class HighCostTransportRequestDetailSerializer(RemainingBudgetMixin, serializers.ModelSerializer):
     requester = serializers.SerializerMethodField()
     employees = serializers.SerializerMethodField()
     vehicle = serializers.StringRelatedField()
     estimated_vehicle = serializers.StringRelatedField()
+    budget = serializers.SerializerMethodField()
 
     class Meta:
         model = HighCostTransportRequest
@@ -330,6 +375,32 @@ class MonthlyKilometerLogSerializer(serializers.ModelSerializer):
 
 
 
+class FuelPriceSerializer(serializers.ModelSerializer):
+    created_by = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = FuelPrice
+        fields = ['id', 'fuel_type', 'effective_date', 'price_per_liter', 'created_by', 'created_at']
+
+
+class DepartmentBudgetSerializer(serializers.ModelSerializer):
+    department_name = serializers.CharField(source='department.name', read_only=True)
+    spent = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = DepartmentBudget
+        fields = ['id', 'department', 'department_name', 'fiscal_year', 'allocated', 'spent', 'balance', 'updated_at']
+
+
+class BudgetLedgerEntrySerializer(serializers.ModelSerializer):
+    request_type = serializers.CharField(source='content_type.model', read_only=True, default=None)
+    created_by = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = BudgetLedgerEntry
+        fields = ['id', 'kind', 'amount', 'balance_after', 'request_type', 'object_id', 'created_by', 'remarks', 'created_at']
+
+
 class CouponRequestSerializer(serializers.ModelSerializer):
     month = serializers.CharField() 
     vehicle_name = serializers.SerializerMethodField(read_only=True)
@@ -434,18 +505,26 @@ class ReportFilterSerializer(serializers.Serializer):
     )
     status = serializers.CharField(required=False)
 
-class ServiceRequestSerializer(serializers.ModelSerializer):
+class ServiceRequestSerializer(RemainingBudgetMixin, serializers.ModelSerializer):
     vehicle = serializers.StringRelatedField()
+    budget = serializers.SerializerMethodField()
 
     class Meta:
         model = ServiceRequest
-        fields = ['id','vehicle','status','rejection_reason','current_approver_role','created_at','updated_at']
+        fields = ['id','vehicle','status','rejection_reason','current_approver_role','created_at','updated_at','budget']
         read_only_fields = ['status','current_approver_role','created_at','updated_at',]  
 
-class ServiceRequestDetailSerializer(serializers.ModelSerializer):
+class ServiceRequestDetailSerializer(RemainingBudgetMixin, serializers.ModelSerializer):
     vehicle = serializers.StringRelatedField()
+    budget = serializers.SerializerMethodField()
 
     class Meta:
         model = ServiceRequest
         fields = '__all__'
-        read_only_fields = ['status', 'current_approver_role', 'created_at', 'updated_at'] 
\ No newline at end of file
+        read_only_fields = ['status', 'current_approver_role', 'created_at', 'updated_at'] 
+
+
+class SignatureSampleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SignatureSample
+        fields = ['id', 'image', 'created_at']
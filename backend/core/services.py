@@ -1,24 +1,45 @@
+import bisect
+import csv
+import importlib
+import io
+import math
 import os
+import re
 import tempfile
+import threading
+import time
 from datetime import timedelta
 
-import cv2
-import numpy as np
-import requests
-import urllib
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Case, Exists, F, FloatField, OuterRef, Q, Value, When
 from django.utils import timezone
 from django.utils.translation import gettext as _
-from skimage.metrics import structural_similarity as ssim
 
 from auth_app.models import User
-from .models import ActionLog, HighCostTransportRequest, RefuelingRequest, Vehicle
+from .models import ActionLog, FuelPrice, HighCostTransportRequest, MonthlyKilometerLog, RefuelingRequest, ServiceDueAlert, Vehicle
 from core.models import MaintenanceRequest, TransportRequest, Notification
 
 import logging
 logger = logging.getLogger(__name__)
 
+# Signature verification (OpenCV, NumPy) and SMS live in their own modules so that importing
+# this one, which every view does, doesn't load them; the old names still resolve from here.
+_MOVED = {
+    'send_sms': 'core.sms',
+    **{name: 'core.signatures' for name in [
+        'preprocess_signature', 'compare_signatures', 'SignatureFeatures', 'decode_signature_upload',
+        'signature_features', 'signature_similarity', 'SignatureTemplateStack', 'SignatureTemplates',
+    ]},
+}
+
+
+def __getattr__(name):
+    if name in _MOVED:
+        return getattr(importlib.import_module(_MOVED[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 class NotificationService:
     NOTIFICATION_TEMPLATES = {
@@ -137,6 +158,11 @@ class NotificationService:
             'message': "{completer} has completed the trip to {destination}. Vehicle: {vehicle}.",
             'priority': 'normal',
     },
+        'escalation': {
+            'title': _("Requests Awaiting Your Approval"),
+            'message': _("{count} request(s) are past the approval SLA and waiting for your action: {requests}."),
+            'priority': 'high'
+        },
 
     }
 
@@ -295,6 +321,15 @@ class NotificationService:
         Raises:
             ValueError: If the notification template for the given type is missing.
         """
+        Notification.objects.bulk_create(
+            cls.build_service_notifications(vehicle, recipients, notification_type)
+        )
+
+    @classmethod
+    def build_service_notifications(cls, vehicle: Vehicle, recipients: list[User], notification_type: str = 'service_due'):
+        """
+        Build (but do not save) service due notifications so callers can bulk-create them in one batch.
+        """
         template = cls.NOTIFICATION_TEMPLATES.get(notification_type)
         if not template:
             # Log this properly in real applications
@@ -318,8 +353,7 @@ class NotificationService:
                 metadata=request_data
             ) for recipient in recipients
         ]
-
-        Notification.objects.bulk_create(notifications)
+        return notifications
 
     @classmethod
     def send_trip_completion_notification(cls, transport_request, recipient: User, completer: str):
@@ -405,88 +439,324 @@ def log_action(request_obj, user, action, remarks=None):
         remarks=remarks,
     )
 
+class FuelCostEstimator:
+    """
+    Fuel and cost for N trips across M vehicles in one NumPy pass.
+
+    `distances_km` has one entry per trip and `efficiencies` (km/L) one per vehicle.
+    `prices_per_liter` may be a scalar, one price per vehicle (M,) or a full (N, M)
+    matrix, and `trip_factors` scales each trip's cost (refueling trips are costed
+    both ways). Cells for vehicles without a usable efficiency are NaN.
+
+    Liters are always for the one-way distance, as stored in fuel_needed_liters; only
+    the cost includes `trip_factors`. A negative or infinite price raises ValueError
+    (NaN stands for a missing price).
+    """
+
+    @staticmethod
+    def _prices(prices_per_liter):
+        import numpy as np
+        prices = np.asarray(prices_per_liter, dtype=float)
+        if np.isinf(prices).any() or (prices < 0).any():
+            raise ValueError("Fuel price per liter must be a finite, non-negative number.")
+        return prices
+
+    @staticmethod
+    def estimate(distances_km, efficiencies, prices_per_liter, trip_factors=1.0):
+        import numpy as np
+        distances = np.asarray(distances_km, dtype=float).reshape(-1, 1)
+        efficiency = np.asarray(
+            [np.nan if value is None else float(value) for value in efficiencies], dtype=float
+        ).reshape(1, -1)
+        usable = np.isfinite(efficiency) & (efficiency > 0)
+
+        liters = np.divide(
+            distances, efficiency,
+            out=np.full((distances.shape[0], efficiency.shape[1]), np.nan),
+            where=usable,
+        )
+        factors = np.asarray(trip_factors, dtype=float)
+        if factors.ndim == 1:
+            factors = factors.reshape(-1, 1)
+        cost = liters * FuelCostEstimator._prices(prices_per_liter) * factors
+        return liters, cost
+
+    @staticmethod
+    def estimate_pairs(distances_km, efficiencies, prices_per_liter, trip_factors=1.0):
+        """Like estimate() but for trip i on vehicle i: returns two 1-D arrays."""
+        import numpy as np
+        distances = np.asarray(distances_km, dtype=float)
+        efficiency = np.asarray([np.nan if value is None else float(value) for value in efficiencies], dtype=float)
+        liters = np.divide(
+            distances, efficiency,
+            out=np.full(distances.shape, np.nan),
+            where=np.isfinite(efficiency) & (efficiency > 0),
+        )
+        prices = FuelCostEstimator._prices(
+            [np.nan if value is None else float(value) for value in np.atleast_1d(prices_per_liter)]
+        )
+        cost = liters * prices * np.asarray(trip_factors, dtype=float)
+        return liters, cost
+
+
+class FuelPriceBook:
+    """
+    In-process copy of the FuelPrice table for fast "price at date" lookups.
+
+    Each fuel type keeps its effective dates sorted so a lookup is a bisect. The copy
+    is dropped when a FuelPrice is saved or deleted in this process (see core.signals)
+    and reloaded at most every RELOAD_SECONDS to pick up changes made by other processes.
+    """
+
+    RELOAD_SECONDS = 300
+    _lock = threading.Lock()
+    _table = None
+    _loaded_at = 0.0
+
+    @classmethod
+    def invalidate(cls):
+        with cls._lock:
+            cls._table = None
+
+    @classmethod
+    def _load(cls):
+        with cls._lock:
+            if cls._table is not None and time.monotonic() - cls._loaded_at < cls.RELOAD_SECONDS:
+                return cls._table
+            table = {}
+            for fuel_type, effective_date, price in FuelPrice.objects.order_by('fuel_type', 'effective_date').values_list(
+                'fuel_type', 'effective_date', 'price_per_liter'
+            ):
+                dates, prices = table.setdefault(fuel_type, ([], []))
+                dates.append(effective_date)
+                prices.append(price)
+            cls._table, cls._loaded_at = table, time.monotonic()
+            return table
+
+    @classmethod
+    def price_at(cls, fuel_type, day=None):
+        """Decimal price per liter in effect on `day` (default today), or None if none was set yet."""
+        day = day or timezone.localdate()
+        dates, prices = cls._load().get(fuel_type, ((), ()))
+        index = bisect.bisect_right(dates, day)
+        return prices[index - 1] if index else None
+
+    @classmethod
+    def current_prices(cls):
+        return {fuel_type: cls.price_at(fuel_type) for fuel_type, _label in Vehicle.FUEL_TYPE_CHOICES}
+
+
 class RefuelingEstimator:
+    TRIP_FACTOR = 2  # refueling covers the trip there and back: cost is doubled, liters stay one-way
+
     @staticmethod
     def calculate_fuel_cost(distance_km, vehicle, price_per_liter):
         if not vehicle.fuel_efficiency:
             raise ValueError("Fuel efficiency must be set.")
-        fuel_needed = distance_km / float(vehicle.fuel_efficiency)
-        total_cost = fuel_needed * price_per_liter * 2
-        return round(fuel_needed, 2), round(total_cost, 2)
-
-
-
-def send_sms(phone_number: str, message: str):
-    base_url= settings.SMS_URL
-    if not base_url:
-        raise ValueError("SMS URL is not configured in settings.")
-    escaped_message = urllib.parse.quote(message, safe="")
-    sms_url = f"{base_url}&phonenumber={phone_number}&message={escaped_message}"
-
-    try:
-        response = requests.get(sms_url, timeout=10)
-        response.raise_for_status()
-        try:
-            return response.json()
-        except ValueError:
-            return {"status": "error", "message": "Invalid JSON", "raw": response.text}
-    except requests.exceptions.RequestException as e:
-        logger.error(f"SMS failed for {phone_number}: {e}")
-        raise e
-
-
-def preprocess_signature(img):
-    # Binarize
-    _, img_bin = cv2.threshold(img, 128, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
-    # Find contours
-    contours, _ = cv2.findContours(img_bin, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    if not contours:
-        return img_bin  # fallback
-    # Get bounding box of largest contour
-    cnt = max(contours, key=cv2.contourArea)
-    x, y, w, h = cv2.boundingRect(cnt)
-    cropped = img_bin[y:y+h, x:x+w]
-    # Deskew (simple angle correction)
-    coords = np.column_stack(np.where(cropped > 0))
-    angle = cv2.minAreaRect(coords)[-1]
-    if angle < -45:
-        angle = -(90 + angle)
-    else:
-        angle = -angle
-    (h, w) = cropped.shape
-    M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
-    deskewed = cv2.warpAffine(cropped, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
-    # Resize to standard size
-    final = cv2.resize(deskewed, (300, 100))
-    return final
-
-def compare_signatures(user_signature_path, uploaded_signature_file, threshold=35):
-   
-
-    # Read images in grayscale
-    img1 = cv2.imread(user_signature_path, 0)
-    img2 = cv2.imread(uploaded_signature_file, 0)
-
-    # Add these checks:
-    if img1 is None:
-        raise ValueError(f"Failed to load stored signature image from {user_signature_path}")
-    if img2 is None:
-        raise ValueError(f"Failed to load uploaded signature image from {uploaded_signature_file}")
-    img1 = preprocess_signature(img1)
-    img2 = preprocess_signature(img2)
-
-    # SSIM comparison
-    score, _ = ssim(img1, img2, full=True)
-    similarity = score * 100  # Convert to percentage
-
-    # --- Optional: Feature-based (ORB) matching ---
-    orb = cv2.ORB_create()
-    kp1, des1 = orb.detectAndCompute(img1, None)
-    kp2, des2 = orb.detectAndCompute(img2, None)
-    bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
-    matches = bf.match(des1, des2)
-    matches = sorted(matches, key=lambda x: x.distance)
-    feature_similarity = len(matches) / max(len(kp1), len(kp2)) * 100 if kp1 and kp2 else 0
-    similarity = (similarity + feature_similarity) / 2  # Combine scores if you want
-
-    return similarity, similarity >= threshold 
\ No newline at end of file
+        liters, cost = FuelCostEstimator.estimate(
+            [distance_km], [vehicle.fuel_efficiency], price_per_liter, RefuelingEstimator.TRIP_FACTOR
+        )
+        return round(float(liters[0, 0]), 2), round(float(cost[0, 0]), 2)
+
+
+class ServiceDueScanner:
+    """
+    Evaluates the fleet against its service interval in a single query and raises
+    at most one service-due alert per vehicle per service cycle.
+    """
+
+    @staticmethod
+    def threshold_for(vehicle):
+        """Service interval (km) for a vehicle: model override, then fuel type, then the default."""
+        by_model = settings.SERVICE_INTERVAL_KM_BY_MODEL
+        if vehicle.model in by_model:
+            return by_model[vehicle.model]
+        return settings.SERVICE_INTERVAL_KM_BY_FUEL_TYPE.get(vehicle.fuel_type, settings.SERVICE_INTERVAL_KM)
+
+    @staticmethod
+    def due_filter(margin_km=0):
+        """
+        Build a Q matching vehicles whose indexed `km_since_service` has reached their
+        configured threshold (less `margin_km`, to include vehicles that are nearly due).
+        Each branch is a range condition on the index rather than an expression.
+        """
+        by_model = settings.SERVICE_INTERVAL_KM_BY_MODEL
+        by_fuel_type = settings.SERVICE_INTERVAL_KM_BY_FUEL_TYPE
+
+        clauses = Q()
+        for model, km in by_model.items():
+            clauses |= Q(model=model, km_since_service__gte=km - margin_km)
+
+        remaining = ~Q(model__in=list(by_model)) if by_model else Q()
+        for fuel_type, km in by_fuel_type.items():
+            clauses |= remaining & Q(fuel_type=fuel_type, km_since_service__gte=km - margin_km)
+
+        if by_fuel_type:
+            remaining &= ~Q(fuel_type__in=list(by_fuel_type))
+        clauses |= remaining & Q(km_since_service__gte=settings.SERVICE_INTERVAL_KM - margin_km)
+        return clauses
+
+    @classmethod
+    def due_vehicles(cls, queryset=None, margin_km=0):
+        queryset = Vehicle.objects.all() if queryset is None else queryset
+        return queryset.filter(cls.due_filter(margin_km), is_deleted=False)
+
+    @classmethod
+    def scan(cls, queryset=None):
+        """
+        Alert on every due vehicle that has not been alerted in its current service cycle.
+        Returns the number of vehicles alerted.
+        """
+        already_alerted = ServiceDueAlert.objects.filter(
+            vehicle=OuterRef('pk'),
+            service_cycle_km=OuterRef('last_service_kilometers'),
+        )
+        vehicles = list(
+            cls.due_vehicles(queryset)
+            .exclude(Exists(already_alerted))
+            .select_related('driver')
+        )
+        if not vehicles:
+            return 0
+
+        managers = list(User.objects.filter(
+            role__in=[User.TRANSPORT_MANAGER, User.GENERAL_SYSTEM], is_active=True
+        ))
+
+        with transaction.atomic():
+            # Lock the candidates, then re-read their alerts: a concurrent scan that got there
+            # first has committed by now, so each vehicle is alerted and notified once per cycle
+            vehicle_ids = [vehicle.id for vehicle in vehicles]
+            list(Vehicle.objects.select_for_update().filter(pk__in=vehicle_ids).order_by('id').values_list('id'))
+            alerted = set(
+                ServiceDueAlert.objects.filter(vehicle_id__in=vehicle_ids)
+                .values_list('vehicle_id', 'service_cycle_km')
+            )
+            vehicles = [vehicle for vehicle in vehicles if (vehicle.id, vehicle.last_service_kilometers) not in alerted]
+
+            alerts = []
+            notifications = []
+            for vehicle in vehicles:
+                alerts.append(ServiceDueAlert(
+                    vehicle=vehicle,
+                    service_cycle_km=vehicle.last_service_kilometers,
+                    kilometers_at_alert=vehicle.total_kilometers,
+                ))
+                recipients = list(managers)
+                if vehicle.driver and vehicle.driver not in recipients:
+                    recipients.append(vehicle.driver)
+                notifications.extend(NotificationService.build_service_notifications(vehicle, recipients))
+
+            ServiceDueAlert.objects.bulk_create(alerts)
+            Notification.objects.bulk_create(notifications)
+
+        logger.info(f"Service-due scan alerted {len(vehicles)} vehicle(s).")
+        return len(vehicles)
+
+
+class KilometerLogImporter:
+    """
+    Month-end kilometer entry for many vehicles at once.
+
+    All rows are validated in one pass (two queries regardless of row count) and the
+    batch is applied all-or-nothing: logs are bulk inserted and odometers incremented
+    with one F() update per batch, then the service-due scan runs once.
+    """
+
+    BATCH_SIZE = 500
+    MONTH_PATTERN = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+    @staticmethod
+    def rows_from_csv(upload):
+        """Read rows from an uploaded CSV with a `vehicle` (id) or `license_plate` column and `kilometers_driven`."""
+        text = io.StringIO(upload.read().decode('utf-8-sig'))
+        return [
+            {key.strip(): (value or '').strip() for key, value in row.items() if key}
+            for row in csv.DictReader(text)
+        ]
+
+    @classmethod
+    def validate(cls, rows, month):
+        """Return (entries, errors). Each entry is (vehicle, kilometers); errors are keyed by row number."""
+        errors = {}
+        if not isinstance(month, str) or not cls.MONTH_PATTERN.match(month):
+            return [], {"month": "Month must be in YYYY-MM format."}
+
+        vehicle_ids, plates = set(), set()
+        for row in rows:
+            if row.get('vehicle') not in (None, ''):
+                vehicle_ids.add(str(row['vehicle']))
+            elif row.get('license_plate'):
+                plates.add(str(row['license_plate']))
+
+        vehicles = Vehicle.objects.filter(is_deleted=False).filter(
+            Q(pk__in=[vid for vid in vehicle_ids if vid.isdigit()]) | Q(license_plate__in=plates)
+        ).only('id', 'license_plate')
+        by_id = {str(vehicle.id): vehicle for vehicle in vehicles}
+        by_plate = {vehicle.license_plate: vehicle for vehicle in by_id.values()}
+        already_logged = set(
+            MonthlyKilometerLog.objects.filter(vehicle_id__in=[v.id for v in by_id.values()], month=month)
+            .values_list('vehicle_id', flat=True)
+        )
+
+        entries, seen = [], set()
+        for number, row in enumerate(rows, start=1):
+            if row.get('vehicle') not in (None, ''):
+                vehicle = by_id.get(str(row['vehicle']))
+            else:
+                vehicle = by_plate.get(str(row.get('license_plate')))
+            if vehicle is None:
+                errors[number] = "Vehicle not found."
+                continue
+            try:
+                kilometers = float(row.get('kilometers_driven'))
+            except (TypeError, ValueError):
+                errors[number] = "kilometers_driven must be a number."
+                continue
+            if not math.isfinite(kilometers) or not kilometers.is_integer():
+                errors[number] = "kilometers_driven must be a whole number."
+            elif kilometers < 1:
+                errors[number] = "kilometers_driven must be at least 1."
+            elif vehicle.id in already_logged:
+                errors[number] = f"Kilometers for {month} already recorded for {vehicle.license_plate}."
+            elif vehicle.id in seen:
+                errors[number] = f"{vehicle.license_plate} appears more than once."
+            else:
+                seen.add(vehicle.id)
+                entries.append((vehicle, int(kilometers)))
+        return entries, errors
+
+    @staticmethod
+    def conflicts(entries, month):
+        """License plates among `entries` that already have a log for `month`, e.g. recorded concurrently."""
+        return sorted(
+            MonthlyKilometerLog.objects.filter(vehicle_id__in=[vehicle.id for vehicle, kilometers in entries], month=month)
+            .values_list('vehicle__license_plate', flat=True)
+        )
+
+    @classmethod
+    def apply(cls, entries, month, user):
+        """Insert the logs and bump odometers. Returns the number of vehicles updated."""
+        with transaction.atomic():
+            for start in range(0, len(entries), cls.BATCH_SIZE):
+                batch = entries[start:start + cls.BATCH_SIZE]
+                MonthlyKilometerLog.objects.bulk_create([
+                    MonthlyKilometerLog(vehicle=vehicle, month=month, kilometers_driven=kilometers, recorded_by=user)
+                    for vehicle, kilometers in batch
+                ])
+                increment = Case(
+                    *[When(pk=vehicle.id, then=Value(kilometers)) for vehicle, kilometers in batch],
+                    default=Value(0.0),
+                    output_field=FloatField(),
+                )
+                # Vehicles reporting an odometer over telemetry already count their distance from it
+                Vehicle.objects.filter(
+                    pk__in=[vehicle.id for vehicle, kilometers in batch], odometer_km__isnull=True
+                ).update(
+                    total_kilometers=F('total_kilometers') + increment,
+                    km_since_service=F('km_since_service') + increment,
+                )
+
+        ServiceDueScanner.scan(Vehicle.objects.filter(pk__in=[vehicle.id for vehicle, kilometers in entries]))
+        logger.info(f"Recorded {month} kilometers for {len(entries)} vehicle(s).")
+        return len(entries)
@@ -0,0 +1,99 @@
+import logging
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from auth_app.models import User
+
+from .models import FuelPrice, MaintenanceRequest, ServiceRequest, SignatureSample, SignatureTemplate, Vehicle
+
+logger = logging.getLogger(__name__)
+
+
+def _sync_latest_pointer(instance, created, vehicle_field, pointer_field, status_field):
+    """
+    Keep Vehicle.<pointer_field>/<status_field> pointing at the vehicle's newest request.
+    A new request always becomes the latest; an update only matters if it is the latest.
+    """
+    vehicle_id = getattr(instance, f"{vehicle_field}_id")
+    vehicles = Vehicle.objects.filter(pk=vehicle_id)
+    if created:
+        vehicles.update(**{pointer_field: instance.pk, status_field: instance.status})
+    else:
+        vehicles.filter(**{pointer_field: instance.pk}).update(**{status_field: instance.status})
+
+    # Keep an already loaded vehicle in step so a later vehicle.save() doesn't write stale values back
+    field = instance._meta.get_field(vehicle_field)
+    if field.is_cached(instance):
+        vehicle = getattr(instance, vehicle_field)
+        if created or getattr(vehicle, f"{pointer_field}_id") == instance.pk:
+            setattr(vehicle, f"{pointer_field}_id", instance.pk)
+            setattr(vehicle, status_field, instance.status)
+
+
+def _reset_latest_pointer(instance, model, vehicle_field, pointer_field, status_field):
+    vehicle_id = getattr(instance, f"{vehicle_field}_id")
+    latest = (
+        model.objects.filter(**{f"{vehicle_field}_id": vehicle_id})
+        .order_by('-created_at', '-pk')
+        .values('pk', 'status')
+        .first()
+    )
+    Vehicle.objects.filter(pk=vehicle_id).update(**{
+        pointer_field: latest['pk'] if latest else None,
+        status_field: latest['status'] if latest else None,
+    })
+
+
+@receiver(post_save, sender=ServiceRequest)
+def update_latest_service_request(sender, instance, created, **kwargs):
+    _sync_latest_pointer(instance, created, 'vehicle', 'latest_service_request', 'latest_service_status')
+
+
+@receiver(post_save, sender=MaintenanceRequest)
+def update_latest_maintenance_request(sender, instance, created, **kwargs):
+    _sync_latest_pointer(instance, created, 'requesters_car', 'latest_maintenance_request', 'latest_maintenance_status')
+
+
+@receiver(post_delete, sender=ServiceRequest)
+def reset_latest_service_request(sender, instance, **kwargs):
+    _reset_latest_pointer(instance, ServiceRequest, 'vehicle', 'latest_service_request', 'latest_service_status')
+
+
+@receiver(post_delete, sender=MaintenanceRequest)
+def reset_latest_maintenance_request(sender, instance, **kwargs):
+    _reset_latest_pointer(
+        instance, MaintenanceRequest, 'requesters_car', 'latest_maintenance_request', 'latest_maintenance_status'
+    )
+
+
+@receiver(post_save, sender=FuelPrice)
+@receiver(post_delete, sender=FuelPrice)
+def fuel_price_changed(sender, **kwargs):
+    from .services import FuelPriceBook  # imported here to keep app loading light
+    FuelPriceBook.invalidate()
+
+
+@receiver(post_save, sender=User)
+def build_signature_template(sender, instance, update_fields=None, **kwargs):
+    """Precompute verification features when a signature image is uploaded."""
+    if not instance.signature_image or (update_fields is not None and 'signature_image' not in update_fields):
+        return
+    if SignatureTemplate.objects.filter(image_name=instance.signature_image.name).exists():
+        return
+    from .signatures import SignatureTemplates
+    try:
+        SignatureTemplates.for_image(instance.signature_image)
+    except Exception as e:  # verification falls back to computing it on first use
+        logger.error(f"Failed to build signature template for {instance.full_name}: {e}")
+
+
+@receiver(post_save, sender=SignatureSample)
+def build_signature_sample_template(sender, instance, created, **kwargs):
+    if not created or SignatureTemplate.objects.filter(image_name=instance.image.name).exists():
+        return
+    from .signatures import SignatureTemplates
+    try:
+        SignatureTemplates.for_image(instance.image)
+    except Exception as e:
+        logger.error(f"Failed to build signature template for sample #{instance.pk}: {e}")
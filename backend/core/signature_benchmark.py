@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+
+
+class SyntheticSignatures:
+    """
+    Synthetic signature images for benchmarking verification.
+
+    A "writer" is a smoothed random pen stroke. Genuine samples redraw the writer's stroke
+    with small tremor, an affine warp (rotation, scale, shear, shift), varying pen width and
+    scanner noise; skilled forgeries trace the same stroke with much larger deviations, and
+    random forgeries are simply another writer's genuine sample.
+    """
+
+    SIZE = (200, 600)  # height, width
+
+    def __init__(self, seed=0):
+        self.rng = np.random.default_rng(seed)
+
+    def writer(self):
+        steps = self.rng.normal(0, 14, (int(self.rng.integers(30, 60)), 2))
+        steps = np.apply_along_axis(lambda axis: np.convolve(axis, np.ones(3) / 3, mode='same'), 0, steps)
+        points = np.cumsum(steps, axis=0)
+        points -= points.mean(axis=0)
+        scale = min(1.0, 240 / max(np.ptp(points[:, 0]), 1), 80 / max(np.ptp(points[:, 1]), 1))
+        return points * scale + [self.SIZE[1] / 2, self.SIZE[0] / 2]
+
+    def genuine(self, stroke):
+        return self._render(stroke, tremor=1.5, rotation=3, scale=0.05, shear=0.05, shift=10)
+
+    def forgery(self, stroke):
+        return self._render(stroke, tremor=7, rotation=8, scale=0.12, shear=0.15, shift=20)
+
+    def pairs(self, writers=20, samples=5, templates=1):
+        """
+        (references, candidate, kind) with kind 'genuine', 'skilled' or 'random'; references
+        are `templates` genuine samples of the writer, as enrolled for verification.
+        """
+        strokes = [self.writer() for _ in range(writers)]
+        pairs = []
+        for index, stroke in enumerate(strokes):
+            reference = [self.genuine(stroke) for _ in range(templates)]
+            other = strokes[(index + 1) % len(strokes)]
+            for _ in range(samples):
+                pairs.append((reference, self.genuine(stroke), 'genuine'))
+                pairs.append((reference, self.forgery(stroke), 'skilled'))
+                pairs.append((reference, self.genuine(other), 'random'))
+        return pairs
+
+    def _render(self, stroke, tremor, rotation, scale, shear, shift):
+        points = stroke + self.rng.normal(0, tremor, stroke.shape)
+        height, width = self.SIZE
+        img = np.full(self.SIZE, 255, dtype=np.uint8)
+        cv2.polylines(img, [points.astype(np.int32).reshape(-1, 1, 2)], False, 0, int(self.rng.integers(2, 5)), cv2.LINE_AA)
+
+        warp = cv2.getRotationMatrix2D(
+            (width / 2, height / 2), self.rng.uniform(-rotation, rotation), 1 + self.rng.uniform(-scale, scale)
+        )
+        warp[0, 1] += self.rng.uniform(-shear, shear)
+        warp[:, 2] += self.rng.uniform(-shift, shift, 2)
+        img = cv2.warpAffine(img, warp, (width, height), borderValue=255)
+
+        noisy = img.astype(np.float32) + self.rng.normal(0, 8, img.shape)
+        return np.clip(noisy, 0, 255).astype(np.uint8)
+
+    def encoded(self, img):
+        return cv2.imencode('.png', img)[1].tobytes()
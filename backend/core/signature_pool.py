@@ -0,0 +1,183 @@
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+import django
+from django.conf import settings
+
+from core.signatures import SignatureTemplateStack, signature_similarity
+
+logger = logging.getLogger(__name__)
+
+
+class SignaturePoolBusy(Exception):
+    """Raised when the pool's queue is full, a comparison did not finish in time or the pool is restarting."""
+
+
+class SignatureComparisonFailed(Exception):
+    """Raised when a comparison failed unexpectedly in a worker; details are logged, not shown."""
+
+
+_resident_stacks = OrderedDict()  # per worker: template stacks whose matrices are already built
+RESIDENT_STACKS = 16
+
+
+def _resident(reference):
+    if not isinstance(reference, SignatureTemplateStack) or reference.key is None:
+        return reference
+    if reference.key in _resident_stacks:
+        _resident_stacks.move_to_end(reference.key)
+        return _resident_stacks[reference.key]
+    _resident_stacks[reference.key] = reference
+    if len(_resident_stacks) > RESIDENT_STACKS:
+        _resident_stacks.popitem(last=False)
+    return reference
+
+
+def _timed_similarity(reference, img, threshold):
+    began = time.perf_counter()
+    reference = _resident(reference)
+    result = signature_similarity(reference, img, threshold)
+    return result, time.perf_counter() - began
+
+
+class SignatureComparisonPool:
+    """
+    Runs signature comparisons in a bounded pool of worker processes so OpenCV/SSIM work
+    never holds a request thread or the event loop.
+
+    At most SIGNATURE_POOL_WORKERS + SIGNATURE_POOL_QUEUE comparisons are admitted at a time;
+    further calls fail fast with SignaturePoolBusy, as do calls that take longer than
+    SIGNATURE_POOL_TIMEOUT_SECONDS and calls whose worker died (the pool is then restarted).
+    A ValueError from the comparison (an unreadable image) is raised as is, anything else as
+    SignatureComparisonFailed. With SIGNATURE_POOL_WORKERS = 0 comparisons run inline.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = None
+        self._metrics = {
+            "submitted": 0, "completed": 0, "rejected": 0, "timed_out": 0, "failed": 0,
+            "in_flight": 0, "max_in_flight": 0, "compute_seconds": 0.0, "max_compute_seconds": 0.0,
+        }
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._slots = threading.BoundedSemaphore(settings.SIGNATURE_POOL_WORKERS + settings.SIGNATURE_POOL_QUEUE)
+                # Workers set Django up themselves in case processes are spawned rather than forked
+                self._executor = ProcessPoolExecutor(max_workers=settings.SIGNATURE_POOL_WORKERS, initializer=django.setup)
+            return self._executor
+
+    def _submit(self, reference, img, threshold):
+        executor = self._get_executor()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            self._count(rejected=1)
+            raise SignaturePoolBusy("Signature verification is busy, please retry shortly.")
+        try:
+            future = executor.submit(_timed_similarity, reference, img, threshold)
+        except BrokenProcessPool as e:
+            slots.release()
+            raise self._failure(e) from e
+        self._count(submitted=1, in_flight=1)
+        future.add_done_callback(partial(self._finished, slots))
+        return future
+
+    def _finished(self, slots, future):
+        slots.release()
+        if future.cancelled():
+            self._count(in_flight=-1)
+        elif future.exception() is not None:
+            self._count(in_flight=-1, failed=1)
+        else:
+            _result, elapsed = future.result()
+            self._count(in_flight=-1, completed=1, compute_seconds=elapsed)
+
+    def _failure(self, error):
+        """The exception to raise for a comparison that failed with `error`."""
+        if isinstance(error, BrokenProcessPool):
+            # A worker died (e.g. killed for memory); start a fresh pool for the next call
+            logger.warning("Signature pool broken, restarting it.")
+            self.shutdown()
+            return SignaturePoolBusy("Signature verification is restarting, please retry shortly.")
+        if isinstance(error, ValueError):
+            return error
+        logger.error("Signature comparison failed.", exc_info=error)
+        return SignatureComparisonFailed("Signature verification failed unexpectedly, please retry.")
+
+    def _timed_out(self, future):
+        future.cancel()
+        self._count(timed_out=1)
+        logger.warning(f"Signature comparison exceeded {settings.SIGNATURE_POOL_TIMEOUT_SECONDS}s.")
+        return SignaturePoolBusy("Signature verification timed out, please retry.")
+
+    def compare(self, reference, img, threshold=35):
+        """(similarity, passed) computed in a worker process; for synchronous views."""
+        if settings.SIGNATURE_POOL_WORKERS <= 0:
+            try:
+                return signature_similarity(reference, img, threshold)
+            except Exception as e:
+                raise self._failure(e) from e
+        future = self._submit(reference, img, threshold)
+        try:
+            result, _elapsed = future.result(timeout=settings.SIGNATURE_POOL_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            raise self._timed_out(future)
+        except Exception as e:
+            raise self._failure(e) from e
+        return result
+
+    async def compare_async(self, reference, img, threshold=35):
+        """(similarity, passed) computed in a worker process; awaitable from async views and consumers."""
+        if settings.SIGNATURE_POOL_WORKERS <= 0:
+            try:
+                return await asyncio.to_thread(signature_similarity, reference, img, threshold)
+            except Exception as e:
+                raise self._failure(e) from e
+        future = self._submit(reference, img, threshold)
+        try:
+            result, _elapsed = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=settings.SIGNATURE_POOL_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            raise self._timed_out(future)
+        except Exception as e:
+            raise self._failure(e) from e
+        return result
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self._metrics[key] += delta
+            self._metrics["max_in_flight"] = max(self._metrics["max_in_flight"], self._metrics["in_flight"])
+            if "compute_seconds" in deltas:
+                self._metrics["max_compute_seconds"] = max(self._metrics["max_compute_seconds"], deltas["compute_seconds"])
+
+    def metrics(self):
+        """Counters since the process started, plus current queue depth and mean compute time."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics["queue_depth"] = max(metrics["in_flight"] - settings.SIGNATURE_POOL_WORKERS, 0)
+        metrics["capacity"] = settings.SIGNATURE_POOL_WORKERS + settings.SIGNATURE_POOL_QUEUE
+        metrics["mean_compute_seconds"] = (
+            metrics["compute_seconds"] / metrics["completed"] if metrics["completed"] else None
+        )
+        return metrics
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+signature_pool = SignatureComparisonPool()
+atexit.register(signature_pool.shutdown)
@@ -0,0 +1,241 @@
+import hashlib
+import io
+import logging
+import zlib
+from collections import namedtuple
+from functools import lru_cache
+
+import cv2
+import numpy as np
+from PIL import Image
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .models import SignatureSample, SignatureTemplate
+
+logger = logging.getLogger(__name__)
+
+
+def preprocess_signature(img):
+    # Binarize
+    _, img_bin = cv2.threshold(img, 128, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    # Find contours
+    contours, _ = cv2.findContours(img_bin, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return img_bin  # fallback
+    # Get bounding box of largest contour
+    cnt = max(contours, key=cv2.contourArea)
+    x, y, w, h = cv2.boundingRect(cnt)
+    cropped = img_bin[y:y+h, x:x+w]
+    # Deskew (simple angle correction)
+    coords = np.column_stack(np.where(cropped > 0))
+    angle = cv2.minAreaRect(coords)[-1]
+    if angle < -45:
+        angle = -(90 + angle)
+    else:
+        angle = -angle
+    (h, w) = cropped.shape
+    M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+    deskewed = cv2.warpAffine(cropped, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+    # Resize to standard size
+    final = cv2.resize(deskewed, (300, 100))
+    return final
+
+def compare_signatures(user_signature_path, uploaded_signature_file, threshold=35):
+   
+
+    # Read images in grayscale
+    img1 = cv2.imread(user_signature_path, 0)
+    img2 = cv2.imread(uploaded_signature_file, 0)
+
+    # Add these checks:
+    if img1 is None:
+        raise ValueError(f"Failed to load stored signature image from {user_signature_path}")
+    if img2 is None:
+        raise ValueError(f"Failed to load uploaded signature image from {uploaded_signature_file}")
+    return signature_similarity(signature_features(img1), img2, threshold)
+
+
+SignatureFeatures = namedtuple('SignatureFeatures', ['bitmap', 'keypoints', 'descriptors'])
+
+
+def decode_signature_upload(uploaded_file):
+    """
+    Decode an uploaded signature straight from memory into a grayscale image.
+    Size and pixel dimensions are checked (the latter from the image header) before decoding;
+    raises ValueError with a user-facing message when the upload is rejected.
+    """
+    if uploaded_file.size > settings.SIGNATURE_MAX_UPLOAD_BYTES:
+        raise ValueError(f"Signature image must be at most {settings.SIGNATURE_MAX_UPLOAD_BYTES // 1024} KB.")
+    content = uploaded_file.read()
+    try:
+        with Image.open(io.BytesIO(content)) as header:
+            width, height = header.size
+    except (OSError, Image.DecompressionBombError):
+        raise ValueError("Uploaded signature is not a readable image.")
+    if max(width, height) > settings.SIGNATURE_MAX_DIMENSION:
+        raise ValueError(f"Signature image must be at most {settings.SIGNATURE_MAX_DIMENSION} pixels wide and high.")
+    img = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        raise ValueError("Uploaded signature is not a readable image.")
+    return img
+
+
+def signature_features(img):
+    """Normalized bitmap and ORB keypoints/descriptors of a grayscale signature image."""
+    bitmap = preprocess_signature(img)
+    keypoints, descriptors = cv2.ORB_create().detectAndCompute(bitmap, None)
+    return SignatureFeatures(bitmap, len(keypoints), descriptors)
+
+
+def signature_similarity(reference, img, threshold=35):
+    """
+    Compare a raw grayscale image against precomputed reference features, or against every
+    template of a SignatureTemplateStack keeping the best score: (similarity, passed).
+    """
+    if not isinstance(reference, SignatureTemplateStack):
+        reference = SignatureTemplateStack([reference])
+    similarity = float(reference.similarities(img).max())
+    return similarity, similarity >= threshold
+
+
+class SignatureTemplateStack:
+    """
+    Several enrolled signature templates stacked into matrices so an upload is scored against
+    all of them in one pass.
+
+    The upload is preprocessed and ORB-described once. SSIM (7x7 window, as skimage computes it)
+    runs over the stacked bitmaps, with the templates' local means and variances computed once
+    per stack; descriptors are matched against all templates with a single Hamming distance
+    matrix (bit matrices multiplied), keeping cross-checked matches per template. Scores equal
+    comparing the upload with each template in turn.
+    """
+
+    WINDOW = 7
+    C1, C2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+
+    def __init__(self, features, key=None):
+        self.features = list(features)
+        self.key = key
+        self._matrices = None
+
+    def __getstate__(self):
+        # Only the compact features cross process boundaries; matrices are rebuilt where used
+        return {'features': self.features, 'key': self.key, '_matrices': None}
+
+    def __len__(self):
+        return len(self.features)
+
+    @classmethod
+    def _box(cls, a):
+        return cv2.boxFilter(a, -1, (cls.WINDOW, cls.WINDOW), borderType=cv2.BORDER_REFLECT).reshape(a.shape)
+
+    def _build(self):
+        shapes = {}
+        for index, features in enumerate(self.features):
+            shapes.setdefault(features.bitmap.shape, []).append(index)
+        covariance = self.WINDOW ** 2 / (self.WINDOW ** 2 - 1)  # sample covariance, as skimage
+        bitmaps = {}
+        for shape, indexes in shapes.items():
+            y = np.dstack([self.features[index].bitmap for index in indexes])
+            uy = self._box(y.astype(np.float64))
+            bitmaps[shape] = (indexes, y, uy, covariance * (self._box(np.square(y, dtype=np.float64)) - uy * uy))
+
+        described = [index for index, features in enumerate(self.features) if features.keypoints and features.descriptors is not None]
+        bits = counts = None
+        if described:
+            bits = np.unpackbits(np.concatenate([self.features[index].descriptors for index in described]), axis=1).astype(np.float32)
+            counts = np.cumsum([0] + [len(self.features[index].descriptors) for index in described])
+        self._matrices = (covariance, bitmaps, described, bits, counts)
+        return self._matrices
+
+    def similarities(self, img):
+        """Similarity (0-100) of a raw grayscale image to each template."""
+        covariance, bitmaps, described, bits, counts = self._matrices or self._build()
+        img = preprocess_signature(img)
+        structural = np.zeros(len(self.features))
+        if img.shape in bitmaps:
+            indexes, y, uy, vy = bitmaps[img.shape]
+            x = img.astype(np.float64)[..., None]
+            ux = self._box(x)
+            vx = covariance * (self._box(x * x) - ux * ux)
+            vxy = covariance * (self._box(x * y) - ux * uy)  # float64 image times the uint8 stack
+            ssim_map = ((2 * ux * uy + self.C1) * (2 * vxy + self.C2)) / ((ux * ux + uy * uy + self.C1) * (vx + vy + self.C2))
+            pad = (self.WINDOW - 1) // 2
+            structural[indexes] = ssim_map[pad:-pad, pad:-pad].mean(axis=(0, 1)) * 100
+
+        feature = np.zeros(len(self.features))
+        keypoints, descriptors = cv2.ORB_create().detectAndCompute(img, None)
+        if keypoints and described:
+            query = np.unpackbits(descriptors, axis=1).astype(np.float32)
+            distances = query.sum(axis=1)[:, None] + bits.sum(axis=1)[None, :] - 2 * (query @ bits.T)
+            for position, index in enumerate(described):
+                block = distances[:, counts[position]:counts[position + 1]]
+                best_train, best_query = block.argmin(axis=1), block.argmin(axis=0)
+                matches = np.count_nonzero(best_query[best_train] == np.arange(len(best_train)))
+                feature[index] = matches / max(self.features[index].keypoints, len(keypoints)) * 100
+        return (structural + feature) / 2
+
+
+class SignatureTemplates:
+    """
+    Precomputed features of users' stored signature images.
+
+    Features are computed once when a signature image is uploaded and stored in
+    SignatureTemplate keyed by the file's SHA-256 (bitmap and descriptors as compressed
+    bytes). Lookups by image name go through an in-process LRU, so verifying a signature
+    only has to process the uploaded image.
+    """
+
+    @classmethod
+    def for_image(cls, image_field):
+        """Features for a stored ImageField file, computing and storing them on first use."""
+        return cls._features(image_field.name)
+
+    @classmethod
+    def for_user(cls, user):
+        """A SignatureTemplateStack of the user's signature image and enrolled samples."""
+        names = [user.signature_image.name]
+        names += SignatureSample.objects.filter(user=user).order_by('id').values_list('image', flat=True)
+        return cls._stack(tuple(names))
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _stack(names):
+        return SignatureTemplateStack([SignatureTemplates._features(name) for name in names], key=names)
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _features(name):
+        template = SignatureTemplate.objects.filter(image_name=name).first()
+        if template is None:
+            with default_storage.open(name, 'rb') as handle:
+                template = SignatureTemplates.store(name, handle.read())
+        return SignatureTemplates.decode(template)
+
+    @staticmethod
+    def store(name, content):
+        """Compute and save the template of an image file's bytes."""
+        img = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            raise ValueError(f"Failed to load stored signature image from {name}")
+        features = signature_features(img)
+        descriptors = features.descriptors if features.descriptors is not None else np.zeros((0, 32), dtype=np.uint8)
+        template, _ = SignatureTemplate.objects.update_or_create(
+            file_hash=hashlib.sha256(content).hexdigest(),
+            defaults={
+                'image_name': name,
+                'width': features.bitmap.shape[1],
+                'height': features.bitmap.shape[0],
+                'bitmap': zlib.compress(np.ascontiguousarray(features.bitmap, dtype=np.uint8).tobytes()),
+                'keypoints': features.keypoints,
+                'descriptors': zlib.compress(np.ascontiguousarray(descriptors, dtype=np.uint8).tobytes()),
+            },
+        )
+        return template
+
+    @staticmethod
+    def decode(template):
+        bitmap = np.frombuffer(zlib.decompress(template.bitmap), dtype=np.uint8).reshape(template.height, template.width)
+        descriptors = np.frombuffer(zlib.decompress(template.descriptors), dtype=np.uint8).reshape(-1, 32)
+        return SignatureFeatures(bitmap, template.keypoints, descriptors if len(descriptors) else None)
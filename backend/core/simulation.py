@@ -0,0 +1,174 @@
+from datetime import date
+
+import numpy as np
+from django.core.cache import caches
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from auth_app.models import Department
+from core.models import HighCostTransportRequest, MaintenanceRequest, RefuelingRequest, ServiceRequest, Vehicle
+
+SERIES = ('distance_km', 'fuel_liters', 'fuel_cost', 'maintenance_cost', 'service_cost')
+
+
+def _month_index(moment):
+    return moment.year * 12 + moment.month - 1
+
+
+class FleetCostSimulator:
+    """
+    What-if projection of fleet spend.
+
+    Approved refueling, high-cost, maintenance and service requests are loaded once into
+    vehicles x months arrays, kept for an hour in the shared reports cache. A run averages
+    each calendar month over the history to get a seasonal baseline, applies the scenario
+    as per-vehicle multipliers and sums the result by department for the coming months.
+    """
+
+    CACHE_KEY = "fleet_cost_history"
+    CACHE_TIMEOUT = 60 * 60
+
+    @classmethod
+    def history(cls):
+        data = caches['reports'].get(cls.CACHE_KEY)
+        if data is None:
+            data = cls.load()
+            caches['reports'].set(cls.CACHE_KEY, data, cls.CACHE_TIMEOUT)
+        return data
+
+    @classmethod
+    def load(cls):
+        vehicles = list(Vehicle.objects.order_by('id').values_list('id', 'department_id', 'fuel_type'))
+        row_of = {vehicle_id: row for row, (vehicle_id, _department, _fuel) in enumerate(vehicles)}
+
+        entries = []  # (vehicle_id, created_at, series, value)
+        fuel_requests = [
+            RefuelingRequest.objects.filter(status='approved').annotate(car=F('requesters_car')),
+            HighCostTransportRequest.objects.filter(status='approved').annotate(car=Coalesce('vehicle', 'estimated_vehicle')),
+        ]
+        for queryset in fuel_requests:
+            for car, created_at, distance, liters, cost in queryset.values_list(
+                'car', 'created_at', 'estimated_distance_km', 'fuel_needed_liters', 'total_cost'
+            ):
+                entries.append((car, created_at, 'distance_km', distance))
+                entries.append((car, created_at, 'fuel_liters', liters))
+                entries.append((car, created_at, 'fuel_cost', cost))
+        for car, created_at, cost in MaintenanceRequest.objects.filter(status='approved').values_list(
+            'requesters_car', 'created_at', 'maintenance_total_cost'
+        ):
+            entries.append((car, created_at, 'maintenance_cost', cost))
+        for car, created_at, cost in ServiceRequest.objects.filter(status='approved').values_list(
+            'vehicle', 'created_at', 'service_total_cost'
+        ):
+            entries.append((car, created_at, 'service_cost', cost))
+
+        entries = [entry for entry in entries if entry[0] in row_of and entry[3] is not None]
+        last_complete = _month_index(timezone.localdate()) - 1  # the running month would drag averages down
+        first = min((_month_index(entry[1]) for entry in entries), default=last_complete)
+        width = max(last_complete - first + 1, 0)
+
+        series = {name: np.zeros((len(vehicles), width)) for name in SERIES}
+        if entries:
+            rows = np.array([row_of[entry[0]] for entry in entries])
+            cols = np.array([_month_index(entry[1]) - first for entry in entries])
+            values = np.array([float(entry[3]) for entry in entries])
+            names = np.array([entry[2] for entry in entries])
+            keep = cols < width
+            for name in SERIES:
+                mask = keep & (names == name)
+                np.add.at(series[name], (rows[mask], cols[mask]), values[mask])
+
+        return {
+            'vehicle_ids': np.array([vehicle_id for vehicle_id, _department, _fuel in vehicles]),
+            'departments': np.array([department or 0 for _vehicle, department, _fuel in vehicles]),
+            'fuel_types': np.array([fuel for _vehicle, _department, fuel in vehicles]),
+            'first_month': first,
+            'series': series,
+        }
+
+    @classmethod
+    def run(cls, fuel_price_change_pct=0.0, fuel_price_change_pct_by_type=None, efficiency_change_pct=0.0,
+            distance_change_pct=0.0, maintenance_cost_change_pct=0.0, service_cost_change_pct=0.0,
+            horizon_months=12):
+        data = cls.history()
+        series = data['series']
+        width = series['fuel_cost'].shape[1]
+
+        # Seasonal baseline: mean of each calendar month over the history (vehicles x 12)
+        calendar = (data['first_month'] + np.arange(width)) % 12
+        baseline = {}
+        for name in SERIES:
+            monthly = np.zeros((series[name].shape[0], 12))
+            for month in range(12):
+                columns = calendar == month
+                if columns.any():
+                    monthly[:, month] = series[name][:, columns].mean(axis=1)
+            baseline[name] = monthly
+
+        # Scenario multipliers (per vehicle where they differ by fuel type)
+        price = np.full(len(data['vehicle_ids']), 1 + fuel_price_change_pct / 100)
+        for fuel_type, pct in (fuel_price_change_pct_by_type or {}).items():
+            price[data['fuel_types'] == fuel_type] = 1 + pct / 100
+        distance = 1 + distance_change_pct / 100
+        efficiency = 1 + efficiency_change_pct / 100
+        scenario = {
+            'distance_km': baseline['distance_km'] * distance,
+            'fuel_liters': baseline['fuel_liters'] * distance / efficiency,
+            'fuel_cost': baseline['fuel_cost'] * (distance / efficiency) * price[:, None],
+            'maintenance_cost': baseline['maintenance_cost'] * (1 + maintenance_cost_change_pct / 100),
+            'service_cost': baseline['service_cost'] * (1 + service_cost_change_pct / 100),
+        }
+
+        start = _month_index(timezone.localdate()) + 1
+        months = start + np.arange(horizon_months)
+        labels = [date(index // 12, index % 12 + 1, 1).strftime('%Y-%m') for index in months]
+
+        department_ids, department_rows = np.unique(data['departments'], return_inverse=True)
+        names = dict(Department.objects.filter(id__in=department_ids.tolist()).values_list('id', 'name'))
+
+        def by_department(values):
+            projected = values[:, months % 12]  # vehicles x horizon
+            totals = np.zeros((len(department_ids), horizon_months))
+            np.add.at(totals, department_rows, projected)
+            return totals
+
+        results = {}
+        for label, source in (('baseline', baseline), ('scenario', scenario)):
+            results[label] = {name: by_department(source[name]) for name in SERIES}
+
+        def costs(result, row):
+            fuel = result['fuel_cost'][row]
+            maintenance = result['maintenance_cost'][row]
+            service = result['service_cost'][row]
+            return {
+                'fuel_cost': np.round(fuel, 2).tolist(),
+                'maintenance_cost': np.round(maintenance, 2).tolist(),
+                'service_cost': np.round(service, 2).tolist(),
+                'total_cost': np.round(fuel + maintenance + service, 2).tolist(),
+                'fuel_liters': np.round(result['fuel_liters'][row], 2).tolist(),
+                'distance_km': np.round(result['distance_km'][row], 1).tolist(),
+            }
+
+        def total(result):
+            return float(sum(result[name].sum() for name in ('fuel_cost', 'maintenance_cost', 'service_cost')))
+
+        baseline_total, scenario_total = total(results['baseline']), total(results['scenario'])
+        return {
+            'months': labels,
+            'departments': [
+                {
+                    'department_id': int(department_id) or None,
+                    'department': names.get(int(department_id), 'Unassigned'),
+                    'baseline': costs(results['baseline'], row),
+                    'scenario': costs(results['scenario'], row),
+                }
+                for row, department_id in enumerate(department_ids)
+            ],
+            'totals': {
+                'baseline_cost': round(baseline_total, 2),
+                'scenario_cost': round(scenario_total, 2),
+                'change': round(scenario_total - baseline_total, 2),
+                'change_pct': round((scenario_total / baseline_total - 1) * 100, 2) if baseline_total else None,
+            },
+        }
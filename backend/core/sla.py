@@ -0,0 +1,126 @@
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F, Max, Window
+from django.db.models.functions import Lag
+from django.utils import timezone
+
+from core.models import ActionLog, ApprovalSLAMonthly, ApprovalStageTiming
+
+
+class ApprovalSLARollup:
+    """
+    Approval latency per request type and approver role.
+
+    The wait before each ActionLog entry is measured in SQL with LAG over the entries of the
+    same request (ordered by time); a request's first entry is measured from the request's
+    created_at. Every forward, approval and rejection is logged with the acting approver's
+    role, so each wait is charged to the role the request was sitting with. Requests acted
+    on before forwards were logged only have their final entry, which charges the whole
+    span from created_at to the final approver; a full refresh does not change that.
+
+    Only requests with entries that have no ApprovalStageTiming yet are processed, and only
+    the months of their timings are re-summarized into ApprovalSLAMonthly, so a refresh
+    costs proportional to the new activity.
+
+    Entries can commit out of order, so each refresh looks for unprocessed entries from
+    RESCAN_SECONDS before the newest processed one on, and recomputes the timings of those
+    requests over the same window (a late entry changes the wait of the next one).
+    """
+
+    BATCH_SIZE = 1000
+    CHUNK_SIZE = 500  # request ids per window query
+    RESCAN_SECONDS = 60 * 60  # longest an approval transaction may take to commit and still be counted
+
+    @classmethod
+    def refresh(cls, full=False):
+        """Process new ActionLog entries (all of them with `full`). Returns (timings, monthly rows) written."""
+        with transaction.atomic():
+            if full:
+                ApprovalStageTiming.objects.all().delete()
+                ApprovalSLAMonthly.objects.all().delete()
+            last = ApprovalStageTiming.objects.aggregate(last=Max('action_log__timestamp'))['last']
+            # Capped at now so one future-dated entry cannot hide everything logged after it
+            since = min(last, timezone.now()) - timedelta(seconds=cls.RESCAN_SECONDS) if last else None
+
+            unprocessed = ActionLog.objects.filter(stage_timing__isnull=True)
+            if since is not None:
+                unprocessed = unprocessed.filter(timestamp__gte=since)
+            touched = defaultdict(set)
+            for content_type_id, object_id in unprocessed.values_list('content_type_id', 'object_id').distinct():
+                touched[content_type_id].add(object_id)
+
+            timings = []
+            for content_type_id, object_ids in touched.items():
+                object_ids = sorted(object_ids)
+                for start in range(0, len(object_ids), cls.CHUNK_SIZE):
+                    timings += cls._timings(content_type_id, object_ids[start:start + cls.CHUNK_SIZE], since)
+            ApprovalStageTiming.objects.bulk_create(
+                timings,
+                batch_size=cls.BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['action_log'],
+                update_fields=['seconds'],
+            )
+
+            monthly = cls._summarize({(timing.content_type_id, timing.month) for timing in timings})
+        return len(timings), monthly
+
+    @classmethod
+    def _timings(cls, content_type_id, object_ids, since):
+        entries = (
+            ActionLog.objects.filter(content_type_id=content_type_id, object_id__in=object_ids)
+            .annotate(previous_at=Window(
+                expression=Lag('timestamp'),
+                partition_by=[F('content_type'), F('object_id')],
+                order_by=[F('timestamp').asc(), F('id').asc()],
+            ))
+            .values_list('id', 'object_id', 'approver_role', 'action', 'timestamp', 'previous_at')
+        )
+        entries = [entry for entry in entries if since is None or entry[4] >= since]
+
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        first_entries = [object_id for _id, object_id, _role, _action, _at, previous_at in entries if previous_at is None]
+        created = dict(model.objects.filter(pk__in=first_entries).values_list('pk', 'created_at')) if model else {}
+
+        timings = []
+        for log_id, object_id, role, action, timestamp, previous_at in entries:
+            since = previous_at or created.get(object_id)
+            if since is None:
+                continue  # the request itself is gone
+            timings.append(ApprovalStageTiming(
+                action_log_id=log_id, content_type_id=content_type_id, approver_role=role, action=action,
+                month=timezone.localdate(timestamp).replace(day=1),
+                seconds=max(int((timestamp - since).total_seconds()), 0),
+            ))
+        return timings
+
+    @classmethod
+    def _summarize(cls, keys):
+        """Recompute ApprovalSLAMonthly for the given (content_type_id, month) pairs."""
+        samples = defaultdict(list)
+        for content_type_id, month in keys:
+            for role, seconds in ApprovalStageTiming.objects.filter(
+                content_type_id=content_type_id, month=month
+            ).values_list('approver_role', 'seconds'):
+                samples[(content_type_id, role, month)].append(seconds)
+
+        rows = []
+        for (content_type_id, role, month), values in samples.items():
+            values = np.asarray(values, dtype=float)
+            p50, p90, p95 = np.percentile(values, [50, 90, 95])
+            rows.append(ApprovalSLAMonthly(
+                content_type_id=content_type_id, approver_role=role, month=month, count=len(values),
+                mean_seconds=int(values.mean()), p50_seconds=int(p50), p90_seconds=int(p90), p95_seconds=int(p95),
+            ))
+        ApprovalSLAMonthly.objects.bulk_create(
+            rows,
+            batch_size=cls.BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['content_type', 'approver_role', 'month'],
+            update_fields=['count', 'mean_seconds', 'p50_seconds', 'p90_seconds', 'p95_seconds'],
+        )
+        return len(rows)
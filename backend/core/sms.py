@@ -0,0 +1,26 @@
+import logging
+import urllib
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def send_sms(phone_number: str, message: str):
+    base_url= settings.SMS_URL
+    if not base_url:
+        raise ValueError("SMS URL is not configured in settings.")
+    escaped_message = urllib.parse.quote(message, safe="")
+    sms_url = f"{base_url}&phonenumber={phone_number}&message={escaped_message}"
+
+    try:
+        response = requests.get(sms_url, timeout=10)
+        response.raise_for_status()
+        try:
+            return response.json()
+        except ValueError:
+            return {"status": "error", "message": "Invalid JSON", "raw": response.text}
+    except requests.exceptions.RequestException as e:
+        logger.error(f"SMS failed for {phone_number}: {e}")
+        raise e
@@ -0,0 +1,296 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connection, transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from auth_app.models import User
+from core.models import TelemetryPoint, Vehicle, VehicleTelemetryHourly
+from core.services import ServiceDueScanner
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetryIngestor:
+    """Validates incoming telemetry rows, shared by the HTTP and WebSocket endpoints."""
+
+    @staticmethod
+    def allowed_vehicles(user, vehicle_ids):
+        """Ids among `vehicle_ids` the user may report for: drivers only their own vehicles."""
+        vehicles = Vehicle.objects.filter(pk__in=vehicle_ids, is_deleted=False)
+        if user.role == User.DRIVER:
+            vehicles = vehicles.filter(driver=user)
+        elif user.role != User.TRANSPORT_MANAGER:
+            return set()
+        return set(vehicles.values_list('id', flat=True))
+
+    @classmethod
+    def parse(cls, rows, user):
+        """Return (points, errors): unsaved TelemetryPoint instances and errors keyed by row number."""
+        vehicle_ids = {row.get('vehicle') for row in rows if isinstance(row.get('vehicle'), int)}
+        allowed = cls.allowed_vehicles(user, vehicle_ids)
+
+        points, errors = [], {}
+        now = timezone.now()
+        for number, row in enumerate(rows, start=1):
+            vehicle_id = row.get('vehicle')
+            if vehicle_id not in allowed:
+                errors[number] = "Unknown vehicle or not permitted to report for it."
+                continue
+            recorded_at = parse_datetime(str(row.get('recorded_at', '')))
+            if recorded_at is None:
+                errors[number] = "recorded_at must be an ISO 8601 datetime."
+                continue
+            if timezone.is_naive(recorded_at):
+                recorded_at = timezone.make_aware(recorded_at)
+            try:
+                odometer = cls._number(row.get('odometer_km'), 0, None)
+                latitude = cls._number(row.get('latitude'), -90, 90)
+                longitude = cls._number(row.get('longitude'), -180, 180)
+            except ValueError:
+                errors[number] = "odometer_km, latitude or longitude is out of range."
+                continue
+            if odometer is None and (latitude is None or longitude is None):
+                errors[number] = "A point needs an odometer reading or a position."
+                continue
+            points.append(TelemetryPoint(
+                vehicle_id=vehicle_id, recorded_at=recorded_at, odometer_km=odometer,
+                latitude=latitude, longitude=longitude, received_at=now,
+            ))
+        return points, errors
+
+    @staticmethod
+    def _number(value, minimum, maximum):
+        if value is None or value == '':
+            return None
+        value = float(value)
+        if value != value or value < minimum or (maximum is not None and value > maximum):
+            raise ValueError(value)
+        return value
+
+
+class TelemetryWriter:
+    """Writes a batch of points: raw rows, hourly aggregates and odometer roll-up in one transaction."""
+
+    BATCH_SIZE = 1000
+
+    @classmethod
+    def write(cls, points):
+        if not points:
+            return 0
+        with transaction.atomic():
+            TelemetryPoint.objects.bulk_create(points, batch_size=cls.BATCH_SIZE)
+            cls._merge_hourly(points)
+            driven = cls._roll_odometers(points)
+        if driven:
+            ServiceDueScanner.scan(Vehicle.objects.filter(pk__in=driven))
+        return len(points)
+
+    @classmethod
+    def _merge_hourly(cls, points):
+        """Fold the batch into VehicleTelemetryHourly, merging with rows already stored for the same hours."""
+        buckets = {}
+        for point in points:
+            key = (point.vehicle_id, point.recorded_at.replace(minute=0, second=0, microsecond=0))
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = VehicleTelemetryHourly(
+                    vehicle_id=key[0], hour=key[1], points=0, last_recorded_at=point.recorded_at,
+                )
+            position_at = point.recorded_at if point.latitude is not None and point.longitude is not None else None
+            cls._fold(bucket, point.odometer_km, point.odometer_km, 1, point.recorded_at,
+                      position_at, point.latitude, point.longitude)
+
+        existing = VehicleTelemetryHourly.objects.select_for_update().filter(
+            vehicle_id__in={vehicle_id for vehicle_id, _hour in buckets},
+            hour__in={hour for _vehicle_id, hour in buckets},
+        )
+        for row in existing:
+            bucket = buckets.get((row.vehicle_id, row.hour))
+            if bucket is not None:
+                cls._fold(bucket, row.odometer_min, row.odometer_max, row.points, row.last_recorded_at,
+                          row.last_position_at, row.last_latitude, row.last_longitude)
+
+        VehicleTelemetryHourly.objects.bulk_create(
+            buckets.values(),
+            batch_size=cls.BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['vehicle', 'hour'],
+            update_fields=[
+                'points', 'odometer_min', 'odometer_max', 'last_recorded_at',
+                'last_position_at', 'last_latitude', 'last_longitude',
+            ],
+        )
+
+    @staticmethod
+    def _fold(bucket, odometer_min, odometer_max, count, recorded_at, position_at, latitude, longitude):
+        bucket.points += count
+        if odometer_min is not None:
+            bucket.odometer_min = odometer_min if bucket.odometer_min is None else min(bucket.odometer_min, odometer_min)
+            bucket.odometer_max = odometer_max if bucket.odometer_max is None else max(bucket.odometer_max, odometer_max)
+        if position_at is not None and (bucket.last_position_at is None or position_at >= bucket.last_position_at):
+            bucket.last_position_at = position_at
+            bucket.last_latitude, bucket.last_longitude = latitude, longitude
+        bucket.last_recorded_at = max(bucket.last_recorded_at, recorded_at)
+
+    @staticmethod
+    def _roll_odometers(points):
+        """
+        Add odometer progress since the last reading to total_kilometers / km_since_service
+        with one statement for the whole batch. Returns ids of vehicles that moved.
+
+        Once a vehicle has an odometer reading, telemetry is the only source of its mileage:
+        monthly kilometer logs are still recorded for it but no longer added to the totals.
+        """
+        highest = {}
+        for point in points:
+            if point.odometer_km is not None and point.odometer_km > highest.get(point.vehicle_id, -1):
+                highest[point.vehicle_id] = point.odometer_km
+        if not highest:
+            return []
+
+        previous = dict(
+            Vehicle.objects.select_for_update().filter(pk__in=highest).values_list('id', 'odometer_km')
+        )
+        readings, deltas = {}, {}
+        for vehicle_id, reading in highest.items():
+            last = previous.get(vehicle_id)
+            if last is None:
+                readings[vehicle_id] = reading  # first reading is the baseline
+            elif reading > last:
+                readings[vehicle_id] = reading
+                if reading - last <= settings.TELEMETRY_MAX_ODOMETER_JUMP_KM:
+                    deltas[vehicle_id] = reading - last
+                else:
+                    logger.warning(f"Odometer of vehicle {vehicle_id} jumped {reading - last:.0f} km, rebasing.")
+        if not readings:
+            return []
+
+        increment = Case(
+            *[When(pk=vehicle_id, then=Value(delta)) for vehicle_id, delta in deltas.items()],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        Vehicle.objects.filter(pk__in=readings).update(
+            odometer_km=Case(
+                *[When(pk=vehicle_id, then=Value(reading)) for vehicle_id, reading in readings.items()],
+                output_field=FloatField(),
+            ),
+            total_kilometers=F('total_kilometers') + increment,
+            km_since_service=F('km_since_service') + increment,
+        )
+        return list(deltas)
+
+    @staticmethod
+    def prune(older_than):
+        """Delete raw points received before `older_than`; hourly aggregates are kept."""
+        deleted, _counts = TelemetryPoint.objects.filter(received_at__lt=older_than).delete()
+        return deleted
+
+
+class TelemetryBuffer:
+    """
+    In-process buffer in front of TelemetryWriter. Points are written once the buffer
+    holds TELEMETRY_FLUSH_SIZE points or its oldest point has waited TELEMETRY_FLUSH_SECONDS,
+    so each request only pays for an append. A background timer flushes a buffer that
+    stops receiving points, and whatever is left is flushed on exit.
+
+    A failed write keeps its points as a batch of their own, retried on the next flush;
+    past TELEMETRY_MAX_BUFFERED_POINTS the oldest are dropped. Failures other than losing
+    the database connection (a bad row, a constraint) would fail the same way again, so
+    a batch is dropped and logged after TELEMETRY_MAX_FLUSH_ATTEMPTS of those instead of
+    being retried forever.
+    """
+
+    def __init__(self):
+        self._points = []
+        self._retries = []  # (points, failed attempts) of batches that failed to write
+        self._oldest = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._points) + sum(len(points) for points, _attempts in self._retries)
+
+    def add(self, points):
+        with self._lock:
+            self._points.extend(points)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            due = (
+                len(self._points) >= settings.TELEMETRY_FLUSH_SIZE
+                or time.monotonic() - self._oldest >= settings.TELEMETRY_FLUSH_SECONDS
+            )
+            if not due:
+                self._schedule()
+        if due:
+            self.flush()
+        return len(points)
+
+    def flush(self):
+        with self._lock:
+            points, self._points, self._oldest = self._points, [], None
+            batches, self._retries = self._retries, []
+        if points:
+            batches.append((points, 0))
+        written = 0
+        for points, attempts in batches:
+            try:
+                written += TelemetryWriter.write(points)
+            except Exception as e:
+                self._failed(points, attempts, e)
+        return written
+
+    def _failed(self, points, attempts, error):
+        if not isinstance(error, (OperationalError, InterfaceError)):
+            attempts += 1
+        if attempts >= settings.TELEMETRY_MAX_FLUSH_ATTEMPTS:
+            vehicle_ids = sorted({point.vehicle_id for point in points})
+            logger.exception(
+                f"Dropping {len(points)} telemetry point(s) for vehicle(s) {vehicle_ids} after {attempts} failed writes."
+            )
+            return
+        logger.exception(f"Failed to write {len(points)} telemetry point(s), keeping them for a retry.")
+        with self._lock:
+            self._retries.append((points, attempts))
+            overflow = len(self) - settings.TELEMETRY_MAX_BUFFERED_POINTS
+            if overflow > 0:
+                self._drop_oldest(overflow)
+                logger.error(f"Telemetry buffer full, dropped the {overflow} oldest point(s).")
+            self._oldest = time.monotonic()  # wait a full interval before retrying
+            self._schedule()
+
+    def _drop_oldest(self, count):
+        """Drop `count` points from the oldest failed batches. Called with the lock held."""
+        while count > 0 and self._retries:
+            points, _attempts = self._retries[0]
+            if len(points) <= count:
+                self._retries.pop(0)
+                count -= len(points)
+            else:
+                del points[:count]
+                count = 0
+
+    def _schedule(self):
+        """Start the flush timer unless one is pending. Called with the lock held."""
+        if self._timer is None:
+            self._timer = threading.Timer(settings.TELEMETRY_FLUSH_SECONDS, self._flush_on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_on_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        finally:
+            connection.close()  # the timer thread's own connection
+
+
+telemetry_buffer = TelemetryBuffer()
+atexit.register(telemetry_buffer.flush)
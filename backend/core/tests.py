@@ -1,3 +1,30 @@
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from auth_app.models import User
+from core.models import ServiceRequest, Vehicle
+
+
+class ServiceUpdateTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create(
+            full_name="Transport Manager", email="tm@example.com", role=User.TRANSPORT_MANAGER, is_active=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def test_service_resets_km_since_service(self):
+        vehicle = Vehicle.objects.create(
+            license_plate="AA-1001", model="Hilux", capacity=4, source=Vehicle.ORGANIZATION_OWNED, total_kilometers=6000
+        )
+        self.assertEqual(vehicle.km_since_service, 6000)
+
+        response = self.client.post(reverse('service-request-transport-manager-update', args=[vehicle.id]))
+
+        self.assertEqual(response.status_code, 200)
+        vehicle.refresh_from_db()
+        self.assertEqual(vehicle.status, Vehicle.SERVICE)
+        self.assertEqual(vehicle.last_service_kilometers, 6000)
+        self.assertEqual(vehicle.km_since_service, 0)
+        self.assertTrue(ServiceRequest.objects.filter(vehicle=vehicle).exists())
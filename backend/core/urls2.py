@@ -1,6 +1,6 @@
 from django.urls import path
 
-from core.reportviews import DashboardOverviewAPIView, MonthlyRequestTrendsAPIView, RecentVehicleRequestsAPIView, RequestTypeDistributionAPIView
+from core.reportviews import ApprovalSLAAPIView, DashboardOverviewAPIView, DemandForecastAPIView, FleetCostWhatIfAPIView, FleetUtilizationHeatmapAPIView, MaintenanceForecastAPIView, MonthlyRequestTrendsAPIView, RecentVehicleRequestsAPIView, RequestTypeDistributionAPIView, SignaturePoolMetricsAPIView
 from core.views import (
     AssignVehicleAfterBudgetApprovalView,
     CouponRequestCreateView,
@@ -17,6 +17,7 @@ from core.views import (
     MaintenanceRequestDetailView,
     MaintenanceRequestListView,
     MaintenanceRequestOwnListView,
+    MaintenanceScheduleView,
     MarkMaintenancedVehicleAvailableView,
     MarkServicedVehicleAvailableView,
     RefuelingRequestActionView,
@@ -34,6 +35,7 @@ from core.views import (
     TripCompletionView,
     VehiclesAfterMaintenanceListView,
     VehiclesDueForServiceView,
+    VehiclesServiceUrgencyView,
 )
 
 urlpatterns = [
@@ -43,6 +45,7 @@ urlpatterns = [
    path('<int:request_id>/action/',MaintenanceRequestActionView.as_view(),name="maintenance-request-action"),
    path('<int:request_id>/submit-files/', MaintenanceFileSubmissionView.as_view(), name='submit-maintenance-files'),
    path('my/',MaintenanceRequestOwnListView.as_view(),name="maintenance-request-own"),
+   path('schedule/', MaintenanceScheduleView.as_view(), name='maintenance-schedule'),
    path('maintained-vehicles/', VehiclesAfterMaintenanceListView.as_view(), name='maintained-vehicles-list'),
    path('<int:vehicle_id>/mark-available/', MarkMaintenancedVehicleAvailableView.as_view(), name='mark-maintained-vehicle-available'),
 
@@ -74,6 +77,7 @@ urlpatterns_service=[
     path("<int:vehicle_id>/mark-service/",TransportManagerServiceUpdateView.as_view(),name="service-request-transport-manager-update"),
     path('list/',ServiceRequestListView.as_view(), name="service-request-list"),
     path("vehicles_list/",VehiclesDueForServiceView.as_view(), name="vehicles-due-for-service"),
+    path("vehicles-by-urgency/",VehiclesServiceUrgencyView.as_view(), name="vehicles-service-urgency"),
     path('serviced-vehicles/', ServicedVehiclesListView.as_view(), name='serviced-vehicles-list'),
     path('<int:vehicle_id>/mark-available/', MarkServicedVehicleAvailableView.as_view(), name='mark-vehicle-available'),
     path('<int:pk>/',ServiceRequestDetailView.as_view(),name="service-request-detail"),
@@ -84,6 +88,12 @@ urlpatterns_dashboard = [
     path('overview/', DashboardOverviewAPIView.as_view(), name='dashboard-overview'),
     path('monthly-trends/', MonthlyRequestTrendsAPIView.as_view(), name='dashboard-monthly-trends'),
     path('type-distribution/', RequestTypeDistributionAPIView.as_view(), name='dashboard-type-distribution'),
+    path('maintenance-forecast/', MaintenanceForecastAPIView.as_view(), name='dashboard-maintenance-forecast'),
+    path('demand-forecast/', DemandForecastAPIView.as_view(), name='dashboard-demand-forecast'),
+    path('utilization-heatmap/', FleetUtilizationHeatmapAPIView.as_view(), name='dashboard-utilization-heatmap'),
+    path('what-if/', FleetCostWhatIfAPIView.as_view(), name='dashboard-what-if'),
+    path('approval-sla/', ApprovalSLAAPIView.as_view(), name='dashboard-approval-sla'),
+    path('signature-pool/', SignaturePoolMetricsAPIView.as_view(), name='dashboard-signature-pool'),
 ]
 
 urlpatterns_coupon = [
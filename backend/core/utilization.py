@@ -0,0 +1,108 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+
+from core.models import Vehicle, VehicleStatusEvent, VehicleUtilizationDaily
+
+
+STATUS_FIELDS = {
+    Vehicle.AVAILABLE: 'seconds_available',
+    Vehicle.IN_USE: 'seconds_in_use',
+    Vehicle.SERVICE: 'seconds_service',
+    Vehicle.MAINTENANCE: 'seconds_maintenance',
+}
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class UtilizationRollup:
+    """
+    Builds VehicleUtilizationDaily rows from the vehicle status event log.
+
+    Each vehicle's status at the start of the range is taken from its last event
+    before the range, then the time between consecutive events is split at midnight
+    and added to the matching status bucket. Only whole days are rolled up, so the
+    rows for a day never change once written unless the range is rebuilt explicitly.
+    """
+
+    BATCH_SIZE = 1000
+
+    @classmethod
+    def pending_range(cls, until=None):
+        """Days not rolled up yet: from the day after the last rollup (or the first event) to `until`."""
+        until = until or timezone.localdate() - timedelta(days=1)
+        last_day = VehicleUtilizationDaily.objects.aggregate(last=Max('day'))['last']
+        if last_day is not None:
+            return last_day + timedelta(days=1), until
+        first_event = VehicleStatusEvent.objects.order_by('changed_at').values_list('changed_at', flat=True).first()
+        if first_event is None:
+            return None, until
+        return timezone.localdate(first_event), until
+
+    @classmethod
+    def build(cls, start, end):
+        """Roll up the days from `start` to `end` inclusive and return the number of rows written."""
+        if start is None or start > end:
+            return 0
+        range_start = _day_start(start)
+        range_end = _day_start(end + timedelta(days=1))
+
+        # Status each vehicle was in when the range opened
+        last_before = VehicleStatusEvent.objects.filter(
+            vehicle=OuterRef('pk'), changed_at__lt=range_start
+        ).order_by('-changed_at', '-id')
+        opening = dict(
+            Vehicle.objects.annotate(opening_status=Subquery(last_before.values('to_status')[:1]))
+            .filter(opening_status__isnull=False)
+            .values_list('id', 'opening_status')
+        )
+
+        changes = defaultdict(list)
+        events = VehicleStatusEvent.objects.filter(
+            changed_at__gte=range_start, changed_at__lt=range_end
+        ).order_by('changed_at', 'id').values_list('vehicle_id', 'changed_at', 'to_status')
+        for vehicle_id, changed_at, to_status in events.iterator():
+            changes[vehicle_id].append((changed_at, to_status))
+
+        totals = defaultdict(lambda: defaultdict(int))
+        for vehicle_id in set(opening) | set(changes):
+            current_status = opening.get(vehicle_id)
+            since = range_start
+            for changed_at, to_status in changes.get(vehicle_id, []):
+                if current_status is not None:
+                    cls._add_span(totals[vehicle_id], current_status, since, changed_at)
+                current_status, since = to_status, changed_at
+            if current_status is not None:
+                cls._add_span(totals[vehicle_id], current_status, since, range_end)
+
+        rows = [
+            VehicleUtilizationDaily(vehicle_id=vehicle_id, day=day, **seconds)
+            for vehicle_id, days in totals.items()
+            for day, seconds in days.items()
+        ]
+        VehicleUtilizationDaily.objects.bulk_create(
+            rows,
+            batch_size=cls.BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['vehicle', 'day'],
+            update_fields=list(STATUS_FIELDS.values()),
+        )
+        return len(rows)
+
+    @staticmethod
+    def _add_span(buckets, status, start, end):
+        """Add the seconds between `start` and `end` to `status`, split per local day."""
+        field = STATUS_FIELDS.get(status)
+        if field is None:
+            return
+        while start < end:
+            day = timezone.localdate(start)
+            boundary = min(end, _day_start(day + timedelta(days=1)))
+            if day not in buckets:
+                buckets[day] = dict.fromkeys(STATUS_FIELDS.values(), 0)
+            buckets[day][field] += int((boundary - start).total_seconds())
+            start = boundary
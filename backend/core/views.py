@@ -1,30 +1,42 @@
-from datetime import datetime
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from auth_app.permissions import  IsNotDriverOrAdminOrEmployee, IsTransportManager
+from auth_app.throttling import IPTokenBucketThrottle, PhoneTokenBucketThrottle, UserTokenBucketThrottle
 from auth_app.serializers import UserDetailSerializer
 from core import serializers
-from core.mixins import OTPVerificationMixin, SignatureVerificationMixin
-from core.models import ActionLog, CouponRequest, HighCostTransportRequest, MaintenanceRequest, MonthlyKilometerLog, RefuelingRequest, ServiceRequest, TransportRequest, Vehicle, Notification
+from core.mixins import OTPVerificationMixin, RemainingBudgetListMixin, SignatureVerificationMixin
+from core.models import ActionLog, CouponRequest, DepartmentBudget, FuelPrice, HighCostTransportRequest, MaintenanceRequest, MonthlyKilometerLog, RefuelingRequest, ServiceRequest, SignatureSample, TransportRequest, Vehicle, Notification
 from core.otp_manager import OTPManager
 from core.permissions import IsAllowedVehicleUser
-from core.serializers import ActionLogListSerializer, AssignedVehicleSerializer, CouponRequestSerializer, HighCostTransportRequestDetailSerializer, HighCostTransportRequestSerializer, MaintenanceRequestSerializer, MonthlyKilometerLogSerializer, RefuelingRequestDetailSerializer, RefuelingRequestSerializer, ServiceRequestDetailSerializer, ServiceRequestSerializer, TransportRequestSerializer, NotificationSerializer, VehicleSerializer
-from core.services import NotificationService, RefuelingEstimator, compare_signatures, log_action, send_sms
-from auth_app.models import User
-from django.db.models import Q, F, OuterRef,Subquery,Exists
+from core.scheduling import MaintenanceScheduler
+from core.budgets import BudgetLedger
+from core.distances import RouteEstimator
+from core.positions import live_positions
+from core.telemetry import TelemetryIngestor, telemetry_buffer
+from core.serializers import ActionLogListSerializer, AssignedVehicleSerializer, BudgetLedgerEntrySerializer, CouponRequestSerializer, DepartmentBudgetSerializer, FuelPriceSerializer, HighCostTransportRequestDetailSerializer, HighCostTransportRequestSerializer, MaintenanceRequestSerializer, MonthlyKilometerLogSerializer, RefuelingRequestDetailSerializer, RefuelingRequestSerializer, ServiceRequestDetailSerializer, ServiceRequestSerializer, SignatureSampleSerializer, TransportRequestSerializer, NotificationSerializer, VehicleSerializer, VehicleServiceUrgencySerializer
+from core.services import FuelCostEstimator, FuelPriceBook, KilometerLogImporter, NotificationService, RefuelingEstimator, ServiceDueScanner, log_action
+from core.sms import send_sms
+from auth_app.models import Department, User
+from django.db import IntegrityError, transaction
+from django.db.models import Q, F
 from django.core.exceptions import ValidationError
 from rest_framework.generics import RetrieveAPIView
 from django.core.exceptions import PermissionDenied
 from rest_framework import serializers  
 from rest_framework.exceptions import ValidationError  
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
 from django.utils import timezone
 
+import csv
 import logging
+import math
 
 logger = logging.getLogger(__name__)
 class MyAssignedVehicleView(APIView):
@@ -148,7 +160,7 @@ class HighCostTransportRequestCreateView(generics.CreateAPIView):
                 logger.error(f"Failed to send SMS to {ceo.full_name}: {e}")
 
 
-class HighCostTransportRequestListView(generics.ListAPIView):
+class HighCostTransportRequestListView(RemainingBudgetListMixin, generics.ListAPIView):
     queryset = HighCostTransportRequest.objects.all()
     serializer_class = HighCostTransportRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -222,8 +234,8 @@ class HighCostTransportRequestActionView(SignatureVerificationMixin,OTPVerificat
 
             highcost_request.status = 'forwarded'
             highcost_request.current_approver_role = next_role
-            highcost_request.save()
-            # log_action(request_obj=highcost_request,user=request.user,action="forwarded",remarks=request.data.get("remarks"))
+            highcost_request.save(update_fields=['status', 'current_approver_role', 'rejection_message', 'updated_at'])
+            log_action(request_obj=highcost_request,user=request.user,action="forwarded",remarks=request.data.get("remarks"))
 
             next_approvers =User.objects.filter(role=next_role, is_active=True) 
             for approver in next_approvers:
@@ -261,7 +273,7 @@ class HighCostTransportRequestActionView(SignatureVerificationMixin,OTPVerificat
 
             highcost_request.status = 'rejected'
             highcost_request.rejection_message = rejection_message
-            highcost_request.save()
+            highcost_request.save(update_fields=['status', 'current_approver_role', 'rejection_message', 'updated_at'])
             log_action(request_obj=highcost_request,user=request.user,action="rejected",remarks=highcost_request.rejection_message)
 
 
@@ -284,9 +296,11 @@ class HighCostTransportRequestActionView(SignatureVerificationMixin,OTPVerificat
         # ========== APPROVE (BUDGET_MANAGER) ==========
         elif action == 'approve':
             if current_role == User.BUDGET_MANAGER and highcost_request.current_approver_role == User.BUDGET_MANAGER:
-                highcost_request.status = 'approved'
-                highcost_request.save()
-                log_action(request_obj=highcost_request,user=request.user,action="approved",remarks=request.data.get("remarks"))
+                with transaction.atomic():
+                    highcost_request.status = 'approved'
+                    highcost_request.save(update_fields=['status', 'current_approver_role', 'rejection_message', 'updated_at'])
+                    log_action(request_obj=highcost_request,user=request.user,action="approved",remarks=request.data.get("remarks"))
+                    budget = BudgetLedger.charge(highcost_request, request.user)
 
                 approver = request.user.full_name
                 finance_manager = User.objects.get(role=User.FINANCE_MANAGER)
@@ -320,15 +334,178 @@ class HighCostTransportRequestActionView(SignatureVerificationMixin,OTPVerificat
                             send_sms(user.phone_number, sms_message)
                         except Exception as e:
                             logger.error(f"Failed to send SMS to {user.full_name}: {e}")
+                return Response({"message": "Request approved successfully.", "budget": BudgetLedger.summary(budget)}, status=200)
             else:
                 return Response({"error": "Approval not allowed at this stage."}, status=403)
 
         return Response({"message": f"Request {action}d successfully."}, status=200)
 
 
+class BatchFuelEstimateView(APIView):
+    """
+    Fuel and cost matrices for many pending requests across many candidate vehicles.
+
+    Body: {"highcost_request_ids": [...], "refueling_request_ids": [...],
+           "vehicle_ids": [...] (defaults to every available vehicle),
+           "fuel_price_per_liter": x (defaults to today's price for each vehicle's fuel type)}
+    Request distances come from the saved estimate, or the route estimator for the destination.
+    Refueling rows are costed both ways, like the single estimate; liters are one-way throughout.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    MAX_CELLS = 100_000
+
+    def post(self, request):
+        if request.user.role not in [
+            User.TRANSPORT_MANAGER, User.GENERAL_SYSTEM, User.CEO, User.BUDGET_MANAGER, User.FINANCE_MANAGER,
+        ]:
+            return Response({"error": "Access denied."}, status=403)
+
+        try:
+            highcost_ids = [int(pk) for pk in request.data.get('highcost_request_ids') or []]
+            refueling_ids = [int(pk) for pk in request.data.get('refueling_request_ids') or []]
+            vehicle_ids = [int(pk) for pk in request.data.get('vehicle_ids') or []]
+            fuel_price = request.data.get('fuel_price_per_liter')
+            fuel_price = float(fuel_price) if fuel_price not in (None, '') else None
+        except (TypeError, ValueError):
+            return Response({"error": "Ids must be integer lists and fuel_price_per_liter must be numeric."}, status=400)
+        if not highcost_ids and not refueling_ids:
+            return Response({"error": "Provide highcost_request_ids and/or refueling_request_ids."}, status=400)
+
+        rows, unresolved = [], []
+        trips = [
+            ('highcost', 1, HighCostTransportRequest.objects.filter(id__in=highcost_ids)),
+            ('refueling', RefuelingEstimator.TRIP_FACTOR, RefuelingRequest.objects.filter(id__in=refueling_ids)),
+        ]
+        for kind, factor, queryset in trips:
+            for pk, destination, distance in queryset.values_list('id', 'destination', 'estimated_distance_km').order_by('id'):
+                if distance is None:
+                    estimate = RouteEstimator.estimate(destination)
+                    distance = estimate["distance_km"] if estimate else None
+                if distance is None:
+                    unresolved.append({"type": kind, "id": pk, "destination": destination})
+                else:
+                    rows.append({"type": kind, "id": pk, "destination": destination, "distance_km": float(distance), "factor": factor})
+
+        vehicles = Vehicle.objects.filter(is_deleted=False, fuel_efficiency__gt=0)
+        if vehicle_ids:
+            vehicles = vehicles.filter(id__in=vehicle_ids)
+        else:
+            vehicles = vehicles.filter(status=Vehicle.AVAILABLE, is_active=True)
+        vehicles = list(vehicles.order_by('id').values('id', 'license_plate', 'model', 'fuel_type', 'fuel_efficiency'))
+
+        if len(rows) * len(vehicles) > self.MAX_CELLS:
+            return Response({"error": f"At most {self.MAX_CELLS} request x vehicle combinations per call."}, status=400)
+
+        try:
+            liters, cost = FuelCostEstimator.estimate(
+                [row["distance_km"] for row in rows],
+                [vehicle["fuel_efficiency"] for vehicle in vehicles],
+                fuel_price if fuel_price is not None else [
+                    float(FuelPriceBook.price_at(vehicle["fuel_type"]) or math.nan) for vehicle in vehicles
+                ],
+                [row.pop("factor") for row in rows],
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        def as_lists(matrix):
+            return [[None if math.isnan(value) else round(value, 2) for value in line] for line in matrix.tolist()]
+
+        return Response({
+            "requests": rows,
+            "unresolved_requests": unresolved,
+            "vehicles": [{**vehicle, "fuel_efficiency": float(vehicle["fuel_efficiency"])} for vehicle in vehicles],
+            "fuel_needed_liters": as_lists(liters),
+            "total_cost": as_lists(cost),
+        }, status=200)
+
+
+class FuelPriceListCreateView(generics.ListCreateAPIView):
+    """Fuel price history; the transport manager records a new price with the date it takes effect."""
+    serializer_class = FuelPriceSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = FuelPrice.objects.select_related('created_by')
+        fuel_type = self.request.query_params.get('fuel_type')
+        if fuel_type:
+            queryset = queryset.filter(fuel_type=fuel_type)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        if request.user.role != User.TRANSPORT_MANAGER:
+            return Response({"error": "Unauthorized: Only Transport Manager can set fuel prices."}, status=403)
+        return super().create(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+
+class DepartmentBudgetListView(APIView):
+    """
+    GET: budgets for a fiscal year (?fiscal_year=, default current) with remaining balance.
+    POST: the budget manager allocates {"department", "amount", "fiscal_year"?, "remarks"?};
+    a negative amount cuts the allocation.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        if request.user.role not in [User.BUDGET_MANAGER, User.FINANCE_MANAGER, User.CEO, User.GENERAL_SYSTEM, User.DEPARTMENT_MANAGER]:
+            return Response({"error": "Access denied."}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            fiscal_year = int(request.query_params.get('fiscal_year') or BudgetLedger.fiscal_year())
+        except ValueError:
+            return Response({"error": "fiscal_year must be a year."}, status=status.HTTP_400_BAD_REQUEST)
+        budgets = DepartmentBudget.objects.select_related('department').filter(fiscal_year=fiscal_year)
+        if request.user.role == User.DEPARTMENT_MANAGER:
+            budgets = budgets.filter(department_id=request.user.department_id)
+        return Response(DepartmentBudgetSerializer(budgets, many=True).data)
+
+    def post(self, request):
+        if request.user.role != User.BUDGET_MANAGER:
+            return Response({"error": "Unauthorized: Only Budget Manager can allocate budgets."}, status=status.HTTP_403_FORBIDDEN)
+        department = get_object_or_404(Department, id=request.data.get('department'))
+        try:
+            amount = Decimal(str(request.data.get('amount'))).quantize(Decimal('0.01'))
+            fiscal_year = int(request.data.get('fiscal_year') or BudgetLedger.fiscal_year())
+        except (InvalidOperation, TypeError, ValueError):
+            return Response({"error": "amount must be a number and fiscal_year a year."}, status=status.HTTP_400_BAD_REQUEST)
+        if not amount.is_finite() or amount == 0:
+            return Response({"error": "amount must be a non-zero number."}, status=status.HTTP_400_BAD_REQUEST)
+
+        budget = BudgetLedger.allocate(department, fiscal_year, amount, request.user, remarks=request.data.get('remarks'))
+        return Response(DepartmentBudgetSerializer(budget).data, status=status.HTTP_201_CREATED)
+
+
+class BudgetLedgerListView(generics.ListAPIView):
+    """Ledger entries of one department budget, oldest first."""
+    serializer_class = BudgetLedgerEntrySerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        budget = get_object_or_404(DepartmentBudget, id=self.kwargs['budget_id'])
+        user = self.request.user
+        allowed = user.role in [User.BUDGET_MANAGER, User.FINANCE_MANAGER, User.CEO, User.GENERAL_SYSTEM] or (
+            user.role == User.DEPARTMENT_MANAGER and user.department_id == budget.department_id
+        )
+        if not allowed:
+            raise PermissionDenied("Access denied.")
+        return budget.entries.select_related('content_type', 'created_by')
+
+
 class HighCostTransportEstimateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    def get(self, request, request_id):
+        """Suggested distance for the request's destination, to pre-fill the estimate form."""
+        if request.user.role != User.TRANSPORT_MANAGER:
+            return Response({"error": "Unauthorized: Only Transport Manager can perform this action."}, status=403)
+
+        highcost_request = get_object_or_404(HighCostTransportRequest, id=request_id)
+        suggestion = RouteEstimator.suggest(highcost_request.destination)
+        suggestion["fuel_prices"] = FuelPriceBook.current_prices()
+        return Response(suggestion, status=200)
+
     def post(self, request, request_id):
         if request.user.role != User.TRANSPORT_MANAGER:
             return Response({"error": "Unauthorized: Only Transport Manager can perform this action."}, status=403)
@@ -338,6 +515,12 @@ class HighCostTransportEstimateView(APIView):
         distance = request.data.get('estimated_distance_km')
         fuel_price = request.data.get('fuel_price_per_liter')
         estimated_vehicle_id = request.data.get('estimated_vehicle_id')
+        entered_distance = distance
+        if not distance:
+            distance = RouteEstimator.suggest(highcost_request.destination)['estimated_distance_km']
+        if not fuel_price and estimated_vehicle_id:
+            fuel_type = Vehicle.objects.filter(id=estimated_vehicle_id).values_list('fuel_type', flat=True).first()
+            fuel_price = FuelPriceBook.price_at(fuel_type)
 
         if not distance or not fuel_price or not estimated_vehicle_id:
             return Response({"error": "All fields are required: estimated_distance_km, fuel_price_per_liter, estimated_vehicle_id."}, status=400)
@@ -347,6 +530,8 @@ class HighCostTransportEstimateView(APIView):
             fuel_price = float(fuel_price)
         except ValueError:
             return Response({"error": "Distance and fuel price must be numeric."}, status=400)
+        if not (math.isfinite(distance) and distance > 0 and math.isfinite(fuel_price) and fuel_price > 0):
+            return Response({"error": "Distance and fuel price must be positive numbers."}, status=400)
 
         # Fetch and validate vehicle
         try:
@@ -361,11 +546,14 @@ class HighCostTransportEstimateView(APIView):
             return Response({"error": "Invalid vehicle selected."}, status=404)
 
         try:
-            fuel_needed = distance / float(vehicle.fuel_efficiency)
-            total_cost = fuel_needed * fuel_price
+            liters, cost = FuelCostEstimator.estimate([distance], [vehicle.fuel_efficiency], fuel_price)
+            fuel_needed, total_cost = float(liters[0, 0]), float(cost[0, 0])
         except Exception as e:
             return Response({"error": str(e)}, status=400)
 
+        if entered_distance:
+            RouteEstimator.remember(highcost_request.destination, distance)
+
         # Save estimation data to request
         highcost_request.estimated_distance_km = distance
         highcost_request.fuel_price_per_liter = fuel_price
@@ -598,7 +786,7 @@ class RefuelingRequestCreateView(generics.CreateAPIView):
                 logger.error(f"Failed to send SMS to {transport_manager.full_name}: {e}")
 
 
-class RefuelingRequestListView(generics.ListAPIView):
+class RefuelingRequestListView(RemainingBudgetListMixin, generics.ListAPIView):
     queryset = RefuelingRequest.objects.all()
     serializer_class = RefuelingRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -628,6 +816,15 @@ class RefuelingRequestOwnListView(generics.ListAPIView):
 class RefuelingRequestEstimateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    def get(self, request, request_id):
+        """Suggested distance for the request's destination, to pre-fill the estimate form."""
+        refueling_request = get_object_or_404(RefuelingRequest, id=request_id)
+        if request.user.role != User.TRANSPORT_MANAGER:
+            return Response({"error": "Unauthorized"}, status=403)
+        suggestion = RouteEstimator.suggest(refueling_request.destination)
+        suggestion["fuel_price_per_liter"] = FuelPriceBook.price_at(refueling_request.requesters_car.fuel_type)
+        return Response(suggestion, status=200)
+
     def post(self, request, request_id):
         refueling_request = get_object_or_404(RefuelingRequest, id=request_id)
         if request.user.role != User.TRANSPORT_MANAGER:
@@ -635,6 +832,11 @@ class RefuelingRequestEstimateView(APIView):
 
         distance = request.data.get('estimated_distance_km')
         price = request.data.get('fuel_price_per_liter')
+        entered_distance = distance
+        if not distance:
+            distance = RouteEstimator.suggest(refueling_request.destination)['estimated_distance_km']
+        if not price:
+            price = FuelPriceBook.price_at(refueling_request.requesters_car.fuel_type)
 
         if not distance or not price:
             return Response({"error": "Distance and fuel price are required."}, status=400)
@@ -642,12 +844,21 @@ class RefuelingRequestEstimateView(APIView):
         try:
             distance = float(distance)
             price = float(price)
+        except (TypeError, ValueError):
+            return Response({"error": "Distance and fuel price must be numeric."}, status=400)
+        if not (math.isfinite(distance) and distance > 0 and math.isfinite(price) and price > 0):
+            return Response({"error": "Distance and fuel price must be positive numbers."}, status=400)
+
+        try:
             fuel_needed, total_cost = RefuelingEstimator.calculate_fuel_cost(
                 distance, refueling_request.requesters_car, price
             )
         except Exception as e:
             return Response({"error": str(e)}, status=400)
 
+        if entered_distance:
+            RouteEstimator.remember(refueling_request.destination, distance)
+
         refueling_request.estimated_distance_km = distance
         refueling_request.fuel_price_per_liter = price
         refueling_request.fuel_needed_liters = fuel_needed
@@ -744,8 +955,8 @@ class RefuelingRequestActionView(SignatureVerificationMixin,OTPVerificationMixin
                     except Exception as e:
                         logger.error(f"Failed to send SMS to {approver.full_name}: {e}")
 
-            refueling_request.save()
-            # log_action(request_obj=refueling_request,user=request.user,action="forwarded",remarks=request.data.get('remarks'))
+            refueling_request.save(update_fields=['status', 'current_approver_role', 'rejection_message', 'updated_at'])
+            log_action(request_obj=refueling_request,user=request.user,action="forwarded",remarks=request.data.get('remarks'))
 
 
         # ====== REJECT ACTION ======
@@ -756,7 +967,7 @@ class RefuelingRequestActionView(SignatureVerificationMixin,OTPVerificationMixin
 
             refueling_request.status = 'rejected'
             refueling_request.rejection_message = rejection_message
-            refueling_request.save()
+            refueling_request.save(update_fields=['status', 'current_approver_role', 'rejection_message', 'updated_at'])
             log_action(request_obj=refueling_request,user=request.user,action="rejected",remarks=rejection_message)
 
             # # # Notify requester of rejection
@@ -777,9 +988,11 @@ class RefuelingRequestActionView(SignatureVerificationMixin,OTPVerificationMixin
         elif action == 'approve':
             if current_role == User.BUDGET_MANAGER and refueling_request.current_approver_role == User.BUDGET_MANAGER:
                 # Final approval by Transport Manager after Finance Manager has approved
-                refueling_request.status = 'approved'
-                refueling_request.save()
-                log_action(request_obj=refueling_request,user=request.user,action="approved",remarks=request.data.get("remarks"))
+                with transaction.atomic():
+                    refueling_request.status = 'approved'
+                    refueling_request.save(update_fields=['status', 'current_approver_role', 'rejection_message', 'updated_at'])
+                    log_action(request_obj=refueling_request,user=request.user,action="approved",remarks=request.data.get("remarks"))
+                    budget = BudgetLedger.charge(refueling_request, request.user)
                 
                 finance_manger= User.objects.filter(role=User.FINANCE_MANAGER).first()
                 # # # Notify the original requester of approval
@@ -800,6 +1013,8 @@ class RefuelingRequestActionView(SignatureVerificationMixin,OTPVerificationMixin
                             send_sms(user.phone_number, sms_message)
                         except Exception as e:
                             logger.error(f"Failed to send SMS to {user.full_name}: {e}")
+                return Response({"message": "Request approved successfully.", "budget": BudgetLedger.summary(budget)},
+                                status=status.HTTP_200_OK)
             else:
                 return Response({"error": f"{request.user.get_role_display()} cannot approve this request at this stage."}, 
                                 status=status.HTTP_403_FORBIDDEN)
@@ -807,7 +1022,7 @@ class RefuelingRequestActionView(SignatureVerificationMixin,OTPVerificationMixin
             return Response({"error": "Unexpected error occurred."}, status=status.HTTP_400_BAD_REQUEST)
         return  Response({"message": f"Request {action}d successfully."}, status=status.HTTP_200_OK)
    
-class MaintenanceRequestListView(generics.ListAPIView):
+class MaintenanceRequestListView(RemainingBudgetListMixin, generics.ListAPIView):
     queryset = MaintenanceRequest.objects.all()
     serializer_class = MaintenanceRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -916,8 +1131,8 @@ class MaintenanceRequestActionView(SignatureVerificationMixin,OTPVerificationMix
 
             maintenance_request.status = 'forwarded'
             maintenance_request.current_approver_role = next_role
-            maintenance_request.save()
-            # log_action(request_obj=maintenance_request,user=request.user,action="forwarded",remarks=request.data.get("remarks"))
+            maintenance_request.save(update_fields=['status', 'current_approver_role', 'rejection_message', 'updated_at'])
+            log_action(request_obj=maintenance_request,user=request.user,action="forwarded",remarks=request.data.get("remarks"))
 
             # Notify next approver(s)
             next_approvers = User.objects.filter(role=next_role, is_active=True)
@@ -944,7 +1159,7 @@ class MaintenanceRequestActionView(SignatureVerificationMixin,OTPVerificationMix
 
             maintenance_request.status = 'rejected'
             maintenance_request.rejection_message = rejection_message
-            maintenance_request.save()
+            maintenance_request.save(update_fields=['status', 'current_approver_role', 'rejection_message', 'updated_at'])
             log_action(request_obj=maintenance_request,user=request.user,action="rejected",remarks=maintenance_request.rejection_message)
 
             NotificationService.send_maintenance_notification(
@@ -966,10 +1181,12 @@ class MaintenanceRequestActionView(SignatureVerificationMixin,OTPVerificationMix
         elif action == 'approve':
             if current_role == User.BUDGET_MANAGER:
                 # Final approval
-                maintenance_request.status = 'approved'
-                # maintenance_request.requesters_car.mark_as_maintenance() 
-                maintenance_request.save()
-                log_action(request_obj=maintenance_request,user=request.user,action="approved",remarks=request.data.get("remarks"))
+                with transaction.atomic():
+                    maintenance_request.status = 'approved'
+                    # maintenance_request.requesters_car.mark_as_maintenance() 
+                    maintenance_request.save(update_fields=['status', 'current_approver_role', 'rejection_message', 'updated_at'])
+                    log_action(request_obj=maintenance_request,user=request.user,action="approved",remarks=request.data.get("remarks"))
+                    budget = BudgetLedger.charge(maintenance_request, request.user)
                 # Notify requester
                 NotificationService.send_maintenance_notification(
                     'maintenance_approved', maintenance_request, maintenance_request.requester,
@@ -994,7 +1211,10 @@ class MaintenanceRequestActionView(SignatureVerificationMixin,OTPVerificationMix
                         except Exception as e:
                             logger.error(f"Failed to send SMS to {user.full_name}: {e}")
 
-                return Response({"message": "Request approved successfully and finance notified."}, status=status.HTTP_200_OK)
+                return Response({
+                    "message": "Request approved successfully and finance notified.",
+                    "budget": BudgetLedger.summary(budget),
+                }, status=status.HTTP_200_OK)
 
             else:
                 return Response({
@@ -1049,17 +1269,8 @@ class VehiclesWithPendingMaintenanceRequestsView(generics.ListAPIView):
         if not hasattr(user, "role") or user.role != user.TRANSPORT_MANAGER:
             return Vehicle.objects.none()
 
-        # Subquery: Does a pending or forwarded maintenance request exist for this vehicle?
-        pending_or_forwarded_exists = MaintenanceRequest.objects.filter(
-            requesters_car=OuterRef('pk'),
-            status__in=['pending', 'forwarded']
-        )
-        queryset = Vehicle.objects.annotate(
-            has_pending_maintenance=Exists(pending_or_forwarded_exists)
-        ).filter(
-            has_pending_maintenance=True
-        )
-        return queryset
+        # Vehicles whose latest maintenance request is still pending or forwarded
+        return Vehicle.objects.filter(latest_maintenance_status__in=['pending', 'forwarded'])
 
 
 class VehicleMarkAsMaintenanceView(APIView):
@@ -1069,6 +1280,20 @@ class VehicleMarkAsMaintenanceView(APIView):
         vehicle = get_object_or_404(Vehicle, id=vehicle_id)
         vehicle.mark_as_maintenance()
         return Response({"message": "Vehicle status updated to maintenance."}, status=status.HTTP_200_OK)    
+class MaintenanceScheduleView(APIView):
+    permission_classes = [IsTransportManager, permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            capacity = int(request.query_params.get('capacity', 0)) or None
+            horizon_days = int(request.query_params.get('days', 0)) or None
+        except ValueError:
+            return Response({"error": "capacity and days must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        if (capacity is not None and capacity < 1) or (horizon_days is not None and not 1 <= horizon_days <= 180):
+            return Response({"error": "capacity must be positive and days between 1 and 180."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(MaintenanceScheduler.plan(capacity=capacity, horizon_days=horizon_days), status=status.HTTP_200_OK)
+
 class TransportRequestActionView(SignatureVerificationMixin,OTPVerificationMixin,APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -1115,7 +1340,7 @@ class TransportRequestActionView(SignatureVerificationMixin,OTPVerificationMixin
                     except Exception as e:
                         logger.error(f"Failed to send SMS to {approver.full_name}: {e}")
 
-            # log_action(request_obj=transport_request,user=request.user,action="forwarded",remarks=request.data.get("remarks"))
+            log_action(request_obj=transport_request,user=request.user,action="forwarded",remarks=request.data.get("remarks"))
 
         elif action == 'reject':
             transport_request.status = 'rejected'
@@ -1194,7 +1419,7 @@ class TransportRequestActionView(SignatureVerificationMixin,OTPVerificationMixin
                     send_sms(transport_request.requester.phone_number, requester_message)
             except Exception as sms_error:
                 logger.error(f"Failed to send SMS: {sms_error}")
-        transport_request.save()
+        transport_request.save(update_fields=['status', 'current_approver_role', 'rejection_message', 'vehicle', 'updated_at'])
         return Response({"message": f"Request {action}d successfully."}, status=status.HTTP_200_OK)
 
 class TransportRequestHistoryView(generics.ListAPIView):
@@ -1334,26 +1559,107 @@ class AddMonthlyKilometersView(generics.CreateAPIView):
             recorded_by=user
         )
 
-        # Update vehicle total kilometers
-        vehicle.total_kilometers += kilometers
-        vehicle.save()
+        # Update vehicle total kilometers (and the indexed km since service) atomically;
+        # vehicles reporting an odometer over telemetry are counted from that instead
+        Vehicle.objects.filter(pk=vehicle.pk, odometer_km__isnull=True).update(
+            total_kilometers=F('total_kilometers') + kilometers,
+            km_since_service=F('km_since_service') + kilometers,
+        )
+
+        # Check service threshold (alerts at most once per service cycle)
+        ServiceDueScanner.scan(Vehicle.objects.filter(pk=vehicle.pk))
+
 
-        # Get recipients for notifications
-        transport_managers = User.objects.filter(role=User.TRANSPORT_MANAGER, is_active=True)
-        general_systems = User.objects.filter(role=User.GENERAL_SYSTEM, is_active=True)
-        driver = vehicle.driver  # Get the single driver assigned to this vehicle
+class BulkMonthlyKilometersView(APIView):
+    """
+    Record a month's kilometers for many vehicles in one call.
 
-        if not driver:
-            raise ValueError("Vehicle has no assigned driver.")
+    Accepts JSON ({"month": "YYYY-MM", "entries": [{"vehicle": id | "license_plate": ..., "kilometers_driven": n}]})
+    or a CSV upload in `file` with the same columns. Month defaults to the current one.
+    Nothing is saved unless every row is valid.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsTransportManager]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    def post(self, request):
+        month = request.data.get('month') or timezone.now().strftime('%Y-%m')
+        upload = request.FILES.get('file')
+        if upload:
+            try:
+                rows = KilometerLogImporter.rows_from_csv(upload)
+            except (UnicodeDecodeError, csv.Error):
+                return Response({"error": "File must be a UTF-8 encoded CSV."}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            rows = request.data.get('entries')
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                return Response({"error": "Provide a list of entries or a CSV file."}, status=status.HTTP_400_BAD_REQUEST)
+        if not rows:
+            return Response({"error": "No entries provided."}, status=status.HTTP_400_BAD_REQUEST)
 
-        recipients = list(transport_managers) + list(general_systems) + [driver]
-        # Check service threshold
-        if (vehicle.total_kilometers - vehicle.last_service_kilometers) >= 5000:
-            NotificationService.send_service_notification(
-                vehicle=vehicle,
-                recipients=recipients
+        entries, errors = KilometerLogImporter.validate(rows, month)
+        if errors:
+            return Response({"error": "Some entries are invalid.", "rows": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            recorded = KilometerLogImporter.apply(entries, month, request.user)
+        except IntegrityError:
+            # Another request recorded some of these vehicles between validation and insert
+            return Response({
+                "error": f"Kilometers for {month} were recorded meanwhile for some vehicles; nothing was saved.",
+                "vehicles": KilometerLogImporter.conflicts(entries, month),
+            }, status=status.HTTP_409_CONFLICT)
+        return Response({"month": month, "recorded": recorded}, status=status.HTTP_201_CREATED)
+
+
+class TelemetryIngestView(APIView):
+    """
+    Batch odometer/position readings: {"points": [{"vehicle", "recorded_at", "odometer_km", "latitude", "longitude"}]}.
+    Drivers may report for their own vehicle, transport managers (or a gateway account) for any.
+    Valid points are buffered and written asynchronously; invalid rows are reported back.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        rows = request.data.get('points') if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            return Response({"error": "Provide a list of points."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.TELEMETRY_MAX_POINTS_PER_REQUEST:
+            return Response(
+                {"error": f"At most {settings.TELEMETRY_MAX_POINTS_PER_REQUEST} points per request."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            
+
+        points, errors = TelemetryIngestor.parse(rows, request.user)
+        if not points and errors:
+            return Response({"error": "No valid points.", "rows": errors}, status=status.HTTP_400_BAD_REQUEST)
+        live_positions.record(
+            (point.vehicle_id, point.latitude, point.longitude, point.recorded_at)
+            for point in points if point.latitude is not None and point.longitude is not None
+        )
+        accepted = telemetry_buffer.add(points)
+        return Response({"accepted": accepted, "rows": errors}, status=status.HTTP_202_ACCEPTED)
+
+
+class LivePositionSnapshotView(APIView):
+    """
+    Compact latest positions for the live map: [[vehicle_id, latitude, longitude, unix seconds], ...].
+    Pass ?since=<unix seconds> to get only positions recorded after that time.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsTransportManager]
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        try:
+            since = datetime.fromtimestamp(int(since), tz=dt_timezone.utc) if since else None
+        except (ValueError, OverflowError, OSError):
+            return Response({"error": "since must be a unix timestamp."}, status=status.HTTP_400_BAD_REQUEST)
+        live_positions.load()
+        return Response({
+            "generated_at": int(timezone.now().timestamp()),
+            "positions": live_positions.snapshot(since),
+        })
+
+
 class CouponRequestCreateView(generics.CreateAPIView):
     serializer_class = CouponRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -1523,11 +1829,28 @@ class VehiclesDueForServiceView(generics.ListAPIView):
     def get_queryset(self):
         if self.request.user.role != User.TRANSPORT_MANAGER:
             raise PermissionDenied("Only transport managers can view this list.")
-        return Vehicle.objects.filter(
-            total_kilometers__gte=F('last_service_kilometers') + 5000
-        )
+        return ServiceDueScanner.due_vehicles().order_by('-km_since_service')
+
+class VehiclesServiceUrgencyView(generics.ListAPIView):
+    serializer_class = VehicleServiceUrgencySerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        if self.request.user.role != User.TRANSPORT_MANAGER:
+            raise PermissionDenied("Only transport managers can view this list.")
+        try:
+            margin_km = float(self.request.query_params.get('within_km', 0))
+        except ValueError:
+            raise ValidationError({"within_km": "within_km must be numeric."})
+        if not math.isfinite(margin_km):
+            raise ValidationError({"within_km": "within_km must be a finite number."})
 
-class ServiceRequestListView(generics.ListAPIView):
+        # Range scans and ordering on the km_since_service index only
+        return ServiceDueScanner.due_vehicles(margin_km=margin_km).only(
+            'id', 'license_plate', 'model', 'fuel_type', 'km_since_service'
+        ).order_by('-km_since_service')
+
+class ServiceRequestListView(RemainingBudgetListMixin, generics.ListAPIView):
     queryset = ServiceRequest.objects.all()
     serializer_class = ServiceRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -1598,8 +1921,8 @@ class ServiceRequestActionView(SignatureVerificationMixin,OTPVerificationMixin,A
 
             service_request.status = 'forwarded'
             service_request.current_approver_role = next_role
-            service_request.save()
-            # log_action(request_obj=service_request, user=request.user, action="forwarded", remarks=request.data.get("remarks"))
+            service_request.save(update_fields=['status', 'current_approver_role', 'rejection_reason', 'updated_at'])
+            log_action(request_obj=service_request, user=request.user, action="forwarded", remarks=request.data.get("remarks"))
             next_approvers = User.objects.filter(role=next_role, is_active=True)
             for approver in next_approvers:
                 # NotificationService.send_service_notification('service_forwarded', service_request, approver)
@@ -1625,7 +1948,7 @@ class ServiceRequestActionView(SignatureVerificationMixin,OTPVerificationMixin,A
 
             service_request.status = 'rejected'
             service_request.rejection_reason = rejection_message
-            service_request.save()
+            service_request.save(update_fields=['status', 'current_approver_role', 'rejection_reason', 'updated_at'])
             log_action(request_obj=service_request, user=request.user, action="rejected", remarks=rejection_message)
             driver = service_request.vehicle.driver
             if driver and driver.phone_number:
@@ -1646,9 +1969,11 @@ class ServiceRequestActionView(SignatureVerificationMixin,OTPVerificationMixin,A
 
         elif action == 'approve':
             if current_role == User.BUDGET_MANAGER:
-                service_request.status = 'approved'
-                service_request.save()
-                log_action(request_obj=service_request, user=request.user, action="approved", remarks=request.data.get("remarks"))
+                with transaction.atomic():
+                    service_request.status = 'approved'
+                    service_request.save(update_fields=['status', 'current_approver_role', 'rejection_reason', 'updated_at'])
+                    log_action(request_obj=service_request, user=request.user, action="approved", remarks=request.data.get("remarks"))
+                    budget = BudgetLedger.charge(service_request, request.user)
                 finance_managers = User.objects.filter(role=User.FINANCE_MANAGER, is_active=True)
                 driver = service_request.vehicle.driver
                 recipients = [driver] + list(finance_managers)
@@ -1670,7 +1995,10 @@ class ServiceRequestActionView(SignatureVerificationMixin,OTPVerificationMixin,A
                 # for fm in finance_managers:
                 #     NotificationService.send_service_notification('service_approved', service_request, recipient=fm)
 
-                return Response({"message": "Request approved successfully and finance notified."}, status=status.HTTP_200_OK)
+                return Response({
+                    "message": "Request approved successfully and finance notified.",
+                    "budget": BudgetLedger.summary(budget),
+                }, status=status.HTTP_200_OK)
 
             else:
                 return Response({
@@ -1713,12 +2041,13 @@ class TransportManagerServiceUpdateView(APIView):
 
         vehicle = get_object_or_404(Vehicle, id=vehicle_id)
         
-        if (vehicle.total_kilometers - vehicle.last_service_kilometers) < 5000:
-            return Response({'detail': 'Vehicle does not meet the 5000 km threshold.'}, status=400)
+        threshold = ServiceDueScanner.threshold_for(vehicle)
+        if (vehicle.total_kilometers - vehicle.last_service_kilometers) < threshold:
+            return Response({'detail': f'Vehicle does not meet the {threshold:g} km threshold.'}, status=400)
 
-        # Update service-related info
+        # Update service-related info (save() resets km_since_service)
         vehicle.last_service_kilometers = vehicle.total_kilometers
-        vehicle.mark_as_service()
+        vehicle.mark_as_service(update_fields=['last_service_kilometers'])
 
         # Auto-create service request
         ServiceRequest.objects.create(
@@ -1736,18 +2065,11 @@ class ServicedVehiclesListView(generics.ListAPIView):
         if self.request.user.role != User.TRANSPORT_MANAGER:
             raise PermissionDenied("Only transport managers can access this list.")
 
-        # Subquery to get the status of the latest service request for each vehicle
-        latest_request_status = ServiceRequest.objects.filter(
-            vehicle=OuterRef('pk')
-        ).order_by('-created_at').values('status')[:1]
-
         # Only include vehicles whose latest service request is approved or rejected
         # AND whose current status is 'service'
-        return Vehicle.objects.annotate(
-            latest_status=Subquery(latest_request_status)
-        ).filter(
-            latest_status__in=['approved', 'rejected'],
-            status=Vehicle.SERVICE  # Make sure this matches your model's constant
+        return Vehicle.objects.filter(
+            latest_service_status__in=['approved', 'rejected'],
+            status=Vehicle.SERVICE
         )
 
 class MarkServicedVehicleAvailableView(APIView):
@@ -1759,12 +2081,10 @@ class MarkServicedVehicleAvailableView(APIView):
 
         vehicle = get_object_or_404(Vehicle, id=vehicle_id)
 
-        try:
-            latest_service_request = ServiceRequest.objects.filter(vehicle=vehicle).latest('created_at')
-        except ServiceRequest.DoesNotExist:
+        if vehicle.latest_service_request_id is None:
             return Response({'error': 'No service request found for this vehicle.'}, status=status.HTTP_404_NOT_FOUND)
 
-        if latest_service_request.status not in ['approved', 'rejected']:
+        if vehicle.latest_service_status not in ['approved', 'rejected']:
             return Response({
                 'error': 'Vehicle cannot be marked as available until the service request is approved or rejected.'
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -1772,8 +2092,7 @@ class MarkServicedVehicleAvailableView(APIView):
         if vehicle.status == 'available':
             return Response({'detail': 'Vehicle is already marked as available.'}, status=status.HTTP_200_OK)
 
-        vehicle.status = 'available'
-        vehicle.save()
+        vehicle.mark_as_available()
 
         # Optionally log this or trigger notification here
 
@@ -1800,8 +2119,54 @@ class ServiceRequestDetailView(RetrieveAPIView):
         serializer = self.get_serializer(service_request)
         return Response(serializer.data)
     
+class SignatureSampleListView(APIView):
+    """
+    GET: the user's enrolled signature samples.
+    POST: enroll another sample (multipart 'signature'); approvals are verified against the
+    stored signature and every sample, so natural variation in signing fails less often.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def get(self, request):
+        samples = SignatureSample.objects.filter(user=request.user).order_by('id')
+        return Response(SignatureSampleSerializer(samples, many=True, context={'request': request}).data)
+
+    def post(self, request):
+        if not request.user.signature_image:
+            return Response({"error": "Upload your signature image before enrolling samples."}, status=status.HTTP_400_BAD_REQUEST)
+        uploaded_signature = request.FILES.get('signature')
+        if not uploaded_signature:
+            return Response({"error": "Signature is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if SignatureSample.objects.filter(user=request.user).count() >= settings.SIGNATURE_MAX_SAMPLES:
+            return Response(
+                {"error": f"At most {settings.SIGNATURE_MAX_SAMPLES} signature samples can be enrolled; delete one first."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        from core.signatures import decode_signature_upload  # loads OpenCV, so only when needed
+        try:
+            decode_signature_upload(uploaded_signature)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        uploaded_signature.seek(0)
+
+        sample = SignatureSample.objects.create(user=request.user, image=uploaded_signature)
+        return Response(SignatureSampleSerializer(sample, context={'request': request}).data, status=status.HTTP_201_CREATED)
+
+
+class SignatureSampleDeleteView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def delete(self, request, sample_id):
+        sample = get_object_or_404(SignatureSample, id=sample_id, user=request.user)
+        sample.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class RequestOTPView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'otp'
+    throttle_classes = [UserTokenBucketThrottle, PhoneTokenBucketThrottle, IPTokenBucketThrottle]
 
     def post(self, request):
         user = request.user
@@ -1821,18 +2186,8 @@ class VehiclesAfterMaintenanceListView(generics.ListAPIView):
         if self.request.user.role != User.TRANSPORT_MANAGER:
             raise PermissionDenied("Only transport managers can view this list.")
 
-        # Subquery: Does an approved maintenance request exist for this vehicle?
-        approved_maintenance_exists = MaintenanceRequest.objects.filter(
-            requesters_car=OuterRef('pk'),
-            status='approved'
-        )
-
-        return Vehicle.objects.annotate(
-            has_approved_maintenance=Exists(approved_maintenance_exists)
-        ).filter(
-            has_approved_maintenance=True,
-            status=Vehicle.MAINTENANCE
-        )
+        # Vehicles under maintenance whose latest maintenance request is approved
+        return Vehicle.objects.filter(latest_maintenance_status='approved', status=Vehicle.MAINTENANCE)
 
 class MarkMaintenancedVehicleAvailableView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -1843,22 +2198,16 @@ class MarkMaintenancedVehicleAvailableView(APIView):
 
         vehicle = get_object_or_404(Vehicle, id=vehicle_id)
 
-        # Check if there is any approved maintenance request for this vehicle
-        has_approved_maintenance = MaintenanceRequest.objects.filter(
-            requesters_car=vehicle,
-            status='approved'
-        ).exists()
-
-        if not has_approved_maintenance:
+        # The vehicle's latest maintenance request must be approved
+        if vehicle.latest_maintenance_status != 'approved':
             return Response({
-                'error': 'Vehicle cannot be marked as available until at least one maintenance request is approved.'
+                'error': 'Vehicle cannot be marked as available until its maintenance request is approved.'
             }, status=status.HTTP_400_BAD_REQUEST)
 
         if vehicle.status == Vehicle.AVAILABLE:
             return Response({'detail': 'Vehicle is already marked as available.'}, status=status.HTTP_200_OK)
 
-        vehicle.status = Vehicle.AVAILABLE
-        vehicle.save()
+        vehicle.mark_as_available()
 
         # Optionally log this or trigger notification here
 
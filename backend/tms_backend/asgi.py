@@ -13,9 +13,10 @@ from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 from auth_app.routing import websocket_urlpatterns
+from core.routing import websocket_urlpatterns as core_websocket_urlpatterns
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tms_backend.settings")
 
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
-    "websocket": AuthMiddlewareStack(URLRouter(websocket_urlpatterns)),
+    "websocket": AuthMiddlewareStack(URLRouter(websocket_urlpatterns + core_websocket_urlpatterns)),
 })
@@ -32,6 +32,68 @@ SMS_BASE_URL = os.getenv("SMS_BASE_URL")
 SMS_URL = f"{SMS_BASE_URL}?key={SMS_API_KEY}"
 # REDIS_URL = os.getenv("REDIS_URL")
 
+# Service interval (km driven since last service) before a vehicle is due.
+# Model overrides win over fuel type overrides, which win over the default.
+SERVICE_INTERVAL_KM = float(os.getenv("SERVICE_INTERVAL_KM", 5000))
+SERVICE_INTERVAL_KM_BY_FUEL_TYPE = {
+    # "naphtha": 7500,
+}
+SERVICE_INTERVAL_KM_BY_MODEL = {
+    # "Toyota Land Cruiser": 10000,
+}
+
+# Service slot scheduling
+WORKSHOP_CAPACITY_PER_DAY = int(os.getenv("WORKSHOP_CAPACITY_PER_DAY", 2))
+DEPARTMENT_AVAILABILITY_FLOOR = float(os.getenv("DEPARTMENT_AVAILABILITY_FLOOR", 0.5))  # share of a department's vehicles kept on the road
+MAINTENANCE_SCHEDULE_HORIZON_DAYS = 30
+MAINTENANCE_SCHEDULE_LOOKAHEAD_KM = 500  # also schedule vehicles this close to their service interval
+
+# Telemetry ingestion: points are buffered in memory and written once either limit is hit
+TELEMETRY_FLUSH_SIZE = int(os.getenv("TELEMETRY_FLUSH_SIZE", 2000))
+TELEMETRY_FLUSH_SECONDS = float(os.getenv("TELEMETRY_FLUSH_SECONDS", 5))
+TELEMETRY_MAX_BUFFERED_POINTS = int(os.getenv("TELEMETRY_MAX_BUFFERED_POINTS", 50000))  # kept for retry while the database is unavailable
+TELEMETRY_MAX_FLUSH_ATTEMPTS = int(os.getenv("TELEMETRY_MAX_FLUSH_ATTEMPTS", 3))  # a batch failing for any reason but a lost connection is dropped after this many writes
+TELEMETRY_MAX_POINTS_PER_REQUEST = 5000
+TELEMETRY_MAX_ODOMETER_JUMP_KM = 2000  # larger jumps are treated as a replaced/reset odometer, not distance driven
+TELEMETRY_RAW_RETENTION_DAYS = int(os.getenv("TELEMETRY_RAW_RETENTION_DAYS", 30))
+LIVE_POSITION_PERSIST_SECONDS = int(os.getenv("LIVE_POSITION_PERSIST_SECONDS", 60))  # live positions reach the DB (and other workers' map snapshots) within this
+
+# Trip distance estimates are measured from here over the bundled road graph (core/data/road_graph.json)
+ROUTE_ORIGIN = os.getenv("ROUTE_ORIGIN", "Addis Ababa")
+
+# Department budgets run per fiscal year; the Ethiopian fiscal year opens in July (Hamle)
+FISCAL_YEAR_START_MONTH = int(os.getenv("FISCAL_YEAR_START_MONTH", 7))
+
+# Requests waiting at the same approver longer than this are escalated in a reminder digest (escalate_stale_requests)
+ESCALATION_SLA_HOURS = float(os.getenv("ESCALATION_SLA_HOURS", 48))
+ESCALATION_SLA_HOURS_BY_REQUEST_TYPE = {
+    # e.g. "refuelingrequest": 24,
+}
+
+# Uploaded approval signatures are rejected above these limits before being decoded
+SIGNATURE_MAX_UPLOAD_BYTES = int(os.getenv("SIGNATURE_MAX_UPLOAD_BYTES", 2 * 1024 * 1024))
+SIGNATURE_MAX_DIMENSION = int(os.getenv("SIGNATURE_MAX_DIMENSION", 4000))  # pixels, width or height
+SIGNATURE_POOL_WORKERS = int(os.getenv("SIGNATURE_POOL_WORKERS", 2))  # 0 compares on the request thread
+SIGNATURE_POOL_QUEUE = int(os.getenv("SIGNATURE_POOL_QUEUE", 8))  # waiting comparisons beyond the workers before 503s
+SIGNATURE_POOL_TIMEOUT_SECONDS = float(os.getenv("SIGNATURE_POOL_TIMEOUT_SECONDS", 10))
+SIGNATURE_MAX_SAMPLES = int(os.getenv("SIGNATURE_MAX_SAMPLES", 4))  # enrolled samples per user besides signature_image
+
+# Where OTPs, attempt counters and lockouts are kept: "cache" (see CACHES) or "orm" (the OTPCode table).
+# Local-memory caches aren't shared between worker processes, so "cache" is the default only with Redis.
+OTP_BACKEND = os.getenv("OTP_BACKEND", "cache" if os.getenv("REDIS_URL") else "orm")
+
+# Token buckets ("burst/period", refilled evenly over the period) per throttle scope and identity;
+# shared through Redis when it is the cache, otherwise per process
+TOKEN_BUCKETS = {
+    "otp": {"user": "3/10m", "phone": "3/10m", "ip": "20/10m"},
+    "login": {"email": "5/5m", "ip": "30/5m"},
+    "register": {"phone": "3/h", "ip": "10/h"},
+}
+
+# check_startup_time fails when django.setup() plus URL loading exceeds this, or loads these modules
+STARTUP_TIME_BUDGET_MS = float(os.getenv("STARTUP_TIME_BUDGET_MS", 1500))
+STARTUP_FORBIDDEN_MODULES = ["cv2", "skimage", "scipy", "PIL", "torch"]
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -111,6 +173,9 @@ REST_FRAMEWORK = {
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,  
+    # nginx sits in front of /api/ and appends the client address to X-Forwarded-For;
+    # client IPs for throttling are taken from that entry. Set to 0 when serving directly.
+    'NUM_PROXIES': int(os.getenv("NUM_PROXIES", 1)),
 }
 
 SIMPLE_JWT = {
@@ -171,17 +236,34 @@ DATABASES = {
 #     )
 # }
 
-# # Caching
-# CACHES = {
-#     "default": {
-#         "BACKEND": "django_redis.cache.RedisCache",
-#         "LOCATION": os.getenv("REDIS_URL"),
-#         "OPTIONS": {
-#             "CLIENT_CLASS": "django_redis.client.DefaultClient",
-#             "SSL": True,
-#         }
-#     }
-# }
+# Caching: Redis when REDIS_URL is set so every worker shares OTPs and cached lookups,
+# otherwise per-process local memory (development and tests)
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            }
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Precomputed reports (maintenance forecast, schedule, cost history) must be shared by all
+# workers: Redis when available, otherwise a database table created by core's migrations
+if os.getenv("REDIS_URL"):
+    CACHES["reports"] = {**CACHES["default"], "KEY_PREFIX": "reports"}
+else:
+    CACHES["reports"] = {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "core_report_cache",
+    }
 
 
 # Password validation
@@ -13,7 +13,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
 
-from core.views import AddMonthlyKilometersView, AvailableDriversView, AvailableOrganizationVehiclesListView, AvailableRentedVehiclesListView, AvailableVehiclesListView, MyAssignedVehicleView, MyMonthlyKilometerLogsListView, ReportAPIView, RequestOTPView, UserActionLogDetailView, UserActionLogListView, VehicleMarkAsMaintenanceView, VehicleViewSet, VehiclesAfterMaintenanceListView, VehiclesWithPendingMaintenanceRequestsView
+from core.views import AddMonthlyKilometersView, AvailableDriversView, BulkMonthlyKilometersView, AvailableOrganizationVehiclesListView, AvailableRentedVehiclesListView, AvailableVehiclesListView, BatchFuelEstimateView, BudgetLedgerListView, DepartmentBudgetListView, FuelPriceListCreateView, LivePositionSnapshotView, MyAssignedVehicleView, MyMonthlyKilometerLogsListView, ReportAPIView, RequestOTPView, SignatureSampleDeleteView, SignatureSampleListView, TelemetryIngestView, UserActionLogDetailView, UserActionLogListView, VehicleMarkAsMaintenanceView, VehicleViewSet, VehiclesAfterMaintenanceListView, VehiclesWithPendingMaintenanceRequestsView
 
 router = DefaultRouter()
 router.register(r'vehicles',VehicleViewSet)
@@ -30,15 +30,24 @@ urlpatterns = [
     path("refueling_requests/",include(refueling_urls)),
     path("highcost-requests/",include(highcost_urls)),
     path("vehicles/add-monthly-kilometers/",AddMonthlyKilometersView.as_view(),name="add-monthly-kilometers"),
+    path("vehicles/add-monthly-kilometers/bulk/",BulkMonthlyKilometersView.as_view(),name="add-monthly-kilometers-bulk"),
     path('vehicles/kilometer-logs/', MyMonthlyKilometerLogsListView.as_view(), name='my-kilometer-logs'),
+    path('vehicles/telemetry/', TelemetryIngestView.as_view(), name='vehicle-telemetry'),
+    path('vehicles/live-positions/', LivePositionSnapshotView.as_view(), name='vehicle-live-positions'),
     path("action-logs/", UserActionLogListView.as_view(), name="user-action-log-list"),
     path("action-logs/<int:pk>/", UserActionLogDetailView.as_view(), name="user-action-log-detail"),
     path('transport-report/', TransportReportView.as_view(), name='transport-report'),
     path('report/', ReportAPIView.as_view(), name='report-api'),
+    path('estimates/fuel-cost/', BatchFuelEstimateView.as_view(), name='batch-fuel-estimate'),
+    path('fuel-prices/', FuelPriceListCreateView.as_view(), name='fuel-prices'),
+    path('budgets/', DepartmentBudgetListView.as_view(), name='department-budgets'),
+    path('budgets/<int:budget_id>/ledger/', BudgetLedgerListView.as_view(), name='budget-ledger'),
     path("service-requests/", include(service_urls)),
     path("dashboard/",include(dashboard_urls)),
     path("",include(router.urls)),
     path('otp/request/', RequestOTPView.as_view(), name='request-otp'),
+    path('signature-samples/', SignatureSampleListView.as_view(), name='signature-samples'),
+    path('signature-samples/<int:sample_id>/', SignatureSampleDeleteView.as_view(), name='signature-sample-delete'),
     path('coupon-requests/', include(coupon_urls)),
     path('maintained-vehicles/', VehiclesAfterMaintenanceListView.as_view(), name='vehicles-ready-after-maintenance'),
     path('vehicles/under-maintenance/list/', VehiclesWithPendingMaintenanceRequestsView.as_view(), name='vehicles-under-maintenance'),